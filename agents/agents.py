@@ -1,21 +1,132 @@
-from typing import Dict
+from typing import Dict, List
 import json
-import re
 from GIt.tools.tool_manager import ToolVal, PackageVal
-from agents.agentval import AgentVal
+from GIt.agents.agentval import AgentVal
+from GIt.agents.prompt import PromptBuilder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def find_action_block(text: str):
+    """
+    Locate the first fenced block holding a JSON object or list.
+
+    Fences are paired with str.find in one left-to-right pass, so the cost stays linear in the output
+    size however long it is and whether or not it holds an action.
+
+    Args:
+        text (str): Raw model output.
+
+    Returns:
+        str: The block body without the optional json tag and surrounding whitespace, or None.
+    """
+    fence = "```"
+    start = text.find(fence)
+    while start != -1:
+        end = text.find(fence, start + 3)
+        if end == -1:
+            return None
+        body = text[start + 3:end].strip()
+        if body.startswith("json"):
+            body = body[4:].lstrip()
+        if body[:1] in ("{", "[") and body[-1:] in ("}", "]"):
+            return body
+        start = text.find(fence, end + 3)
+    return None
+
+
+def loads_action(body: str):
+    """
+    Decode an action block, with orjson when it is installed.
+
+    Falls back to the standard library for text orjson rejects (raw control characters inside strings)
+    and un-escapes doubled braces copied from prompt templates only when they are present.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+    try:
+        return json.loads(body, strict=False)
+    except json.JSONDecodeError:
+        if "{{" not in body and "}}" not in body:
+            raise
+        return json.loads(body.replace("{{", "{").replace("}}", "}"), strict=False)
+
+
+class ActionStreamParser:
+    """
+    Incrementally watch streamed text for the fenced JSON action block.
+
+    feed() returns True as soon as the closing fence of a block starting with "{" or "[" (optionally
+    tagged json) has arrived, so the caller can stop generation early. AgentExecutor(stream=True) passes
+    it to llm_gen as the until watcher.
+    """
+    FENCE = "```"
+
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+        self._scan = 0
+        self._open = -1
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete:
+            return True
+        self.text += chunk
+        fence = self.FENCE
+        while True:
+            # Fences may be split across chunks, so never skip the last two characters unseen
+            idx = self.text.find(fence, self._scan)
+            if idx == -1:
+                self._scan = max(self._scan, len(self.text) - len(fence) + 1)
+                return False
+            self._scan = idx + len(fence)
+            if self._open == -1:
+                self._open = self._scan
+                continue
+            body = self.text[self._open:idx].lstrip()
+            if body.startswith("json"):
+                body = body[4:].lstrip()
+            if body.startswith(("{", "[")):
+                self.complete = True
+                return True
+            # A non-action code block; keep looking for the next opening fence
+            self._open = -1
+
 
 class BaseAgent:
     def __init__(self, prefix: str,
-                 agent_type: str = "head_agent" & "sub_agent",
+                 agent_type: str = "sub_agent",
                  agent_name: str = 'agent',
                  instruction_format: str = "Please provide the {agents} with the following information: {agent_names}",
-                 suffix: str= "Please provide the information requested above."):
+                 suffix: str= "Please provide the information requested above.",
+                 description: str = "",
+                 tags: List[str] = None,
+                 permissions: List[str] = None,
+                 action_val: AgentVal = None,
+                 previous_history: str = ''):
         self.agent_type = agent_type
         self.agent_name = agent_name
+        self.description = description
+        self.tags = tags or []
+        self.permissions = permissions or []
         self.prefix = prefix
         self.suffix = suffix
         self.instruction_format_template = instruction_format
-        
+        self.action_val = action_val
+        self.previous_history = previous_history
+        self.prompt_builder = PromptBuilder(self._static_prompt, self._static_key)
+
+
+    @property
+    def type(self) -> str:
+        # AgentVal indexes agents by their name
+        return self.agent_name
 
     def prompt(self, chain: str = '') -> str:
         """
@@ -27,9 +138,23 @@ class BaseAgent:
         Returns:
             str: The formatted prompt.
         """
+        return self.prompt_builder.build(history=self.previous_history, chain=chain)
+
+    def stable_prefix(self) -> str:
+        """
+        The part of the prompt that stays identical across iterations, for backends with prefix caching.
+        """
+        return self.prompt_builder.stable_prefix(history=self.previous_history)
+
+    def _static_prompt(self) -> str:
         instruction_format = self.generate_instruction_format()
-        prompt = f"{self.prefix}\n{instruction_format}\n{self.suffix}\n{self.previous_history}\n{chain}"
-        return prompt
+        return f"{self.prefix}\n{instruction_format}\n{self.suffix}"
+
+    def _static_key(self):
+        # Rebuilt when the template fields or the callable agents change
+        registry = getattr(self.action_val, "registry", None)
+        return (self.prefix, self.suffix, self.instruction_format_template, id(self.action_val),
+                getattr(registry, "version", None))
 
     def generate_instruction_format(self) -> str:
         """
@@ -38,6 +163,8 @@ class BaseAgent:
         Returns:
             str: Formatted instruction string.
         """
+        if self.action_val is None:
+            return self.instruction_format_template.format(agents="", agent_names="")
         agents_description = self.action_val.agents_description()
         agent_names = self.action_val.names()
         return self.instruction_format_template.format(agents=agents_description,
@@ -51,24 +178,18 @@ class BaseAgent:
             gen_output (str): The raw output from the agent.
 
         Returns:
-            dict: Parsed action details, or None if parsing fails.
+            dict or list: Parsed action details (a list when several actions are given in one block),
+                or None if parsing fails.
         """
-        pattern = re.compile(r"```(?:json\s+)?(\{.*?\})```", re.DOTALL)
-
-        match = pattern.search(gen_output)
-        if not match:
+        body = find_action_block(gen_output)
+        if body is None:
             return None
 
         try:
-            return json.loads(match.group(1).strip(), strict=False)
-        except json.JSONDecodeError:
-            # Attempt to fix common issues and retry parsing
-            try:
-                fixed_text = match.group(1).replace("{{", "{").replace("}}", "}")
-                return json.loads(fixed_text, strict=False)
-            except Exception as e:
-                print(f"Parsing error: {e}")
-                return None
+            return loads_action(body)
+        except ValueError as e:
+            print(f"Parsing error: {e}")
+            return None
 
     def _action(self, gen_output, action):
         """
@@ -82,6 +203,27 @@ class BaseAgent:
             tuple: A tuple (action_type, action_name, action_input) representing the determined action.
         """
         parse = self.parser(gen_output)
+        if isinstance(parse, list):
+            parse = parse[0] if parse else None
+        return self._classify(parse, action)
+
+    def _actions(self, gen_output, action):
+        """
+        Determine every action requested in one output; the JSON block may hold a single action or a list.
+
+        Args:
+            gen_output (str): The raw output from the agent.
+            action (tuple): (ToolVal, PackageVal) validators, plus the AgentVal of callable sub-agents for a head agent.
+
+        Returns:
+            list: (action_type, action_name, action_input) tuples in the order the agent gave them.
+        """
+        parse = self.parser(gen_output)
+        if isinstance(parse, list) and parse:
+            return [self._classify(item, action) for item in parse]
+        return [self._classify(parse, action)]
+
+    def _classify(self, parse, action):
         action_type = "default"
         action_name = "parse"
         action_input = "parser failed"
@@ -92,33 +234,38 @@ class BaseAgent:
 
 
         if isinstance(parse, dict):
+            name = parse.get("action")
+            if not isinstance(name, str):
+                return "default", "name", "default"
 
-            if "Final Answer" in parse.get("action", ""):
+            if "Final Answer" in name:
                 action_type = "final action"
                 action_name = "Final Answer"
                 action_input = parse.get("action_input", "final input failed")
 
 
-            elif isinstance(action, AgentVal) and parse["action"] in action.names():
+            elif len(action) > 2 and isinstance(action[2], AgentVal) and name in action[2].name_set():
                 action_type = "agent action"
-                action_name = parse["action"]
+                action_name = name
                 action_input = parse.get("action_input", "agent input failed")
 
 
             elif (
                     isinstance(action[1], PackageVal)
-                    and "#" in parse["action"]
-                    and parse["action"].split("#")[0] in action[1].names().keys()
+                    and "#" in name
+                    and name.split("#", 1)[0] in action[1].name_set()
+                    and name.split("#", 1)[1]
             ):
-                package = parse["action"].split("#")
+                # Only the first "#" separates package and tool, so action_name is always a pair
+                package = name.split("#", 1)
                 action_type = "package action"
                 action_name = package
                 action_input = parse.get("action_input", "package input failed")
 
 
-            elif isinstance(action[0], ToolVal) and parse["action"] in action[0].names():
+            elif isinstance(action[0], ToolVal) and name in action[0].name_set():
                 action_type = "tool action"
-                action_name = parse["action"]
+                action_name = name
                 action_input = parse.get("action_input", "tool input failed")
 
 
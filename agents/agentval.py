@@ -1,25 +1,42 @@
+from __future__ import annotations
+
 import time
 import json
 import logging
-from typing import List, Dict, Any, Tuple
-from .agents import BaseAgent
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from GIt.callback import CallbackHandler, AgentLog
+from GIt.tools.registry import Registry
+
+if TYPE_CHECKING:
+    from GIt.agents.agents import BaseAgent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AgentVal")
 
 class AgentVal:
     def __init__(self, agents: List[BaseAgent]):
-        self.agents = agents
+        self.registry = Registry(agents, key=lambda agent: agent.type,
+                                 text=lambda agent: (getattr(agent, "description", ""),))
+
+    @property
+    def agents(self) -> List[BaseAgent]:
+        return self.registry.values()
 
     def names(self):
-        agent_names = [agent.type for agent in self.agents]
+        agent_names = self.registry.names()
         return agent_names if agent_names else "No Action Agents"
 
+    def name_set(self) -> frozenset:
+        return self.registry.name_set()
+
     def agent_description(self):
-        agent_descriptions = [agent.description for agent in self.a_agents]
+        agent_descriptions = [agent.description for agent in self.registry]
         return agent_descriptions if agent_descriptions else "No Action Agents"
 
+    def agents_description(self):
+        return self.agent_description()
+
     def a_format(self):
         formats = [
             {
@@ -27,39 +44,49 @@ class AgentVal:
                 "description": agent.description,
                 "schema": agent.schema
             }
-            for agent in self.agents
+            for agent in self.registry
         ]
         return formats
 
     def agent_retrieval(self, agent_name: str):
-        try : 
-            agent_idx = self.names().index(agent_name)
-            return self.agents[agent_idx]
-        except KeyError as ke:
-            logger.error(f"{agent_name} not found in AgentVal : {ke}") 
+        agent = self.registry.get(agent_name)
+        if agent is None:
+            logger.error(f"{agent_name} not found in AgentVal")
+            raise ValueError(f"Agent {agent_name} not found in AgentVal.")
+        return agent
     
     def agents_retrieval(self, agent_names:List[str]):
         retrieved_agents = []
         for agent_name in agent_names:
-            try:
-                agent_idx = self.names().index(agent_name)
-                agent_names.append(self.agents[agent_idx])
-            except KeyError as ke:
-                logger.error(f"{agent_name} not found in AgentVal : {ke}")
+            agent = self.registry.get(agent_name)
+            if agent is None:
+                logger.error(f"{agent_name} not found in AgentVal")
                 continue
+            retrieved_agents.append(agent)
         
         if not retrieved_agents:
             raise ValueError(f"None of the agents found in AgentVal: {agent_names}")
         return retrieved_agents
+
+    def add_agent(self, agent: BaseAgent):
+        self.registry.add(agent)
+
+    def remove_agent(self, agent_name: str):
+        self.registry.remove(agent_name)
+
+    def search(self, query: str) -> List[BaseAgent]:
+        return self.registry.search(query)
         
     def filter_agents(self, key: str, value: str) -> List[BaseAgent]:
+        if key in ("tags", "permissions"):
+            return self.registry.by_tag(value) if key == "tags" else self.registry.by_permission(value)
         return [
-            agent for agent in self.a_agents
+            agent for agent in self.registry
             if getattr(agent, key, "").lower() == value.lower()
         ]
 
-    def execute_agent(self, agent: str, params: Dict[str, Any] = None):
-        agent = self.agent_retrieval(agent)
+    def execute_agent(self, cagent: str, params: Dict[str, Any] = None):
+        agent = self.agent_retrieval(cagent)
         start_time = time.time()
         result = agent.perform_action(params or {})
         elapsed_time = time.time() - start_time
@@ -76,15 +103,18 @@ class AgentVal:
             logger.error(f"Error executing agent '{cagent}': {e}")
             raise
 
-    def batch_execute(self, agent_sequence: List[Tuple[str, Dict[str, Any]]]):
-        results = []
-        for agent_name, params in agent_sequence:
+    def batch_execute(self, agent_sequence: List[Tuple[str, Dict[str, Any]]], max_workers: int = 1):
+        def run(item):
+            agent_name, params = item
             try:
-                result = self.execute_agent(agent_name, params)
-                results.append((agent_name, result))
+                return agent_name, self.execute_agent(agent_name, params)
             except Exception as e:
-                results.append((agent_name, f"Error: {e}"))
-        return results
+                return agent_name, f"Error: {e}"
+
+        if max_workers <= 1 or len(agent_sequence) <= 1:
+            return [run(item) for item in agent_sequence]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(agent_sequence))) as pool:
+            return list(pool.map(run, agent_sequence))
 
     def reset_agent_state(self, cagent: str):
         agent = self.agent_retrieval(cagent)
@@ -109,7 +139,7 @@ class AgentVal:
 
     def generate_docs(self, filename: str = "agent_docs.md"):
         with open(filename, "w") as f:
-            for agent in self.a_agents:
+            for agent in self.registry:
                 f.write(f"### {agent.type}\n")
                 f.write(f"- Description: {agent.description}\n")
                 f.write(f"- Schema: {agent.schema}\n\n")
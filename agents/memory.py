@@ -0,0 +1,495 @@
+import contextlib
+import contextvars
+import hashlib
+import itertools
+import mmap
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+# Context windows used to derive the default history budget per model
+MODEL_CONTEXT_TOKENS = {
+    "default": 4096,
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "models/text-bison-001": 8192,
+    "llama3-8b-8192": 8192,
+    "llama3-70b-8192": 8192,
+}
+
+
+def approx_tokens(text: str) -> int:
+    """
+    Cheap tokenizer stand-in: roughly four characters per token.
+    """
+    return len(text) // 4 + 1
+
+
+class ObservationHandle:
+    """
+    Reference to an observation kept in an ObservationStore.
+
+    Action places handles in intermediate_state instead of large observation strings, so the payload
+    is held once no matter how many states, previews and prompts refer to it. Only excerpt(),
+    read() and text() decode bytes; view() gives the raw UTF-8 without copying. Once the store has
+    evicted the observation (max_bytes), the text methods return a placeholder saying so and view()
+    returns None.
+    """
+    __slots__ = ("store", "ref", "size", "chars")
+
+    def __init__(self, store: "ObservationStore", ref: str, size: int, chars: int):
+        self.store = store
+        self.ref = ref
+        self.size = size
+        self.chars = chars
+
+    def __len__(self):
+        return self.chars
+
+    def view(self) -> memoryview:
+        return self.store.view(self.ref)
+
+    def available(self) -> bool:
+        return self.store.handle(self.ref) is not None
+
+    def _or_evicted(self, text) -> str:
+        return f"[observation {self.ref} was evicted from the store]" if text is None else text
+
+    def excerpt(self, chars: int) -> str:
+        return self._or_evicted(self.store.read(self.ref, 0, chars))
+
+    def read(self, offset: int = 0, length: int = None) -> str:
+        return self._or_evicted(self.store.read(self.ref, offset, length))
+
+    def text(self) -> str:
+        return self._or_evicted(self.store.get(self.ref))
+
+    def __str__(self):
+        return self.text()
+
+    def __eq__(self, other):
+        return isinstance(other, ObservationHandle) and other.store is self.store and other.ref == self.ref
+
+    def __hash__(self):
+        return hash((id(self.store), self.ref))
+
+    def __repr__(self):
+        return f"ObservationHandle({self.ref!r}, chars={self.chars})"
+
+
+class _Segment:
+    __slots__ = ("buffer", "file", "used", "refs", "live")
+
+    def __init__(self, size: int, directory: str = None):
+        self.file = None
+        if directory is not None:
+            self.file = tempfile.TemporaryFile(dir=directory)
+            self.file.truncate(size)
+            self.buffer = mmap.mmap(self.file.fileno(), size)
+        else:
+            self.buffer = mmap.mmap(-1, size)
+        self.used = 0
+        self.refs = []
+        # Observations still indexed; a segment nobody writes to anymore is freed once this drops to 0
+        self.live = 0
+
+    def close(self):
+        try:
+            self.buffer.close()
+        except BufferError:
+            # A view is still exported; the mapping goes away with its last reference
+            pass
+        if self.file is not None:
+            self.file.close()
+
+
+_store_ids = itertools.count(1)
+_active_scope = contextvars.ContextVar("observation_scope", default=None)
+
+
+class ObservationScope:
+    def __init__(self, store: "ObservationStore"):
+        """
+        The observations of one run (one AgentState) inside a shared ObservationStore.
+
+        Refs only resolve through the scope that put them, so a run cannot read another run's
+        observations by guessing a ref, and identical payloads are stored once per scope rather than
+        across runs. close() releases the run's observations and lets the store free their segments.
+        The read tool of the store reads from the scope made current with active().
+
+        Args:
+            store (ObservationStore): Where the payloads are kept.
+        """
+        self.store = store
+        self.threshold = store.threshold
+        self._refs = set()
+        self._digests: Dict[bytes, str] = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    @staticmethod
+    def current() -> "ObservationScope":
+        return _active_scope.get()
+
+    @contextlib.contextmanager
+    def active(self):
+        token = _active_scope.set(self)
+        try:
+            yield self
+        finally:
+            _active_scope.reset(token)
+
+    def put(self, text: str) -> ObservationHandle:
+        data = text.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            if self.closed:
+                raise ValueError("Observation scope is closed.")
+            ref = self._digests.get(digest)
+            if ref is not None and self.store.handle(ref) is not None:
+                self.store.deduplicated += 1
+                return ObservationHandle(self, ref, len(data), len(text))
+            ref = self.store.write(data, len(text))
+            self._refs.add(ref)
+            self._digests[digest] = ref
+        return ObservationHandle(self, ref, len(data), len(text))
+
+    def offload(self, observation):
+        """
+        Store a long string observation and return its handle; anything else, or anything arriving
+        after the scope was closed (e.g. from a sub-agent that outlived its timeout), is returned as it is.
+        """
+        if isinstance(observation, str) and len(observation) >= self.threshold and not self.closed:
+            try:
+                return self.put(observation)
+            except ValueError:
+                return observation
+        return observation
+
+    def handle(self, ref: str) -> ObservationHandle:
+        if ref not in self._refs:
+            return None
+        handle = self.store.handle(ref)
+        return None if handle is None else ObservationHandle(self, ref, handle.size, handle.chars)
+
+    def view(self, ref: str) -> memoryview:
+        return self.store.view(ref) if ref in self._refs else None
+
+    def read(self, ref: str, offset: int = 0, length: int = None) -> str:
+        return self.store.read(ref, offset, length) if ref in self._refs else None
+
+    def get(self, ref: str) -> str:
+        return self.read(ref)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            refs, self._refs = self._refs, set()
+            self._digests.clear()
+        self.store.release(refs)
+
+
+class ObservationStore:
+    def __init__(self, threshold: int = 1024, segment_size: int = 16 * 1024 * 1024, directory: str = None,
+                 max_bytes: int = 256 * 1024 * 1024):
+        """
+        Keeps full observation texts out of the prompt; prompts carry a preview and the reference.
+
+        Payloads are encoded once into append-only mmap segments (anonymous memory, or temporary files
+        under directory so the OS can page them out) and identical payloads are stored once. Segments
+        never move or resize, so memoryviews handed out stay valid. Runs use their own scope(); a
+        segment is freed once every observation in it was released or evicted.
+
+        Args:
+            threshold (int): Observations of at least this many characters are offloaded by offload().
+            segment_size (int): Bytes per segment; larger payloads get a segment of their own.
+            directory (str): Back segments with temporary files here instead of anonymous memory.
+            max_bytes (int): Drop the oldest segments (and their observations) beyond this size,
+                None never drops any.
+        """
+        self.threshold = threshold
+        self.segment_size = segment_size
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._segments: List[_Segment] = []
+        self._index: Dict[str, tuple] = {}
+        self._digests: Dict[bytes, str] = {}
+        # Refs carry the store's id, so a ref never names an observation of another store
+        self.id = next(_store_ids)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.deduplicated = 0
+
+    def _segment_for(self, size: int) -> _Segment:
+        if self._segments:
+            current = self._segments[-1]
+            if len(current.buffer) - current.used >= size:
+                return current
+        if self._segments and not self._segments[-1].live:
+            # The segment being retired holds only released observations
+            self._drop(self._segments.pop())
+        segment = _Segment(max(self.segment_size, size, 1), self.directory)
+        self._segments.append(segment)
+        self._bytes += len(segment.buffer)
+        while self.max_bytes is not None and self._bytes > self.max_bytes and len(self._segments) > 1:
+            self._drop(self._segments.pop(0))
+        return segment
+
+    def _drop(self, segment: _Segment):
+        for ref in segment.refs:
+            entry = self._index.pop(ref, None)
+            if entry is not None:
+                self._digests.pop(entry[4], None)
+        self._bytes -= len(segment.buffer)
+        segment.close()
+
+    def _write(self, data: bytes, chars: int, digest: bytes = None) -> str:
+        segment = self._segment_for(len(data))
+        offset = segment.used
+        segment.buffer[offset:offset + len(data)] = data
+        segment.used += len(data)
+        segment.live += 1
+        ref = f"obs-{self.id}-{next(self._ids)}"
+        segment.refs.append(ref)
+        self._index[ref] = (segment, offset, len(data), chars, digest)
+        return ref
+
+    def write(self, data: bytes, chars: int) -> str:
+        """
+        Append an encoded payload without deduplication and return its ref; used by ObservationScope.
+        """
+        with self._lock:
+            return self._write(data, chars)
+
+    def put(self, text: str) -> ObservationHandle:
+        data = text.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            ref = self._digests.get(digest)
+            if ref is not None:
+                self.deduplicated += 1
+                return self.handle(ref)
+            ref = self._write(data, len(text), digest)
+            self._digests[digest] = ref
+        return ObservationHandle(self, ref, len(data), len(text))
+
+    def scope(self) -> ObservationScope:
+        return ObservationScope(self)
+
+    def release(self, refs):
+        """
+        Forget these observations and free the segments left without any.
+        """
+        with self._lock:
+            for ref in refs:
+                entry = self._index.pop(ref, None)
+                if entry is None:
+                    continue
+                segment = entry[0]
+                segment.live -= 1
+                if entry[4] is not None and self._digests.get(entry[4]) == ref:
+                    del self._digests[entry[4]]
+                # The last segment still takes writes; it is freed when the next one replaces it
+                if not segment.live and segment is not self._segments[-1]:
+                    self._segments.remove(segment)
+                    self._drop(segment)
+
+    def offload(self, observation):
+        """
+        Store a long string observation and return its handle; anything else is returned as it is.
+        """
+        if isinstance(observation, str) and len(observation) >= self.threshold:
+            return self.put(observation)
+        return observation
+
+    def handle(self, ref: str) -> ObservationHandle:
+        entry = self._index.get(ref)
+        if entry is None:
+            return None
+        return ObservationHandle(self, ref, entry[2], entry[3])
+
+    def view(self, ref: str) -> memoryview:
+        entry = self._index.get(ref)
+        if entry is None:
+            return None
+        segment, offset, size = entry[:3]
+        try:
+            return memoryview(segment.buffer)[offset:offset + size]
+        except ValueError:
+            return None
+
+    def read(self, ref: str, offset: int = 0, length: int = None) -> str:
+        """
+        Characters [offset, offset + length) of an observation, decoding only what is needed when possible.
+        """
+        entry = self._index.get(ref)
+        if entry is None:
+            return None
+        segment, start, size, chars = entry[:4]
+        offset = max(0, offset)
+        end = chars if length is None else min(chars, offset + length)
+        try:
+            if size == chars:
+                # ASCII: character and byte offsets coincide
+                return segment.buffer[start + offset:start + end].decode("ascii")
+            if offset == 0 and length is not None:
+                # A prefix needs at most four bytes per character
+                return segment.buffer[start:start + min(size, end * 4)].decode("utf-8", errors="ignore")[:end]
+            return segment.buffer[start:start + size].decode("utf-8")[offset:end]
+        except ValueError:
+            # The segment was evicted and closed while reading
+            return None
+
+    def get(self, ref: str) -> str:
+        return self.read(ref)
+
+    def read_tool(self, name: str = "read_observation", max_chars: int = 4000):
+        """
+        Tool that lets an agent read more of an observation whose prompt preview was truncated.
+        It resolves refs in the current ObservationScope only.
+        """
+        from GIt.tools.base_tool import BaseTool
+
+        def read_observation(ref: str = "reference of a stored observation, e.g. obs-1-3",
+                             offset: int = "character to start reading from",
+                             length: int = f"number of characters to read, at most {max_chars}"):
+            # Only the observations of the run calling the tool are readable
+            scope = ObservationScope.current()
+            handle = scope.handle(ref) if scope is not None and scope.store is self else None
+            text = scope.read(ref, offset, min(length, max_chars)) if handle is not None else None
+            if text is None:
+                return f"No stored observation {ref}."
+            chars = handle.chars
+            return f"[{ref} characters {offset}-{offset + len(text)} of {chars}]\n{text}"
+
+        return BaseTool(name=name, description="Read part of a long observation by its reference",
+                        function=read_observation, defaults={"offset": 0, "length": max_chars})
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"observations": len(self._index), "segments": len(self._segments),
+                    "stored_bytes": sum(entry[2] for entry in self._index.values()),
+                    "mapped_bytes": self._bytes, "deduplicated": self.deduplicated}
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments:
+                segment.close()
+            self._segments.clear()
+            self._index.clear()
+            self._digests.clear()
+            self._bytes = 0
+
+
+class TokenBudgetMemory:
+    def __init__(self, turns: List[Dict] = None, model: str = "default", budget: int = None,
+                 tokenizer: Callable[[str], int] = approx_tokens, max_turns: int = 256,
+                 preview_tokens: int = 256, summarizer: Callable[[str, List[Dict]], str] = None,
+                 store: ObservationStore = None):
+        """
+        Conversation memory kept under a hard token budget.
+
+        Turns live in a ring buffer (O(1) appends) with their token count computed once. When the
+        history does not fit the budget the oldest turns go first: they are folded into a running
+        summary when a summarizer is given, otherwise dropped from the prompt.
+
+        Args:
+            turns (list): Existing history entries ({'called', 'user', 'agent', 'time'}).
+            model (str): Model name used to pick the default budget.
+            budget (int): Tokens the rendered history may use, default half the model's context window.
+            tokenizer (callable): Counts the tokens of a text.
+            max_turns (int): Ring buffer capacity.
+            preview_tokens (int): Size of observation previews placed in prompts.
+            summarizer (callable): summarizer(previous_summary, dropped_turns) -> new summary.
+            store (ObservationStore): Where full observations are kept.
+        """
+        self.model = model
+        self.budget = budget if budget is not None else MODEL_CONTEXT_TOKENS.get(model, MODEL_CONTEXT_TOKENS["default"]) // 2
+        self.tokenizer = tokenizer
+        self.preview_tokens = preview_tokens
+        self.summarizer = summarizer
+        self.store = store if store is not None else ObservationStore()
+        self.summary = ""
+        self.turns = deque(maxlen=max_turns)
+        self._called = 0
+        for turn in turns or []:
+            self.add(turn.get('user', ''), turn.get('agent', ''), turn)
+
+    def _render_turn(self, turn: Dict) -> str:
+        return f"User: {turn['user']}\nAgent: {turn['agent']}"
+
+    def add(self, user: str, agent, turn: Dict = None) -> Dict:
+        turn = dict(turn or {})
+        turn.setdefault('called', self._called)
+        turn['user'] = user
+        turn['agent'] = agent
+        turn.setdefault('time', time.localtime())
+        turn['tokens'] = self.tokenizer(self._render_turn(turn))
+        self._called = turn['called'] + 1
+
+        if len(self.turns) == self.turns.maxlen:
+            self._fold([self.turns.popleft()])
+        self.turns.append(turn)
+        return turn
+
+    def _fold(self, dropped: List[Dict]):
+        if self.summarizer is not None and dropped:
+            self.summary = self.summarizer(self.summary, dropped)
+
+    def window(self) -> List[Dict]:
+        """
+        Newest turns that fit the budget; older ones are summarized (if possible) and released.
+        """
+        budget = self.budget - (self.tokenizer(self.summary) if self.summary else 0)
+        used = 0
+        keep = 0
+        for turn in reversed(self.turns):
+            if used + turn['tokens'] > budget:
+                break
+            used += turn['tokens']
+            keep += 1
+        dropped = len(self.turns) - keep
+        if dropped and self.summarizer is not None:
+            self._fold([self.turns.popleft() for _ in range(dropped)])
+            return list(self.turns)
+        return list(itertools.islice(self.turns, dropped, None))
+
+    def render(self) -> str:
+        turns = self.window()
+        parts = [f"Summary of earlier conversation: {self.summary}"] if self.summary else []
+        parts.extend(self._render_turn(turn) for turn in turns)
+        return "\n".join(parts)
+
+    def preview(self, observation) -> str:
+        """
+        Text placed in the prompt for an observation: itself when short, else a truncated preview
+        plus the reference under which the full text is stored.
+        """
+        limit = self.preview_tokens * 4
+        if isinstance(observation, ObservationHandle):
+            handle = observation
+        else:
+            text = observation if isinstance(observation, str) else str(observation)
+            if self.tokenizer(text) <= self.preview_tokens:
+                return text
+            handle = self.store.put(text)
+        if handle.chars <= limit or not handle.available():
+            # An evicted observation renders as its placeholder, not as a truncated preview
+            return handle.text()
+        return f"{handle.excerpt(limit)}... [truncated {handle.chars - limit} chars, full observation: {handle.ref}]"
+
+    def expand(self, ref: str) -> str:
+        return self.store.get(ref)
+
+    def tokens(self) -> int:
+        return sum(turn['tokens'] for turn in self.window())
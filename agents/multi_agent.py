@@ -1 +1,149 @@
-from .agents import BaseAgent
\ No newline at end of file
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List, Tuple
+
+from GIt.models.router import routing
+
+logger = logging.getLogger("MultiAgent")
+
+
+class MultiAgentOrchestrator:
+    def __init__(self, executor, agents, max_workers: int = 8, timeout: float = None,
+                 max_iterations: int = 5):
+        """
+        Fan work out from a head agent to several sub-agents at once.
+
+        Every sub-agent task runs executor.s_call on its own AgentState in a worker thread. The head
+        agent waits for all of them, and a task that runs past its timeout is stopped after its current step.
+        A timeout counts from when the task starts running, not while it waits for a free worker.
+
+        Args:
+            executor (AgentExecutor): Executor whose s_call drives each sub-agent.
+            agents (AgentVal): Sub-agents the head agent may call.
+            max_workers (int): Sub-agents allowed to run at the same time.
+            timeout (float): Default seconds each sub-agent may run, None waits indefinitely.
+            max_iterations (int): Step limit of each sub-agent run.
+        """
+        self.executor = executor
+        self.agents = agents
+        self.timeout = timeout
+        self.max_iterations = max_iterations
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sub-agent")
+        self._running = {}
+
+    def dispatch(self, tasks: List[Tuple[str, Any]], timeouts: Dict[str, float] = None) -> List[Dict]:
+        """
+        Run sub-agent tasks concurrently and wait for their results.
+
+        Args:
+            tasks (list): (agent_name, agent_input) pairs, typically the agent actions of one head step.
+            timeouts (dict): Per-agent timeouts overriding the default one.
+
+        Returns:
+            list: One result dict per task, in task order, with agent, input, status
+                ("done", "error", "timeout" or "cancelled"), output and time.
+        """
+        from GIt.executor import AgentState
+
+        timeouts = timeouts or {}
+        start = time.monotonic()
+        results = [None] * len(tasks)
+        futures = {}
+        # When each task left the pool queue and started running, filled in by _run
+        started: Dict[int, float] = {}
+        for idx, (agent_name, agent_input) in enumerate(tasks):
+            try:
+                agent = self.agents.agent_retrieval(agent_name)
+            except ValueError:
+                agent = None
+            if agent is None:
+                results[idx] = self._result(agent_name, agent_input, "error", f"Agent {agent_name} not found.", start)
+                continue
+            user_input = agent_input if isinstance(agent_input, str) else str(agent_input)
+            state = AgentState(agent=agent, user_input=user_input, history=[],
+                               max_iterations=self.max_iterations, store=self.executor.observations)
+            future = self._pool.submit(contextvars.copy_context().run, self._run, agent_name, agent, state,
+                                       started, idx)
+            futures[future] = (idx, agent_name, agent_input, state, timeouts.get(agent_name, self.timeout))
+            self._running[future] = state
+
+        pending = set(futures)
+        try:
+            while pending:
+                now = time.monotonic()
+                # A task still queued cannot reach its deadline sooner than one full timeout from now
+                waits = [started[idx] + timeout - now if idx in started else timeout
+                         for idx, _, _, _, timeout in map(futures.get, pending) if timeout is not None]
+                wait_for = max(0.0, min(waits)) if waits else None
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    idx, agent_name, agent_input, state, _ = futures[future]
+                    results[idx] = self._collect(future, agent_name, agent_input, state, start)
+
+                now = time.monotonic()
+                for future in list(pending):
+                    idx, agent_name, agent_input, state, timeout = futures[future]
+                    if timeout is not None and idx in started and now >= started[idx] + timeout:
+                        logger.error(f"Sub-agent '{agent_name}' timed out")
+                        self._stop(future, state)
+                        pending.discard(future)
+                        results[idx] = self._result(agent_name, agent_input, "timeout",
+                                                    self._partial(state), start)
+        finally:
+            for future in futures:
+                self._running.pop(future, None)
+        return results
+
+    def _run(self, agent_name, agent, state, started=None, idx=None):
+        if started is not None:
+            started[idx] = time.monotonic()
+        try:
+            with self.executor.callback.span("sub_agent", "sub_agent", agent=agent_name) as span, \
+                    routing(role="sub_agent"):
+                state = self.executor.s_call(agent=agent, agent_state=state)
+                span.set(iterations=state.iteration, stopped=state.stopped)
+        finally:
+            # The sub-agent's output is its final action; its stored observations are not needed anymore
+            state.close()
+        return state
+
+    def cancel(self):
+        """
+        Stop every sub-agent that is still running.
+        """
+        for future, state in list(self._running.items()):
+            self._stop(future, state)
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _stop(future, state):
+        # A task that has not started is dropped; a running one ends after its current step
+        if not future.cancel():
+            state.stop()
+
+    def _collect(self, future, agent_name, agent_input, state, start) -> Dict:
+        if future.cancelled():
+            return self._result(agent_name, agent_input, "cancelled", None, start)
+        try:
+            state = future.result()
+        except Exception as e:
+            logger.error(f"Sub-agent '{agent_name}' failed: {e}")
+            return self._result(agent_name, agent_input, "error", f"Error: {e}", start)
+        if state.stopped:
+            return self._result(agent_name, agent_input, "cancelled", self._partial(state), start)
+        return self._result(agent_name, agent_input, "done", self._partial(state), start)
+
+    @staticmethod
+    def _partial(state):
+        return state.states[-1]['action'] if state.states else None
+
+    @staticmethod
+    def _result(agent_name, agent_input, status, output, start) -> Dict:
+        return {'agent': agent_name, 'input': agent_input, 'status': status, 'output': output,
+                'time': round(time.monotonic() - start, 3)}
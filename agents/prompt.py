@@ -0,0 +1,38 @@
+from typing import Callable, Hashable
+
+
+class PromptBuilder:
+    def __init__(self, render_static: Callable[[], str], static_key: Callable[[], Hashable] = lambda: None):
+        """
+        Assemble agent prompts from a cached static section and the per-run dynamic parts.
+
+        The static section (prefix, instruction format, suffix) is rendered once and only re-rendered
+        when static_key() changes, e.g. after agents were added to the agent's AgentVal. It always comes
+        first and stays byte-identical, so backends with prefix/KV caching (ollama, local servers) can
+        reuse it across iterations. The scratchpad belongs to each run (AgentState) and is passed in as chain.
+
+        Args:
+            render_static (callable): Renders the static section.
+            static_key (callable): Returns a value that changes whenever the static section must be rebuilt.
+        """
+        self._render_static = render_static
+        self._static_key = static_key
+        self._key = object()
+        self._static = ""
+
+    @property
+    def static(self) -> str:
+        key = self._static_key()
+        if key != self._key:
+            self._static = self._render_static()
+            self._key = key
+        return self._static
+
+    def invalidate(self):
+        self._key = object()
+
+    def stable_prefix(self, history: str = '') -> str:
+        return f"{self.static}\n{history}"
+
+    def build(self, history: str = '', chain: str = '') -> str:
+        return f"{self.static}\n{history}\n{chain}"
@@ -0,0 +1,336 @@
+"""
+End-to-end benchmarks for the agent loop.
+
+A scripted LLMFramework("local") backend answers through the gen_local hook with canned action
+sequences, so the numbers measure AgentExecutor, Action, the parser and the registries rather than a
+model server. Run from the directory containing the GIt package:
+
+    python -m GIt.benchmarks.bench_executor
+    python -m GIt.benchmarks.bench_executor --latency 5 --json current.json
+    python -m GIt.benchmarks.bench_executor --baseline main.json --tolerance 0.15
+
+With --baseline the run exits with status 1 when a scenario's throughput dropped or its p99 step
+latency rose by more than the tolerance. It also exits with status 1 when one of the contract checks
+run before the benchmarks fails.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Dict, List
+
+from GIt.agents import BaseAgent
+from GIt.agents.agentval import AgentVal
+from GIt.executor import Action, AgentExecutor, AgentState
+from GIt.models.models import RAISE_ERRORS, LLMFramework
+from GIt.models.resilience import Backoff, GenerationError, ResilientLLM
+from GIt.tools.base_tool import BaseTool
+from GIt.tools.tool_manager import PackageVal, ToolVal
+
+OBSERVATION = '"Action_Type"'
+
+
+def _block(actions) -> str:
+    return f"Thought: next step.\n```json\n{json.dumps(actions)}\n```"
+
+
+def tool_action(tool: str, a: int = 1, b: int = 2) -> Dict:
+    return {"action": tool, "action_input": {"a": a, "b": b}}
+
+
+def final_action(answer: str = "done") -> Dict:
+    return {"action": "Final Answer", "action_input": answer}
+
+
+class ScriptedLLM:
+    def __init__(self, scripts: Dict[str, List[List[Dict]]], latency: float = 0.0):
+        """
+        Canned model for LLMFramework's gen_local hook.
+
+        A script is the list of steps an agent takes, each step being the actions of one model output.
+        The agent is recognised by its marker in the prompt and the step by the number of observations
+        already in the scratchpad, so concurrent runs need no shared counters.
+
+        Args:
+            scripts (dict): Prompt marker -> steps.
+            latency (float): Seconds each generation sleeps, standing in for the model server.
+        """
+        self.latency = latency
+        self.calls = 0
+        self.scripts = {}
+        for marker, steps in scripts.items():
+            outputs = {}
+            observed = 0
+            for actions in steps:
+                outputs[observed] = _block(actions if len(actions) > 1 else actions[0])
+                observed += len(actions)
+            self.scripts[marker] = outputs
+
+    def __call__(self, model_name: str, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for marker, outputs in self.scripts.items():
+            if marker in prompt:
+                return outputs.get(prompt.count(OBSERVATION), _block(final_action()))
+        return _block(final_action())
+
+
+class TimedExecutor(AgentExecutor):
+    """
+    AgentExecutor recording the wall time of every loop iteration (generate, parse and the actions).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.step_times = []
+        self._started = {}
+
+    def _lap(self, agent_state: AgentState, restart: bool = True):
+        now = time.perf_counter()
+        started = self._started.pop(id(agent_state), None)
+        if started is not None:
+            self.step_times.append(now - started)
+        if restart:
+            self._started[id(agent_state)] = now
+
+    def step(self, agent, agent_state, sub_agents=None):
+        self._lap(agent_state)
+        return super().step(agent, agent_state, sub_agents)
+
+    def s_call(self, agent, agent_state, callback=None):
+        agent_state = super().s_call(agent, agent_state, callback)
+        self._lap(agent_state, restart=False)
+        return agent_state
+
+    def m_call(self, head_agent, sub_agents, agent_state, callback=None):
+        agent_state = super().m_call(head_agent, sub_agents, agent_state, callback)
+        self._lap(agent_state, restart=False)
+        return agent_state
+
+
+def _add(a: int = "first number", b: int = "second number") -> int:
+    return a + b
+
+
+def make_tools(count: int) -> ToolVal:
+    return ToolVal([BaseTool(name=f"tool_{i}", description=f"adds two numbers, variant {i}", function=_add,
+                             tags=[f"group_{i % 4}"]) for i in range(count)])
+
+
+def make_agent(name: str, action_val: AgentVal = None) -> BaseAgent:
+    return BaseAgent(prefix=f"You are {name}. [agent:{name}]", agent_name=name,
+                     description=f"benchmark agent {name}", action_val=action_val,
+                     instruction_format="Agents you may call: {agents} ({agent_names})")
+
+
+def single_agent_scenario(tools: int, steps: int, actions_per_step: int, latency: float):
+    tool_val = make_tools(tools)
+    agent = make_agent("solo")
+    script = [[tool_action(f"tool_{(s * actions_per_step + i) % tools}", s, i) for i in range(actions_per_step)]
+              for s in range(steps)]
+    script.append([final_action()])
+    llm = LLMFramework(llm_type="local", gen_local=ScriptedLLM({"[agent:solo]": script}, latency))
+    return TimedExecutor(llm=llm, agents=AgentVal([agent]), tools=tool_val, packages=PackageVal([]),
+                         callback=None, agent_scheme={"single_agent": {"agent": "solo"}})
+
+
+def multi_agent_scenario(tools: int, sub_agents: int, steps: int, latency: float):
+    tool_val = make_tools(tools)
+    subs = [make_agent(f"sub_{i}") for i in range(sub_agents)]
+    sub_val = AgentVal(subs)
+    head = make_agent("head", action_val=sub_val)
+    scripts = {"[agent:head]": [[{"action": sub.agent_name, "action_input": f"task {i}"} for i, sub in enumerate(subs)],
+                                [final_action()]]}
+    for i, sub in enumerate(subs):
+        scripts[f"[agent:{sub.agent_name}]"] = [[tool_action(f"tool_{(i + s) % tools}", s, i)] for s in range(steps)] \
+                                               + [[final_action(f"sub {i} done")]]
+    llm = LLMFramework(llm_type="local", gen_local=ScriptedLLM(scripts, latency))
+    return TimedExecutor(llm=llm, agents=AgentVal([head, *subs]), tools=tool_val, packages=PackageVal([]),
+                         callback=None, max_sub_agents=sub_agents,
+                         agent_scheme={"multi_agent": {"head_agent": "head",
+                                                       "sub_agents": [sub.agent_name for sub in subs]}})
+
+
+def scenarios(latency: float) -> Dict[str, callable]:
+    defined = {}
+    for tools in (1, 10, 100):
+        defined[f"single/tools={tools}/seq"] = lambda tools=tools: single_agent_scenario(tools, 4, 1, latency)
+        defined[f"single/tools={tools}/parallel=4"] = lambda tools=tools: single_agent_scenario(tools, 2, 4, latency)
+    for agents in (2, 8):
+        for tools in (10, 100):
+            defined[f"multi/agents={agents}/tools={tools}"] = \
+                lambda agents=agents, tools=tools: multi_agent_scenario(tools, agents, 2, latency)
+    return defined
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def run_scenario(build, runs: int, alloc_runs: int) -> Dict:
+    """
+    Time `runs` executions, then repeat `alloc_runs` of them under tracemalloc.
+
+    Returns:
+        dict: runs_per_s, steps_per_s, p50_ms, p99_ms, peak_kib (per execute) and retained_kib.
+    """
+    executor = build()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        executor.execute("warm up")
+        executor.step_times.clear()
+        start = time.perf_counter()
+        for i in range(runs):
+            executor.execute(f"benchmark input {i}")
+        elapsed = time.perf_counter() - start
+        step_times = sorted(executor.step_times)
+
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        peaks = []
+        for i in range(alloc_runs):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            executor.execute(f"allocation input {i}")
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "runs_per_s": runs / elapsed,
+        "steps_per_s": len(step_times) / elapsed,
+        "p50_ms": _percentile(step_times, 0.50) * 1e3,
+        "p99_ms": _percentile(step_times, 0.99) * 1e3,
+        "peak_kib": max(peaks) / 1024 if peaks else 0.0,
+        "retained_kib": (retained - baseline) / 1024,
+    }
+
+
+def _per_op(func, repeat: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter_ns() - start) / repeat
+
+
+def micro_benchmarks(repeat: int) -> Dict[str, float]:
+    """
+    Nanoseconds per call of the hot helpers the agent loop relies on.
+    """
+    tools = make_tools(100)
+    packages = PackageVal([])
+    agents = AgentVal([make_agent(f"agent_{i}") for i in range(100)])
+    agent = make_agent("parser")
+    output = _block([tool_action("tool_42", 1, 2), tool_action("tool_7", 3, 4)])
+    action = Action(tools=tools, agents=agents, packages=packages)
+    tool_call = ("tool action", "tool_42", {"a": 1, "b": 2})
+    return {
+        "BaseAgent.parser": _per_op(lambda: agent.parser(output), repeat),
+        "BaseAgent._actions": _per_op(lambda: agent._actions(output, (tools, packages)), repeat),
+        "Action.action_def(tool)": _per_op(lambda: action.action_def(tool_call, []), repeat),
+        "ToolVal.tool_retrieval": _per_op(lambda: tools.tool_retrieval("tool_42"), repeat),
+        "ToolVal.names": _per_op(tools.names, repeat),
+        "ToolVal.search": _per_op(lambda: tools.search("variant 42"), repeat),
+        "AgentVal.agent_retrieval": _per_op(lambda: agents.agent_retrieval("agent_42"), repeat),
+    }
+
+
+def _unreachable(model_name: str, prompt: str) -> str:
+    # Fails like the provider methods: raises under RAISE_ERRORS, else returns the error text
+    if RAISE_ERRORS.get():
+        raise ConnectionError("model server unreachable")
+    return "Error: Unable to generate response. Details: model server unreachable"
+
+
+def contract_checks() -> List[str]:
+    """
+    Behaviour the optimizations must not change. Returns a description of every failed check.
+    """
+    failures = []
+    # The retries below log expected warnings
+    logging.disable(logging.WARNING)
+    try:
+        for batch_window in (None, 0.001):
+            llm = LLMFramework("local", gen_local=_unreachable, batch_window=batch_window)
+            resilient = ResilientLLM(llm, max_retries=1, backoff=Backoff(base=0.001, max_delay=0.001))
+            # A failing backend must reach ResilientLLM as an error, batched or not, so retries,
+            # the circuit breaker and failover see it instead of an "Error: ..." generation
+            try:
+                output = resilient.llm_gen("contract check")
+                failures.append(f"batch_window={batch_window}: backend failure returned as output {output!r}")
+            except GenerationError:
+                pass
+            if llm.batcher is not None:
+                llm.batcher.close()
+    finally:
+        logging.disable(logging.NOTSET)
+    return failures
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in current.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if result["runs_per_s"] < base["runs_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['runs_per_s']:.1f}/s vs {base['runs_per_s']:.1f}/s")
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {result['p99_ms']:.3f} ms vs {base['p99_ms']:.3f} ms")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the AgenEngine agent loop with a scripted LLM.")
+    parser.add_argument("--runs", type=int, default=50, help="timed executions per scenario")
+    parser.add_argument("--alloc-runs", type=int, default=5, help="executions traced with tracemalloc")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated model latency in ms")
+    parser.add_argument("--micro-repeat", type=int, default=2000, help="calls per micro benchmark, 0 skips them")
+    parser.add_argument("--only", default=None, help="run scenarios whose name contains this text")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument("--baseline", default=None, help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    failures = contract_checks()
+    for failure in failures:
+        print(f"CHECK FAILED {failure}")
+
+    results = {"latency_ms": args.latency, "scenarios": {}, "micro_ns": {}}
+    print(f"{'scenario':<34}{'runs/s':>10}{'steps/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>10}{'kept KiB':>10}")
+    for name, build in scenarios(args.latency / 1e3).items():
+        if args.only and args.only not in name:
+            continue
+        result = run_scenario(build, args.runs, args.alloc_runs)
+        results["scenarios"][name] = result
+        print(f"{name:<34}{result['runs_per_s']:>10.1f}{result['steps_per_s']:>10.1f}{result['p50_ms']:>10.3f}"
+              f"{result['p99_ms']:>10.3f}{result['peak_kib']:>10.1f}{result['retained_kib']:>10.1f}")
+
+    if args.micro_repeat:
+        print()
+        for name, ns in micro_benchmarks(args.micro_repeat).items():
+            results["micro_ns"][name] = ns
+            print(f"{name:<34}{ns / 1e3:>10.2f} us/op")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions or failures else 0
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,266 @@
 import time
+import json
+import os
+import atexit
+import weakref
+import threading
+import itertools
+import contextvars
+from collections import deque
 from typing import List, Dict
 
+_ids = itertools.count(1)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class AgentLog:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attrs", "error",
+                 "_tracer", "_token")
+
+    def __init__(self, tracer, name: str, kind: str, attrs: Dict):
+        """
+        One timed span: an LLM call, parse, tool call, package call or sub-agent run.
+
+        Timings come from time.monotonic_ns(); spans opened inside another span on the same
+        thread (or in a copied context) record it as their parent.
+        """
+        parent = _current_span.get()
+        self.name = name
+        self.kind = kind
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attrs = attrs
+        self.error = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self._tracer = tracer
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start_ns = time.monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.monotonic_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self._tracer._record(self)
+        return False
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "kind": self.kind, "trace_id": self.trace_id, "span_id": self.span_id,
+                "parent_id": self.parent_id, "start_ns": self.start_ns, "end_ns": self.end_ns,
+                "duration_ns": self.end_ns - self.start_ns, "attrs": self.attrs, "error": self.error}
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JSONLExporter:
+    def __init__(self, path: str = "agent_trace.jsonl"):
+        self.path = path
+
+    def export(self, spans: List[AgentLog]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans))
+
+
+class OTLPFileExporter:
+    def __init__(self, path: str = "agent_trace.otlp.jsonl", service_name: str = "AgenEngine"):
+        """
+        Writes one OTLP/JSON ExportTraceServiceRequest per batch, as read by the OpenTelemetry
+        collector's file receiver. Monotonic timings are shifted onto the wall clock.
+        """
+        self.path = path
+        self.service_name = service_name
+        self._offset_ns = time.time_ns() - time.monotonic_ns()
+
+    @staticmethod
+    def _value(value) -> Dict:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def export(self, spans: List[AgentLog]):
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": f"{span.trace_id:032x}",
+                "spanId": f"{span.span_id:016x}",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns + self._offset_ns),
+                "endTimeUnixNano": str(span.end_ns + self._offset_ns),
+                "attributes": [{"key": key, "value": self._value(value)}
+                               for key, value in dict(span.attrs, kind=span.kind).items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id is not None:
+                otlp_span["parentSpanId"] = f"{span.parent_id:016x}"
+            otlp_spans.append(otlp_span)
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "AgenEngine.callback"}, "spans": otlp_spans}],
+        }]}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request) + "\n")
+
+
+def _flush_in_background(tracer_ref, wake: threading.Event):
+    # Holds the tracer only while flushing, so an unused tracer can still be collected
+    while True:
+        wake.wait()
+        wake.clear()
+        tracer = tracer_ref()
+        if tracer is None:
+            return
+        tracer.flush()
+        del tracer
+
+
+def _export_at_exit(tracer_ref):
+    tracer = tracer_ref()
+    if tracer is not None:
+        tracer.export()
+
+
+class Tracer:
+    def __init__(self, exporter=None, enabled: bool = True, batch_size: int = 512, max_buffer: int = 65536):
+        """
+        Collects finished spans in an in-memory ring buffer and hands them to the exporter in batches.
+
+        Recording a span is a deque append (atomic under the GIL, no lock). Once batch_size spans are
+        waiting, a background thread exports them, so the threads recording spans never do file IO.
+        flush() and export() export synchronously; export() runs at the end of every AgentExecutor
+        run and at interpreter exit. When disabled, span() returns a shared no-op span.
+
+        Args:
+            exporter: Object with export(spans), e.g. JSONLExporter or OTLPFileExporter; None keeps spans in memory.
+            enabled (bool): Whether spans are recorded at all.
+            batch_size (int): Spans collected before an export.
+            max_buffer (int): Buffer capacity; the oldest spans are dropped when exports fall behind.
+        """
+        self.exporter = exporter
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.buffer = deque(maxlen=max_buffer)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._start_lock = threading.Lock()
+        if exporter is not None:
+            atexit.register(_export_at_exit, weakref.ref(self))
+
+    def span(self, name: str, kind: str = "internal", **attrs):
+        if not self.enabled:
+            return NOOP_SPAN
+        return AgentLog(self, name, kind, attrs)
+
+    def _record(self, span: AgentLog):
+        self.buffer.append(span)
+        if self.exporter is not None and len(self.buffer) >= self.batch_size:
+            if self._flusher is None:
+                self._start_flusher()
+            self._wake.set()
+
+    def _start_flusher(self):
+        with self._start_lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=_flush_in_background, args=(weakref.ref(self), self._wake),
+                                             name="tracer-flush", daemon=True)
+            self._flusher.start()
+            # Wakes the thread when the tracer is collected so it can exit
+            weakref.finalize(self, self._wake.set)
+
+    def export(self):
+        """
+        Export the buffered spans when there is an exporter; without one they stay buffered for flush().
+        """
+        if self.exporter is not None:
+            self.flush()
+
+    def flush(self, wait: bool = True) -> List[AgentLog]:
+        """
+        Drain the buffer, export the drained spans and return them.
+
+        Args:
+            wait (bool): Wait for an export running on another thread, so no span is left behind;
+                False returns [] right away instead.
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return []
+        try:
+            spans = []
+            while True:
+                try:
+                    spans.append(self.buffer.popleft())
+                except IndexError:
+                    break
+            if spans and self.exporter is not None:
+                self.exporter.export(spans)
+            return spans
+        finally:
+            self._flush_lock.release()
+
+
 class CallbackHandler:
     anchore = time.time()
-    def __init__(self,frame,event_t):
+    def __init__(self,frame=None,event_t=None,tracer:Tracer=None):
         self.frame = frame
         self.et = event_t
-        self._pass = True 
+        self._pass = True
+        self.tracer = tracer if tracer is not None else Tracer(enabled=os.environ.get("AGENENGINE_TRACE") == "1")
 
     def timestamp(self,anchore=None):
         if anchore is None:
             anchore = self.anchore
         return int((time.time() - anchore)*10)/10
 
+    def span(self, name: str, kind: str = "internal", **attrs):
+        return self.tracer.span(name, kind, **attrs)
+
     def tool_response(self,tool,inputs,error) -> Dict:
-        pas
+        name = getattr(tool, "name", tool)
+        return {'action': name, 'input': inputs, 'response': f"Error: {error}"}
 
     def package_response(self,tool,inputs,error) -> Dict:
-        pass
+        name = " : ".join(tool) if isinstance(tool, (list, tuple)) else tool
+        return {'action': name, 'input': inputs, 'response': f"Error: {error}"}
 
     def time_anchore(self,):
         self.anchore = time.time()
 
-    
+    def flush(self):
+        return self.tracer.flush()
 
+    def export(self):
+        self.tracer.export()
@@ -0,0 +1,20 @@
+from GIt.tools.base_tool import BaseTool
+
+
+def simple_addition(a:int="first digit",b:int="second digit") -> int:
+    return a + b
+
+def simple_subtraction(a:int="first digit",b:int="second digit") -> int:
+    return a - b
+
+
+simple_addition_ = BaseTool(description="simple addition",
+                           name="simple_addition",
+                           function=simple_addition,
+                           pure=True,
+                           )
+simple_subtraction_ = BaseTool(description="simple subtraction",
+                           name="simple_subtraction",
+                           function=simple_subtraction,
+                           pure=True,
+                           )
@@ -1,12 +1,9 @@
 from GIt.tools.package_tool import PACKAGES
-from GIt.tools.base_tool import BaseTool
-from GIt.tools.tool_manager import PackageVal, ToolVal
-from pywinauto.application import Application
-from pywinauto import Desktop
-import win32gui
-import inspect
 from typing import Dict, List
 
+# pywinauto and win32gui are Windows-only and slow to import; every tool imports what it needs when
+# it is first called, so the package can be registered (and its schema read) anywhere.
+
 
 class GuiOp(PACKAGES):
     NAME : str = "Guitools"
@@ -14,6 +11,9 @@ class GuiOp(PACKAGES):
     DEFAULT_ARGUS : Dict = {}
 
     def t_inspect_current_app(self,description="It gives information of active window"):
+        import win32gui
+        from pywinauto.application import Application
+
         window_handle = win32gui.GetForegroundWindow()
 
         if window_handle == 0:
@@ -33,6 +33,8 @@ class GuiOp(PACKAGES):
 
     def t_inspect_desktop_window(self,description:str="It inspects running windows",
                                  window_title : str = "title of window"):
+        from pywinauto import Desktop
+
         desktop = Desktop(backend="uia")
         window = desktop.window(title=window_title)
 
@@ -46,6 +48,8 @@ class GuiOp(PACKAGES):
         return active_gui
 
     def t_list_desktop_windows(self,description="It gives currently activated windows"):
+        from pywinauto import Desktop
+
         windows = Desktop(backend="uia").windows()
         list_ = "Open Windows on Desktop:"
         for i, window in enumerate(windows):
@@ -1,13 +1,27 @@
 import time
-from turtledemo.sorting_animate import instructions1
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from GIt.agents import BaseAgent
+from GIt.agents.agents import ActionStreamParser
 from GIt.agents.agentval import AgentVal
-from GIt.tools.tool_manager import ToolVal,PackageVal
+from GIt.agents.multi_agent import MultiAgentOrchestrator
+from GIt.agents.memory import ObservationScope, ObservationStore, TokenBudgetMemory, approx_tokens
+from GIt.tools.tool_manager import ToolOverlay, ToolVal, PackageVal
+from GIt.tools.validation import ToolArgumentError
+from GIt.tools.execution import ToolTimeoutError
+from GIt.models.models import LLMFramework
+from GIt.models.resilience import GenerationError, ResilientLLM
+from GIt.models.router import routing
+from GIt.speculation import Speculator
+from GIt.records import ObservationRecord, StepRecord, json_default
 from typing import *
 import re
 import json
 from GIt.callback import CallbackHandler, AgentLog
+from GIt.session_store import SessionStore
 import logging
 
 logging.basicConfig(level=logging.ERROR,filename='action_error',filemode='a')
@@ -64,39 +78,50 @@ class AgentState:
                  max_iterations:int=5,
                  instruct_continuety:bool=True,
                  user_input:str="",
-                 history:List[Dict]=[],
+                 history:List[Dict]=None,
                  memory_limit:int=5,
+                 model:str="default",
+                 token_budget:int=None,
+                 tokenizer:Callable[[str], int]=approx_tokens,
+                 memory:TokenBudgetMemory=None,
+                 store:ObservationStore=None,
                  ):
         self.memory_limit = memory_limit
+        # The run's own view of the store: its refs resolve only here and are released by close()
+        self.observations = (store if store is not None else ObservationStore()).scope()
+        self.memory = memory if memory is not None else TokenBudgetMemory(turns=history, model=model,
+                                                                          budget=token_budget,
+                                                                          tokenizer=tokenizer,
+                                                                          max_turns=memory_limit,
+                                                                          store=self.observations)
         self.agent = agent
         self.iteration = 0
         self.anchore = time.time()
         self.max_ite = max_iterations
         self.instruction = instruct_continuety
         self.states = []
+        self.intermediate_state = []
+        previous = self.memory.render()
+        self._scratchpad = f"{previous}\nUser: {user_input}" if previous else f"User: {user_input}"
+        self._rendered = 0
         self.gate = True
-        self.hustory = history
+        self.stopped = False
         self.user_input = user_input
 
     def should_continue(self):
-        if self.instruction:
-            gate = True
-            mid_cont = int(0.7*self.max_ite)
-            if mid_cont - self.interation > 0:
-                instruction = f"You have {self.iteration - mid_cont} only iteration steps left to converge to solution"
-            elif mid_cont - self.iteration == 0:
-                instruction = f"You should converge!"
-            elif self.max_ite - self.iteration >= 1:
-                instruction = f"You must converge in this step!"
-            else :
-                instruction = f"!!Stopping!!"
-            return instruction, gate
+        gate = self.iteration < self.max_ite
+        if not self.instruction:
+            return "", gate
+        mid_cont = int(0.7*self.max_ite)
+        if mid_cont - self.iteration > 0:
+            instruction = f"You have {self.max_ite - self.iteration} only iteration steps left to converge to solution"
+        elif mid_cont - self.iteration == 0:
+            instruction = f"You should converge!"
+        elif self.max_ite - self.iteration >= 1:
+            instruction = f"You must converge in this step!"
         else :
-            if self.max_ite - self.iteration < 0:
-                gate = False
-            else :
-                gate = True
-            return gate
+            instruction = f"!!Stopping!!"
+        return instruction, gate
 
     def timestamp(self,anchore=None) -> int:
         if anchore is None:
@@ -104,31 +129,56 @@ class AgentState:
         return int((time.time() - anchore)*10)/10
 
     def stop(self):
-        pass
+        self.stopped = True
+        self.gate = False
+
+    def close(self):
+        """
+        Release the run's stored observations; previews rendered afterwards show them as evicted.
+        """
+        self.observations.close()
     
     def s_step(self):
         pass
 
-    def agent_scratchpad() -> Dict:
-        return {}
+    def agent_scratchpad(self) -> str:
+        # Only observations added since the last call are rendered
+        new_states = self.intermediate_state[self._rendered:]
+        if new_states:
+            self._scratchpad += "\n" + "\n".join(self._render_state(state) for state in new_states)
+            self._rendered = len(self.intermediate_state)
+        return self._scratchpad
     
-    def update(self,action) -> None:
+    def scratchpad_with(self, states: List[Dict]) -> str:
+        """
+        The scratchpad as it would read with these observations added, leaving the state untouched.
+        """
+        current = self.agent_scratchpad()
+        if not states:
+            return current
+        return current + "\n" + "\n".join(self._render_state(state) for state in states)
+
+    def _render_state(self, state: Dict) -> str:
+        # Long observations stay in the memory store; the prompt only gets a preview
+        if "Observation" in state:
+            state = dict(state, Observation=self.memory.preview(state["Observation"]))
+        return json.dumps(state, default=json_default)
+
+    def update(self, actions, step: bool = True) -> None:
         self.iteration += 1
         cont_inst, gate = self.should_continue()
-        step = {'ite':self.iteration,'action_type':action.type,
-                'action_name':action.name,'action':action.output,
-                'timestamp':self.timestamp(),'should_continue':cont_inst}
-        self.states.append(step)
+        for action_type, action_name, action_input in actions:
+            self.states.append(StepRecord(self.iteration, action_type, action_name, action_input,
+                                          self.timestamp(), cont_inst))
+        self.gate = gate and step and not self.stopped
 
     def history(self) -> List:
-        if not self.history:
-            history = self.history.append({'called':0,'user':self.user_input,"agent":self.states[-1]['action'],'time':time.localtime()})
-            return history
-        else:
-            prev = self.history[-1]
-            history = history.append({'called':prev['called']+1,'user':self.user_input,"agent":self.states[-1]['action'],'time':time.localtime()})
-            history = history[:self.memory_limit]
-            return history
+        """
+        Record this run's exchange and return the history that fits the memory's token budget.
+        """
+        if self.states:
+            self.memory.add(self.user_input, self.states[-1]['action'])
+        return self.memory.window()
     
     def final_response(self) -> Dict:
         user_input = self.user_input
@@ -229,20 +279,66 @@ class AgentExecutor:
                  packages: PackageVal,
                  callback: CallbackHandler,
                  agent_scheme: str,
+                 sub_agent_timeout: float = None,
+                 max_sub_agents: int = 8,
+                 session_store: SessionStore = None,
+                 memory_limit: int = 5,
+                 speculator: Speculator = None,
+                 observation_store: ObservationStore = None,
+                 observation_tool: bool = True,
+                 stream: bool = False,
+                 action_workers: int = 16,
                  ):
-        self.llm = llm
+        # A bare LLMFramework gets retries with backoff and a circuit breaker; pass a configured
+        # ResilientLLM for hedging and failover to other backends
+        self.llm = ResilientLLM(llm) if isinstance(llm, LLMFramework) else llm
         self.agents = agents
         self.tools = tools
         self.packages = packages
         self.agent_schema = agent_scheme
         self.default_callback = CallbackHandler()
+        self.callback = callback if callback is not None else self.default_callback
         self.agent_constructor = AgentConstructor(agents)
+        self.sub_agent_timeout = sub_agent_timeout
+        self.max_sub_agents = max_sub_agents
+        self.session_store = session_store
+        self.memory_limit = memory_limit
+        self.speculator = speculator
+        # Parallel tool actions of every run share one pool instead of a pool per run
+        self.action_workers = action_workers
+        self._action_pool = None
+        self._action_pool_lock = threading.Lock()
+        # Stream model calls and stop each one once its action block is closed
+        self.generation_options = {"until": ActionStreamParser} if stream else {}
+        self.observations = observation_store if observation_store is not None else ObservationStore()
+        # Prompts only show a preview of long observations; this tool lets the agent read the rest.
+        # It reads this executor's store only, so it is layered over the tools instead of added to
+        # a ToolVal other executors may share.
+        if observation_tool and isinstance(tools, ToolVal):
+            self.tools = ToolOverlay(tools, [self.observations.read_tool()])
+
+    def action_pool(self) -> ThreadPoolExecutor:
+        if self._action_pool is None:
+            with self._action_pool_lock:
+                if self._action_pool is None:
+                    self._action_pool = ThreadPoolExecutor(max_workers=self.action_workers,
+                                                           thread_name_prefix="action")
+        return self._action_pool
+
+    def close(self):
+        """
+        Shut down the shared action pool; a later run starts a new one.
+        """
+        with self._action_pool_lock:
+            pool, self._action_pool = self._action_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
 
     def agent_validation(self):
         """
         Validate the agents according to the agent_schema.
         """
-        if self.agent_schema == "multi_agent":
+        if "multi_agent" in self.agent_schema:
             schema = self.agent_schema["multi_agent"]
             head_agent_name = schema["head_agent"]
             sub_agents_names = schema["sub_agents"]
@@ -263,7 +359,7 @@ class AgentExecutor:
                 logger.error(f"Sub-agent validation failed: {e}")
                 return False
 
-        elif self.agent_schema == "single_agent":
+        elif "single_agent" in self.agent_schema:
             schema = self.agent_schema["single_agent"]
             agent_name = schema["agent"]
 
@@ -283,22 +379,15 @@ class AgentExecutor:
 
 
     def generate(self, prompt):
-        MAX_RETRIES = 3
-        retries = 0
-        while retries < MAX_RETRIES:
-            try:
-                output = self.model(prompt=prompt)
-                break
-            except KeyError as e:
-                print(f"Generation KeyError encountered: {e}. Retrying...")
-                retries += 1
-
-            except Exception as e:
-                print(f"Generation An error occurred: {e}. Retrying...")
-                retries += 1
-        else:
-            print("Maximum retries reached. Terminating execution.")
-            self.stop()
+        """
+        One model call for a step. Retries, backoff, hedging and failover happen in the ResilientLLM.
+
+        Raises:
+            GenerationError: Every backend failed; the caller stops the run.
+        """
+        with self.callback.span("llm", "llm", llm_type=getattr(self.llm, "llm_type", None)) as span:
+            output = self.llm.llm_gen(prompt=prompt, **self.generation_options)
+            span.set(prompt_tokens=approx_tokens(prompt), completion_tokens=approx_tokens(str(output)))
         return output
 
     def single_agent(self,singel_agent:str) -> BaseAgent:
@@ -309,183 +398,357 @@ class AgentExecutor:
 
         return agent
 
+    async def agenerate(self, prompt):
+        """
+        Async counterpart of generate; an LLM without allm_gen is called on a worker thread.
+        """
+        with self.callback.span("llm", "llm", llm_type=getattr(self.llm, "llm_type", None)) as span:
+            if hasattr(self.llm, "allm_gen"):
+                output = await self.llm.allm_gen(prompt=prompt, **self.generation_options)
+            else:
+                output = await asyncio.to_thread(self.llm.llm_gen, prompt=prompt, **self.generation_options)
+            span.set(prompt_tokens=approx_tokens(prompt), completion_tokens=approx_tokens(str(output)))
+        return output
+
     def step(self,agent:BaseAgent
-             ,agent_state:AgentState):
+             ,agent_state:AgentState, sub_agents: AgentVal = None):
         agent_scratchpad = agent_state.agent_scratchpad()
-        user_input = agent_state.user_input
-        agent_history = agent_state.history()
-        
-        pass
+        prompt = agent.prompt(chain=agent_scratchpad)
+        try:
+            with routing(agent=agent.agent_name):
+                gen_output = self.generate(prompt)
+        except GenerationError as e:
+            return self.generation_failed(agent_state, e)
+        return self.parse_step(agent, gen_output, sub_agents)
+
+    @staticmethod
+    def generation_failed(agent_state: AgentState, error: GenerationError):
+        # The run ends with the error as its final output
+        logger.error(f"Generation failed, stopping the run: {error}")
+        agent_state.stop()
+        return [("final action", "generate", f"Error: {error}")]
+
+    def parse_step(self, agent: BaseAgent, gen_output: str, sub_agents: AgentVal = None):
+        """
+        Turn the model output of a step into (action_type, action_name, action_input) tuples.
+        """
+        validators = (self.tools, self.packages, sub_agents) if sub_agents is not None else (self.tools, self.packages)
+        with self.callback.span("parse", "parse", agent=agent.agent_name, output_chars=len(gen_output)) as span:
+            actions = agent._actions(gen_output, validators)
+            span.set(actions=len(actions))
+        return actions
+
+    @staticmethod
+    def record_sub_agents(agent_state: AgentState, results: List[Dict]):
+        for result in results:
+            agent_state.intermediate_state.append(ObservationRecord("agent action", "Agent", result['agent'],
+                                                                    input=result['input'], status=result['status'],
+                                                                    observation=result['output']))
 
     def s_call(self,
     agent: BaseAgent,
     agent_state: AgentState,
-    callback: CallbackHandler,
+    callback: CallbackHandler = None,
     ) -> AgentState:
             
-        action = Action(callback=callback)
+        action = Action(tools=self.tools, agents=self.agents, packages=self.packages,
+                        callback=callback or self.callback, store=self.observations, pool=self.action_pool())
 
-        while agent_state.gate:
+        # Tools of this run (read_observation, offloading) work on the run's observations
+        with agent_state.observations.active():
+            if self.speculator is not None:
+                return self._speculative_s_call(agent, agent_state, action)
+
+            while agent_state.gate:
+
+                actions = self.step(agent=agent, agent_state=agent_state)
+                _, step = action.actions_def(actions, agent_state.intermediate_state)
+                agent_state.update(actions, step)
 
-            step = self.step(scratchpad=agent_state.s_step(),agent=agent)
-            response = action.response(step,callback)
-            agent_state.update(response)
-        
         return agent_state
 
+    def _speculative_s_call(self, agent: BaseAgent, agent_state: AgentState, action: "Action") -> AgentState:
+        """
+        s_call with the speculator: while a step's tools run, the next model call may already start on
+        predicted observations, and likely read-only follow-up tool calls are prefetched.
+        """
+        speculator = self.speculator
+        previous = None
+        actions = self.step(agent=agent, agent_state=agent_state)
+        while True:
+            speculator.learn_transition(previous, actions)
+            speculator.prefetch(actions)
+            predicted = speculator.predict(actions) if agent_state.iteration + 1 < agent_state.max_ite else None
+
+            done = len(agent_state.intermediate_state)
+            start = time.perf_counter()
+            if predicted is None:
+                _, step = action.actions_def(actions, agent_state.intermediate_state)
+                speculative = None
+            else:
+                running = speculator.submit(action.actions_def, actions, agent_state.intermediate_state)
+                prompt = agent.prompt(chain=agent_state.scratchpad_with(predicted))
+                speculative = (prompt, speculator.submit(self._speculate, agent, prompt))
+                speculator.count("speculated")
+                _, step = running.result()
+            speculator.observe(actions, agent_state.intermediate_state[done:], time.perf_counter() - start, predicted)
+            agent_state.update(actions, step)
+            if not agent_state.gate:
+                return agent_state
+
+            previous = actions
+            if speculative is not None and speculative[0] == agent.prompt(chain=agent_state.agent_scratchpad()):
+                speculator.count("hits")
+                try:
+                    actions = self.parse_step(agent, speculative[1].result())
+                except GenerationError as e:
+                    actions = self.generation_failed(agent_state, e)
+                continue
+            if speculative is not None:
+                # Wrong guess: the speculative output is dropped
+                speculator.count("misses")
+            actions = self.step(agent=agent, agent_state=agent_state)
+
+    def _speculate(self, agent: BaseAgent, prompt: str):
+        with routing(agent=agent.agent_name), self.callback.span("speculate", "llm", agent=agent.agent_name):
+            return self.generate(prompt)
+
     def m_call(self,
                 head_agent: BaseAgent,
-                sub_agents: BaseAgent,
+                sub_agents: List[BaseAgent],
                 agent_state: AgentState,
-                callback: CallbackHandler) -> AgentState:
-
-        action = Action(callback=callback)
-
-        while agent_state.gate:
-            step = self.step(scratchpad=agent_state.s_step(),agent=head_agent)
-            response = action.response(step)
-
-            if response['action'] == 'agent_call':
-                try :
-                    sub_agent = self.agents.agent_retrieval(response['agent'])
-                    sub_callback = CallbackHandler()
-                    subagent_state = AgentState(agent=sub_agent,callback=callback)
-                    subagent_state = self.s_call(agent=sub_agent,
-                                                      agent_state=agent_state,
-                                                      callback=callback)
-                    response = subagent_state.final_output()
-                except KeyError as ke:
-                    logger.error(f"Agent not found : {ke}")
-                    response = callback.agentcall_response(agent=response['agent'],inputs=response['inputs'],error=ke)
-                agent_state.update(response)         
-            else : 
-                step = self.step(scratchpad=agent_state.s_step())
-                response = action.response(step,callback)
-                agent_state.update(response)
+                callback: CallbackHandler = None) -> AgentState:
+
+        action = Action(tools=self.tools, agents=self.agents, packages=self.packages,
+                        callback=callback or self.callback, store=self.observations, pool=self.action_pool())
+        sub_agent_val = AgentVal(sub_agents)
+        orchestrator = MultiAgentOrchestrator(self, sub_agent_val,
+                                              max_workers=self.max_sub_agents,
+                                              timeout=self.sub_agent_timeout)
+        try:
+            with agent_state.observations.active():
+                while agent_state.gate:
+                    actions = self.step(agent=head_agent, agent_state=agent_state, sub_agents=sub_agent_val)
+                    agent_actions = [a for a in actions if a[0] == "agent action"]
+                    other_actions = [a for a in actions if a[0] != "agent action"]
+
+                    # Independent sub-agent calls of one head step run side by side
+                    if agent_actions:
+                        results = orchestrator.dispatch([(name, agent_input) for _, name, agent_input in agent_actions])
+                        self.record_sub_agents(agent_state, results)
+                    step = True
+                    if other_actions:
+                        _, step = action.actions_def(other_actions, agent_state.intermediate_state)
+                    agent_state.update(actions, step)
+        finally:
+            orchestrator.shutdown()
 
         return agent_state
 
     def execute(self,
                  user_input: str,
-                   history: List[Dict]):
+                   history: List[Dict] = None,
+                   session_id: str = None):
+        """
+        Run the agents on one user input.
+
+        With a session_store and session_id, the history is resumed from the store when not given,
+        and the run's steps and exchange are appended to the session afterwards, so callers do not
+        have to resend the conversation.
+        """
 
-        if self.agent_validation():
+        agents, agent_state = self.prepare(user_input, history, session_id)
+        try:
+            if "multi_agent" in self.agent_schema:
+                agent_state = self.m_call(agents["head_agent"], agents["sub_agents"], agent_state, self.callback)
+            else:
+                agent_state = self.s_call(agent=agents["agent"], agent_state=agent_state, callback=self.callback)
+            return self.finish(agent_state, session_id)
+        finally:
+            agent_state.close()
+
+    def prepare(self, user_input: str, history: List[Dict] = None, session_id: str = None) -> Tuple[Dict, AgentState]:
+        """
+        Validate the agents and build the AgentState of a run, resuming the session history if needed.
+
+        Returns:
+            tuple: (agents, agent_state) where agents is AgentConstructor.get_agents() of the schema and
+                agent_state belongs to the head agent or the single agent.
+        """
+        if not self.agent_validation():
             raise ValueError("Agent validation failed.")
 
-        if self.agent_schema == "multi_agent":
-            agents = self.agent_constructor.get_agents(self.agent_schema)
-            head_agent = agents["head_agent"]
-            sub_agents = agents["sub_agents"]
-
-            callback = CallbackHandler()
-            agent_state = AgentState(agent=head_agent,
-                                            callback=callback,
-                                            sub_agents=sub_agents,
-                                              user_input=user_input,
-                                                history=history)
-
-            agent_state = self.m_call(head_agent, agent_state)
-            final_output = agent_state.final_response()
-            agent_history = agent_state.history()
-            return final_output, agent_history
-
-        elif self.agent_schema == "single_agent":
-            agents = self.agent_constructor.get_agents(self.agent_schema)
-            agent = agents["agent"]
-            
-            callback = CallbackHandler()
-            agent_state = AgentState(agent=agent, callback=callback, user_input=user_input, history=history)
+        if history is None and self.session_store is not None and session_id is not None:
+            history = self.session_store.turns(session_id, last=self.memory_limit)
 
-            agent_state = self.s_call(agent=agent, agent_state=agent_state, callback=callback)
-            final_output = agent_state.final_response()
-            return final_output, agent_state.history()
+        agents = self.agent_constructor.get_agents(self.agent_schema)
+        agent = agents["head_agent"] if "multi_agent" in self.agent_schema else agents["agent"]
+        agent_state = AgentState(agent=agent, callback=self.callback, user_input=user_input, history=history,
+                                 memory_limit=self.memory_limit, store=self.observations)
+        return agents, agent_state
 
-        else:
-            logger.error(f"Executor Schema not found: {self.agent_schema}")
-            return None    
+    def finish(self, agent_state: AgentState, session_id: str = None):
+        """
+        Final output and history of a finished run; the run is persisted to the session store.
+        """
+        final_output = agent_state.final_response()
+        agent_history = agent_state.history()
+        self.persist(session_id, agent_state)
+        # Short runs rarely fill an export batch; hand the run's spans to the exporter now
+        self.callback.export()
+        return final_output, agent_history
+
+    def persist(self, session_id: str, agent_state: AgentState):
+        if self.session_store is None or session_id is None or not agent_state.states:
+            return
+        self.session_store.append_states(session_id, agent_state.states)
+        self.session_store.append_turn(session_id, agent_state.memory.turns[-1])
 
 
 
 class Action:
+    # Action types that only touch tools/packages and can run side by side within one step
+    PARALLEL_ACTIONS = ("tool action", "package action")
+
     def __init__(self,
                  tools: ToolVal | None,
                  agents: AgentVal | None,
                  packages: PackageVal | None,
+                 max_workers: int = 8,
+                 callback: CallbackHandler = None,
+                 store: ObservationStore = None,
+                 pool: ThreadPoolExecutor = None,
                  ):
         self.tools = tools
         self.agents = agents
         self.packages = packages
+        self.max_workers = max_workers
+        self.callback = callback if callback is not None else CallbackHandler()
+        # Long tool and package outputs go to the store; intermediate_state keeps a handle
+        self.store = store
+        # A pool passed in is shared (e.g. the executor's across runs) and is not shut down here
+        self._pool = pool
+        self._owns_pool = pool is None
+
+    def actions_def(self, actions_, intermediate_state):
+        """
+        Run every action the agent requested in one step.
+
+        Tool and package actions are dispatched concurrently on a bounded thread pool, the rest run
+        on the caller's thread. Observations are appended to intermediate_state in the order the
+        agent listed the actions.
+
+        Args:
+            actions_ (list): (action_type, action_name, action_input) tuples from BaseAgent._actions.
+            intermediate_state (list): Observations of the current run.
+
+        Returns:
+            tuple: (intermediate_state, step) where step is False once a final action was taken.
+        """
+        if len(actions_) == 1:
+            return self.action_def(actions_[0], intermediate_state)
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="action")
+
+        pending = []
+        for action_ in actions_:
+            if action_[0] in self.PARALLEL_ACTIONS:
+                # Copy the context so tool spans keep the current step as their parent
+                pending.append(self._pool.submit(contextvars.copy_context().run, self.action_def, action_, []))
+            else:
+                pending.append(action_)
+
+        step = True
+        for item in pending:
+            if isinstance(item, Future):
+                observations, step_ = item.result()
+            else:
+                observations, step_ = self.action_def(item, [])
+            intermediate_state.extend(observations)
+            step = step and step_
+        return intermediate_state, step
+
+    def close(self):
+        if self._owns_pool and self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
 
     def action_def(self,action_,intermediate_state):
-        action_n, action_t, action = action_
+        action_t, action_n, action = action_
 
         step = True
-        if action_t == "Final Action":
+        if action_t == "final action":
             step = False
             observation = self.final_call(action)
-            intermediate_state.append({"Action_Type":action_t,"Action":action_n,"Observation":observation})
+            intermediate_state.append(ObservationRecord(action_t, "Action", action_n, observation=observation))
             return intermediate_state, step
 
-        elif action_t == "Default":
+        elif action_t == "default":
             observation = self.default_call(action_n, action)
-            intermediate_state.append({"Action_Type": action_t, "Action": action_n,"Input": action, "Observation": observation})
+            intermediate_state.append(ObservationRecord(action_t, "Action", action_n, input=action, observation=observation))
             return intermediate_state, step
 
-        elif action_t == "Agent Action":
-            name,action = self.agent_call(action_n,action)
-            return self.agent_call(action_n, action), step
+        elif action_t == "agent action":
+            intermediate_state.append(ObservationRecord(action_t, "Agent", action_n, input=action))
+            return intermediate_state, step
 
-        elif action_t == "Package Action":
+        elif action_t == "package action":
             package,tool = action_n
             observation = self.package_call(package,tool,action)
-            intermediate_state.append({"Action_Type" : action_t, "Tool" : action_n,"Input": action, "Observation" : observation})
+            observation = self.offload(observation)
+            intermediate_state.append(ObservationRecord(action_t, "Tool", action_n, input=action, observation=observation))
             #print(intermediate_state)
             return intermediate_state, step
 
-        elif action_t == "Tool Action":
+        elif action_t == "tool action":
             observation = self.tool_call(action_n, action)
-            intermediate_state.append({"Action_Type": action_t, "Tool": action_n,"Input": action, "Observation": observation})
+            observation = self.offload(observation)
+            intermediate_state.append(ObservationRecord(action_t, "Tool", action_n, input=action, observation=observation))
             return intermediate_state, step
 
+    def offload(self, observation):
+        # The scope of the AgentState being run when there is one, so the observation belongs to its run
+        store = ObservationScope.current()
+        if store is None:
+            store = self.store
+        return observation if store is None else store.offload(observation)
+
     def tool_call(self, name, action: dict):
-        tool = self.tools.tool_retrival(name)
-        tool_args = self.tools.tool_arguments(name)
+        with self.callback.span("tool", "tool", tool=name):
+            return self._tool_call(name, action)
+
+    def _tool_call(self, name, action: dict):
         try:
-            if tool_args.keys() == action.keys():
-                try:
-                   observation = tool.run(action)
-                except Exception as e:
-                    print(f"tool call error {e}. [line : 293]")
-                    observation = f"Not able to run this tool."
-                return str(observation)
-            else:
-                raise KeyError("Argument Mismatched Given by Agent")
+            observation = self.tools.run(name, action)
+        except ToolArgumentError as e:
+            logger.error(f"Tool Arguments Error : {e}")
+            return f"Tool Arguments not matched - Reconsider. {e}"
+        except ToolTimeoutError as e:
+            logger.error(f"Tool Timeout : {e}")
+            observation = f"Tool timed out - Reconsider. {e}"
         except Exception as e:
-            print(f"{e} [line : 299]")
-            observation = "Tool Arguments not matched - Reconsider"
+            logger.error(f"tool call error {e}")
+            observation = f"Not able to run this tool."
+        return str(observation)
 
     def package_call(self,package,tool,action : Dict):
-        package_ = self.packages.package_retrival(package)
-        action_keys = list(action.keys())
-        if len(action_keys) == 0:
-            tool_args = {}
-            action = None
-        else :
-            tool_args = self.packages.tool_args(package_, tool)
-        try :
-            if tool_args == action_keys or action is None:
-                try:
-                   observation = package_().call(tool,action)
-                except Exception as e:
-                    print(f"package call error {e}. [line : 311]")
-                    observation = "Not able to run this app."
-
-                return  observation
-            else :
-                raise KeyError('Arguments are not matched!!')
-        except KeyError as e:
-            print("package call error. [line 318]")
-            observation = "Arguments not matched - Reconsider"
+        with self.callback.span("package", "package", package=package, tool=tool):
+            return self._package_call(package, tool, action)
+
+    def _package_call(self,package,tool,action : Dict):
+        try:
+            observation = self.packages.call(package, tool, action or None)
+        except ToolArgumentError as e:
+            logger.error(f"Package Arguments Error : {e}")
+            observation = f"Arguments not matched - Reconsider. {e}"
+        except ToolTimeoutError as e:
+            logger.error(f"Package Timeout : {e}")
+            observation = f"Tool timed out - Reconsider. {e}"
+        except Exception as e:
+            logger.error(f"package call error {e}")
+            observation = "Not able to run this app."
+        return observation
 
     def agent_call(self, name, action):
         return name, action
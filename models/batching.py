@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn: Callable[[str, List[str]], List[str]], window: float = 0.01,
+                 max_batch_size: int = 16, max_inflight_batches: int = 4):
+        """
+        Collect prompts from concurrent callers and send them to the model server as batches.
+
+        A batch for a model is flushed when it reaches max_batch_size or when window seconds have
+        passed since its first prompt arrived. Identical prompts already waiting or in flight share
+        one request and one result.
+
+        Args:
+            batch_fn (callable): batch_fn(model, prompts) -> list of outputs in the same order; an
+                exception in place of an output fails only that prompt's future.
+            window (float): Seconds to wait for more prompts before flushing a partial batch.
+            max_batch_size (int): Largest number of prompts sent in one call.
+            max_inflight_batches (int): Batches allowed to run against the server at the same time.
+        """
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[str]] = {}
+        self._opened: Dict[str, float] = {}
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_inflight_batches, thread_name_prefix="llm-batch")
+        self._closed = False
+        self._worker = None
+        self.batches = 0
+        self.requests = 0
+        self.coalesced = 0
+
+    def submit(self, model: str, prompt: str) -> Future:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed.")
+            self.requests += 1
+            key = (model, prompt)
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+
+            future = Future()
+            self._inflight[key] = future
+            pending = self._pending.setdefault(model, [])
+            if not pending:
+                self._opened[model] = time.monotonic()
+            pending.append(prompt)
+
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+            return future
+
+    def generate(self, model: str, prompt: str, timeout: float = None) -> str:
+        return self.submit(model, prompt).result(timeout=timeout)
+
+    async def agenerate(self, model: str, prompt: str) -> str:
+        return await asyncio.wrap_future(self.submit(model, prompt))
+
+    def _run(self):
+        with self._cond:
+            while not self._closed or self._pending:
+                now = time.monotonic()
+                wait = None
+                for model in list(self._pending):
+                    prompts = self._pending[model]
+                    deadline = self._opened[model] + self.window
+                    if len(prompts) >= self.max_batch_size or now >= deadline or self._closed:
+                        batch = prompts[:self.max_batch_size]
+                        rest = prompts[self.max_batch_size:]
+                        if rest:
+                            self._pending[model] = rest
+                            self._opened[model] = now
+                        else:
+                            del self._pending[model]
+                            del self._opened[model]
+                        self._pool.submit(self._dispatch, model, batch)
+                    else:
+                        remaining = deadline - now
+                        wait = remaining if wait is None else min(wait, remaining)
+                if self._pending and wait is None:
+                    continue
+                if not self._closed or self._pending:
+                    self._cond.wait(timeout=wait)
+
+    def _dispatch(self, model: str, prompts: List[str]):
+        self.batches += 1
+        try:
+            outputs = self.batch_fn(model, prompts)
+            if len(outputs) != len(prompts):
+                raise ValueError(f"Batch returned {len(outputs)} outputs for {len(prompts)} prompts.")
+        except Exception as e:
+            outputs = None
+            error = e
+
+        with self._cond:
+            futures = [self._inflight.pop((model, prompt)) for prompt in prompts]
+        for i, future in enumerate(futures):
+            if outputs is None:
+                future.set_exception(error)
+            elif isinstance(outputs[i], BaseException):
+                future.set_exception(outputs[i])
+            else:
+                future.set_result(outputs[i])
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "mean_batch_size": (self.requests - self.coalesced) / self.batches if self.batches else 0.0
+        }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+        self._pool.shutdown(wait=True)
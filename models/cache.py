@@ -0,0 +1,252 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Tuple
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries: int = 1024, ttl: float = None):
+        """
+        In-process LRU store with optional time-to-live.
+
+        Args:
+            max_entries (int): Entries kept before the least recently used one is evicted.
+            ttl (float): Seconds an entry stays valid, None keeps entries until evicted.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, created = entry
+            if self.ttl is not None and time.monotonic() - created > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    EVICT_EVERY = 64
+
+    def __init__(self, path: str = "llm_cache.sqlite", max_entries: int = 100000, ttl: float = None):
+        """
+        On-disk LRU store so cached responses survive across runs.
+
+        Args:
+            path (str): SQLite database file, ":memory:" for a throwaway store.
+            max_entries (int): Rows kept before the least recently used ones are evicted.
+            ttl (float): Seconds an entry stays valid, None keeps entries until evicted.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._writes += 1
+            # Trimming scans the accessed index, so only do it every EVICT_EVERY writes
+            if self._writes % self.EVICT_EVERY == 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class SemanticCache:
+    def __init__(self, embed: Callable[[str], List[float]], threshold: float = 0.95, max_entries: int = 512,
+                 ttl: float = None):
+        """
+        Similarity tier: returns a stored response when a new prompt embeds close to a cached one.
+
+        Args:
+            embed (callable): Maps a prompt to an embedding vector.
+            threshold (float): Minimum cosine similarity counted as a hit.
+            max_entries (int): Vectors kept per scope before the least recently used one is evicted.
+            ttl (float): Seconds an entry stays valid, None keeps entries until evicted.
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # scope -> OrderedDict of prompt -> (vector, value, created), least recently used first
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Tuple[float, ...]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return tuple(x / norm for x in vector)
+
+    def get(self, scope: tuple, prompt: str):
+        if scope not in self._scopes:
+            return None
+        query = self._normalize(self.embed(prompt))
+        best, best_key, best_score = None, None, self.threshold
+        now = time.monotonic()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                return None
+            expired = []
+            for key, (vector, value, created) in entries.items():
+                if self.ttl is not None and now - created > self.ttl:
+                    expired.append(key)
+                    continue
+                score = sum(a * b for a, b in zip(query, vector))
+                if score >= best_score:
+                    best, best_key, best_score = value, key, score
+            for key in expired:
+                del entries[key]
+            if best_key is not None:
+                entries.move_to_end(best_key)
+        return best
+
+    def set(self, scope: tuple, prompt: str, value: str):
+        vector = self._normalize(self.embed(prompt))
+        with self._lock:
+            entries = self._scopes.setdefault(scope, OrderedDict())
+            entries[prompt] = (vector, value, time.monotonic())
+            entries.move_to_end(prompt)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+
+
+class ResponseCache:
+    def __init__(self, backend=None, semantic: SemanticCache = None):
+        """
+        Cache in front of LLMFramework.llm_gen.
+
+        Exact hits are keyed on (llm_type, model, temperature, prompt). When a SemanticCache is
+        given, exact misses fall back to a similarity lookup within the same llm_type/model/temperature.
+
+        Args:
+            backend: Exact-match store, MemoryCacheBackend (default) or SQLiteCacheBackend.
+            semantic (SemanticCache): Optional embedding-similarity tier.
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.semantic = semantic
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(llm_type: str, model: str, temperature: float, prompt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (llm_type, model, repr(temperature), prompt):
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, llm_type: str, model: str, temperature: float, prompt: str):
+        value = self.backend.get(self.key(llm_type, model, temperature, prompt))
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.semantic is not None:
+            value = self.semantic.get((llm_type, model, temperature), prompt)
+            if value is not None:
+                self.semantic_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, llm_type: str, model: str, temperature: float, prompt: str, value: str):
+        self.backend.set(self.key(llm_type, model, temperature, prompt), value)
+        if self.semantic is not None:
+            self.semantic.set((llm_type, model, temperature), prompt, value)
+
+    def clear(self):
+        self.backend.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "entries": len(self.backend)
+        }
@@ -1,11 +1,37 @@
-import google
-import openai
-import groq
-import ollama
+import asyncio
+import contextvars
+import importlib
+import inspect
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from GIt.models.batching import MicroBatcher
+
+# Provider SDK behind each llm_type. They are imported on first use, so a worker only pays for the
+# SDKs of the backends it actually calls.
+BACKEND_MODULES = {
+    "openai": "openai",
+    "genai": "google.generativeai",
+    "groq": "groq",
+    "ollama": "ollama",
+}
+
+
+# Set by ResilientLLM around its calls: provider errors are raised instead of being returned as
+# "Error: ..." text, so they can be classified, retried or failed over
+RAISE_ERRORS = contextvars.ContextVar("raise_errors", default=False)
+
+
+def backend_module(llm_type: str):
+    """
+    Import (once) and return the SDK module of a backend.
+    """
+    return importlib.import_module(BACKEND_MODULES[llm_type])
 
 class LLMFramework:
     def __init__(self, llm_type: str = "openai", api_key: str = None, temperature: float = 0.7, max_tokens: int = 150,
-                 top_p: float = 0.8, top_k: int = 40, gen_local: callable = None):
+                 top_p: float = 0.8, top_k: int = 40, gen_local: callable = None,
+                 max_concurrency=16, host: str = None, cache=None, batch_window: float = None,
+                 max_batch_size: int = 16, batch_gen_local: callable = None):
         """
         Initialize the framework with the specified LLM type.
 
@@ -17,6 +43,15 @@ class LLMFramework:
             top_p (float): Cumulative probability threshold for token sampling.
             top_k (int): Limits the range of possible next tokens.
             gen_local (callable): User-defined function for handling local LLM logic.
+            max_concurrency (int or dict): Limit of in-flight async requests per backend, either one
+                value for every backend or a mapping of llm_type to limit.
+            host (str): Server address for the ollama backend.
+            cache (ResponseCache): Optional response cache consulted before every llm_gen/allm_gen call.
+            batch_window (float): Seconds to collect concurrent "local"/"ollama" prompts into one batch,
+                None sends every prompt on its own.
+            max_batch_size (int): Largest batch sent to the model server.
+            batch_gen_local (callable): batch_gen_local(model_name, prompts) -> list of outputs, used to
+                send a whole batch to a local model server in one call.
         """
         self.llm_type = llm_type
         self.api_key = api_key
@@ -25,12 +60,26 @@ class LLMFramework:
         self.max_tokens = max_tokens
         self.top_p = top_p
         self.top_k = top_k
+        self.max_concurrency = max_concurrency
+        self.host = host
+        self.cache = cache
+        self.batch_gen_local = batch_gen_local
+        self.max_batch_size = max_batch_size
+        self._batch_pool = None
+        self.batcher = None
+        if batch_window is not None and llm_type in ("local", "ollama"):
+            self.batcher = MicroBatcher(self._batch_generate, window=batch_window, max_batch_size=max_batch_size)
+
+        # Async clients and semaphores are bound to the event loop that created them, so every loop
+        # gets its own pool; it is dropped with the loop and closed when asyncio.run() shuts it down
+        self._loop_pools = weakref.WeakKeyDictionary()
+        self._sync_clients = {}
 
         # Set API key based on LLM type
         if self.llm_type == "openai" and self.api_key:
-            openai.api_key = self.api_key
+            backend_module("openai").api_key = self.api_key
         elif self.llm_type == "genai" and self.api_key:
-            import google.generativeai as genai
+            genai = backend_module("genai")
             genai.configure(api_key=self.api_key)
 
     def local_llm(self, model_name: str, prompt: str) -> str:
@@ -51,23 +100,69 @@ class LLMFramework:
             # Default behavior (for demonstration or fallback)
             return f"Local LLM invoked with model '{model_name}' and prompt '{prompt}'."
 
-    def llm_gen(self, prompt: str, model: str = "default"):
+    def llm_gen(self, prompt: str, model: str = "default", until: callable = None):
         """
         Generate output based on the selected LLM type.
 
         Args:
             prompt (str): The input prompt for the LLM.
             model (str): Model to use if applicable (e.g., 'gpt-4' for OpenAI or 'text-bison-001' for GenAI).
+            until (callable): Stream the response and stop it early. Called once per request, it returns
+                a watcher with feed(chunk) -> True once generation can stop and the text received so far
+                as watcher.text, e.g. agents.ActionStreamParser. Batched calls are not streamed.
 
         Returns:
             str: Generated response from the selected LLM.
         """
+        if self.cache is not None:
+            cached = self.cache.get(self.llm_type, model, self.temperature, prompt)
+            if cached is not None:
+                return cached
+        if until is not None and self.batcher is None:
+            output = self._generate_until(prompt=prompt, model=model, until=until)
+        else:
+            output = self._generate(prompt=prompt, model=model)
+        self._cache_output(prompt, model, output)
+        return output
+
+    def _cache_output(self, prompt: str, model: str, output):
+        # Provider failures come back as "Error: ..." strings and must not be cached
+        if self.cache is not None and isinstance(output, str) and not output.startswith("Error:"):
+            self.cache.set(self.llm_type, model, self.temperature, prompt, output)
+
+    def _generation_failed(self, error: Exception) -> str:
+        # Error contract of the provider methods, for failures raised from streams and batches
+        if RAISE_ERRORS.get():
+            raise error
+        print(f"{self.llm_type} Error: {error}")
+        return f"Error: Unable to generate response from {self.llm_type}. Details: {error}"
+
+    def _generate_until(self, prompt: str, model: str, until: callable) -> str:
+        watcher = until()
+        stream = self._stream(prompt=prompt, model=model)
+        try:
+            for chunk in stream:
+                if watcher.feed(chunk):
+                    break
+        except Exception as e:
+            return self._generation_failed(e)
+        finally:
+            # Stops the provider from generating the rest
+            stream.close()
+        return watcher.text
+
+    def _generate(self, prompt: str, model: str):
+        if self.batcher is not None:
+            try:
+                return self.batcher.generate(model, prompt)
+            except Exception as e:
+                return self._generation_failed(e)
         if self.llm_type == "genai":
             return self.llm_genai(prompt=prompt, model=model)
         elif self.llm_type == "openai":
             return self.llm_openai(model=model, prompt=prompt)
         elif self.llm_type == "ollama":
-            return self.ollama(model=model, prompt=prompt)
+            return self.llm_ollama(model=model, prompt=prompt)
         elif self.llm_type == "groq":
             return self.groq(model=model, prompt=prompt)
         elif self.llm_type == "local":
@@ -89,17 +184,84 @@ class LLMFramework:
             str: The generated response from the model.
         """
         try:
-            response = openai.ChatCompletion.create(
+            response = self._sync_client("openai").chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature or self.temperature,
                 max_tokens=max_tokens or self.max_tokens
             )
-            return response['choices'][0]['message']['content']
+            return response.choices[0].message.content
         except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
             print(f"OpenAI API Error: {e}")
             return f"Error: Unable to generate response from OpenAI API. Details: {e}"
 
+    def llm_ollama(self, prompt: str, model: str, temperature: float = None, max_tokens: int = None,
+                   top_k: int = None, top_p: float = None):
+        """
+        Generate a response using an Ollama server.
+
+        Args:
+            prompt (str): The input prompt for the model.
+            model (str): The Ollama model to use (e.g., 'llama3').
+            temperature (float): Sampling temperature for randomness.
+            max_tokens (int): Maximum number of tokens for the response.
+            top_k (int): Limits the range of possible next tokens.
+            top_p (float): Limits the cumulative probability of token options.
+
+        Returns:
+            str: The generated response from the model.
+        """
+        try:
+            response = self._sync_client("ollama").generate(
+                model=model,
+                prompt=prompt,
+                options={
+                    "temperature": temperature or self.temperature,
+                    "num_predict": max_tokens or self.max_tokens,
+                    "top_k": top_k or self.top_k,
+                    "top_p": top_p or self.top_p
+                }
+            )
+            return response["response"]
+        except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
+            print(f"Ollama Error: {e}")
+            return f"Error: Unable to generate response from Ollama. Details: {e}"
+
+    def _batch_generate(self, model: str, prompts: list) -> list:
+        """
+        Send one batch collected by the MicroBatcher to the model server.
+
+        A batch mixes the prompts of several callers, so failures are never turned into error strings
+        here: each prompt that failed gets its exception, and _generate/_agenerate apply the error
+        contract of the caller that is waiting on it.
+        """
+        if self.llm_type == "local":
+            if self.batch_gen_local:
+                return list(self.batch_gen_local(model_name=model, prompts=prompts))
+            return [self._raising(self.local_llm, model_name=model, prompt=prompt) for prompt in prompts]
+
+        # Ollama has no batched generate endpoint; the batch goes out together over the pooled
+        # client and the server schedules the parallel requests as one batch (OLLAMA_NUM_PARALLEL).
+        if self._batch_pool is None:
+            self._batch_pool = ThreadPoolExecutor(max_workers=self.max_batch_size, thread_name_prefix="ollama")
+        return list(self._batch_pool.map(lambda prompt: self._raising(self.llm_ollama, model=model, prompt=prompt),
+                                         prompts))
+
+    @staticmethod
+    def _raising(call, **kwargs):
+        # Batch threads do not carry the callers' context; return the provider error instead of its string
+        token = RAISE_ERRORS.set(True)
+        try:
+            return call(**kwargs)
+        except Exception as e:
+            return e
+        finally:
+            RAISE_ERRORS.reset(token)
+
     def llm_genai(self, prompt: str, model: str = "models/text-bison-001", temperature: float = None,
                   max_tokens: int = None, top_k: int = None, top_p: float = None):
         """
@@ -117,7 +279,7 @@ class LLMFramework:
             str: The generated response from the GenAI model.
         """
         try:
-            import google.generativeai as genai
+            genai = backend_module("genai")
             response = genai.generate_text(
                 model=model,
                 prompt=prompt,
@@ -128,25 +290,444 @@ class LLMFramework:
             )
             return response.text
         except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
             print(f"Google GenAI Error: {e}")
             return f"Error: Unable to generate response from Google GenAI. Details: {e}"
         
-    def groq(self, prompt: str, model: str, temperature: float= None, 
+    def groq(self, prompt: str, model: str, temperature: float = None,
              max_tokens: int = None, top_k: int = None, top_p: float = None):
-        
-         """
+        """
         Generate a response using Groq Api.
 
         Args:
-            prompt (str): The input prompt for the GenAI model.
-            model (str): The GenAI model to use (e.g., 'models/text-bison-001').
+            prompt (str): The input prompt for the model.
+            model (str): The Groq model to use (e.g., 'llama3-8b-8192').
             temperature (float): Sampling temperature for randomness.
             max_tokens (int): Maximum number of tokens for the response.
-            top_k (int): Limits the range of possible next tokens.
+            top_k (int): Not supported by the Groq API, accepted for a uniform signature.
             top_p (float): Limits the cumulative probability of token options.
 
         Returns:
-            str:
+            str: The generated response from the model.
         """
-        
-        
+        try:
+            response = self._sync_client("groq").chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature or self.temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                top_p=top_p or self.top_p
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
+            print(f"Groq API Error: {e}")
+            return f"Error: Unable to generate response from Groq API. Details: {e}"
+
+    def _concurrency_limit(self, backend: str) -> int:
+        if isinstance(self.max_concurrency, dict):
+            return self.max_concurrency.get(backend, 16)
+        return self.max_concurrency
+
+    def _loop_pool(self) -> dict:
+        """
+        Async clients and semaphores of the running event loop, created on first use from that loop.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._loop_pools.get(loop)
+        if pool is None:
+            pool = {"clients": {}, "semaphores": {}}
+            # The loop finalizes async generators at shutdown (asyncio.run does); this one closes the
+            # loop's clients there so their connection pools are not leaked
+            pool["closer"] = closer = self._close_at_shutdown(pool["clients"])
+            self._advance(closer)
+            self._loop_pools[loop] = pool
+        return pool
+
+    @staticmethod
+    def _advance(closer):
+        # Runs the generator up to its yield right here, which registers it with the running loop;
+        # no task is involved, so none can be collected or outlive the loop
+        try:
+            closer.asend(None).send(None)
+        except StopIteration:
+            pass
+        except StopAsyncIteration:
+            # Already closed; nothing is left to finalize
+            pass
+
+    @staticmethod
+    async def _close_at_shutdown(clients: dict):
+        try:
+            yield
+        finally:
+            await LLMFramework._close_clients(clients)
+
+    @staticmethod
+    async def _close_clients(clients: dict):
+        for client in list(clients.values()):
+            close = getattr(client, "close", None) or getattr(client, "aclose", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Error closing {type(client).__name__}: {e}")
+        clients.clear()
+
+    def _semaphore(self, backend: str) -> asyncio.Semaphore:
+        semaphores = self._loop_pool()["semaphores"]
+        semaphore = semaphores.get(backend)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._concurrency_limit(backend))
+            semaphores[backend] = semaphore
+        return semaphore
+
+    def _async_client(self, backend: str, model: str = None):
+        """
+        Return the pooled async client for a backend, creating it on first use.
+
+        Args:
+            backend (str): LLM type the client belongs to.
+            model (str): Model name, only used by genai whose client object is per model.
+
+        Returns:
+            The async client kept alive across calls.
+        """
+        clients = self._loop_pool()["clients"]
+        key = (backend, model) if backend == "genai" else backend
+        client = clients.get(key)
+        if client is not None:
+            return client
+
+        if backend == "openai":
+            client = backend_module("openai").AsyncOpenAI(api_key=self.api_key)
+        elif backend == "groq":
+            client = backend_module("groq").AsyncGroq(api_key=self.api_key)
+        elif backend == "ollama":
+            client = backend_module("ollama").AsyncClient(host=self.host)
+        elif backend == "genai":
+            genai = backend_module("genai")
+            client = genai.GenerativeModel(model)
+        else:
+            raise ValueError(f"No async client for backend {backend}.")
+
+        clients[key] = client
+        return client
+
+    async def allm_gen(self, prompt: str, model: str = "default", until: callable = None):
+        """
+        Asynchronously generate output based on the selected LLM type.
+
+        Requests share one pooled client per backend and wait on the backend's concurrency limit,
+        so many agent sessions can be in flight on a single event loop.
+
+        Args:
+            prompt (str): The input prompt for the LLM.
+            model (str): Model to use if applicable.
+            until (callable): Watcher factory that stops a streamed response early, as in llm_gen.
+
+        Returns:
+            str: Generated response from the selected LLM.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.llm_type, model, self.temperature, prompt)
+            if cached is not None:
+                return cached
+        if until is not None and self.batcher is None:
+            output = await self._agenerate_until(prompt=prompt, model=model, until=until)
+        else:
+            output = await self._agenerate(prompt=prompt, model=model)
+        self._cache_output(prompt, model, output)
+        return output
+
+    async def _agenerate_until(self, prompt: str, model: str, until: callable) -> str:
+        watcher = until()
+        stream = self._astream(prompt=prompt, model=model)
+        try:
+            async for chunk in stream:
+                if watcher.feed(chunk):
+                    break
+        except Exception as e:
+            return self._generation_failed(e)
+        finally:
+            await stream.aclose()
+        return watcher.text
+
+    async def _agenerate(self, prompt: str, model: str):
+        if self.batcher is not None:
+            try:
+                return await self.batcher.agenerate(model, prompt)
+            except Exception as e:
+                return self._generation_failed(e)
+        async with self._semaphore(self.llm_type):
+            if self.llm_type == "genai":
+                return await self.allm_genai(prompt=prompt, model=model)
+            elif self.llm_type == "openai":
+                return await self.allm_openai(model=model, prompt=prompt)
+            elif self.llm_type == "ollama":
+                return await self.allm_ollama(model=model, prompt=prompt)
+            elif self.llm_type == "groq":
+                return await self.allm_groq(model=model, prompt=prompt)
+            elif self.llm_type == "local":
+                return await self.alocal_llm(model_name=model, prompt=prompt)
+            else:
+                return "Error: Unsupported LLM type."
+
+    async def allm_openai(self, model: str, prompt: str, temperature: float = None, max_tokens: int = None):
+        try:
+            client = self._async_client("openai")
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature or self.temperature,
+                max_tokens=max_tokens or self.max_tokens
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
+            print(f"OpenAI API Error: {e}")
+            return f"Error: Unable to generate response from OpenAI API. Details: {e}"
+
+    async def allm_genai(self, prompt: str, model: str = "models/text-bison-001", temperature: float = None,
+                         max_tokens: int = None, top_k: int = None, top_p: float = None):
+        try:
+            client = self._async_client("genai", model=model)
+            response = await client.generate_content_async(
+                prompt,
+                generation_config={
+                    "temperature": temperature or self.temperature,
+                    "max_output_tokens": max_tokens or self.max_tokens,
+                    "top_k": top_k or self.top_k,
+                    "top_p": top_p or self.top_p
+                }
+            )
+            return response.text
+        except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
+            print(f"Google GenAI Error: {e}")
+            return f"Error: Unable to generate response from Google GenAI. Details: {e}"
+
+    async def allm_groq(self, prompt: str, model: str, temperature: float = None, max_tokens: int = None,
+                        top_p: float = None):
+        try:
+            client = self._async_client("groq")
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature or self.temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                top_p=top_p or self.top_p
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
+            print(f"Groq API Error: {e}")
+            return f"Error: Unable to generate response from Groq API. Details: {e}"
+
+    async def allm_ollama(self, prompt: str, model: str, temperature: float = None, max_tokens: int = None,
+                          top_k: int = None, top_p: float = None):
+        try:
+            client = self._async_client("ollama")
+            response = await client.generate(
+                model=model,
+                prompt=prompt,
+                options={
+                    "temperature": temperature or self.temperature,
+                    "num_predict": max_tokens or self.max_tokens,
+                    "top_k": top_k or self.top_k,
+                    "top_p": top_p or self.top_p
+                }
+            )
+            return response["response"]
+        except Exception as e:
+            if RAISE_ERRORS.get():
+                raise
+            print(f"Ollama Error: {e}")
+            return f"Error: Unable to generate response from Ollama. Details: {e}"
+
+    async def alocal_llm(self, model_name: str, prompt: str) -> str:
+        """
+        Async counterpart of local_llm. Coroutine hooks are awaited directly, blocking hooks run on a worker thread.
+        """
+        if inspect.iscoroutinefunction(self.user_defined_gen_local):
+            return await self.user_defined_gen_local(model_name=model_name, prompt=prompt)
+        return await asyncio.to_thread(self.local_llm, model_name=model_name, prompt=prompt)
+
+    async def aclose(self):
+        """
+        Close the pooled async clients of the running event loop.
+        """
+        pool = self._loop_pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await self._close_clients(pool["clients"])
+            await pool["closer"].aclose()
+
+    def _sync_client(self, backend: str):
+        client = self._sync_clients.get(backend)
+        if client is not None:
+            return client
+        if backend == "openai":
+            client = backend_module("openai").OpenAI(api_key=self.api_key)
+        elif backend == "groq":
+            client = backend_module("groq").Groq(api_key=self.api_key)
+        elif backend == "ollama":
+            client = backend_module("ollama").Client(host=self.host)
+        else:
+            raise ValueError(f"No pooled client for backend {backend}.")
+        self._sync_clients[backend] = client
+        return client
+
+    def llm_stream(self, prompt: str, model: str = "default"):
+        """
+        Stream the generated output token by token from the selected LLM type.
+
+        Closing the returned generator (e.g. once the action block is complete) closes the
+        underlying response, so the provider stops generating. Provider errors end the stream with
+        an "Error: ..." chunk, like llm_gen's error strings.
+
+        Args:
+            prompt (str): The input prompt for the LLM.
+            model (str): Model to use if applicable.
+
+        Yields:
+            str: Text chunks as they are produced.
+        """
+        stream = self._stream(prompt=prompt, model=model)
+        try:
+            yield from stream
+        except Exception as e:
+            yield self._generation_failed(e)
+        finally:
+            stream.close()
+
+    def _stream(self, prompt: str, model: str = "default"):
+        if self.llm_type == "genai":
+            genai = backend_module("genai")
+            stream = genai.GenerativeModel(model).generate_content(
+                prompt,
+                stream=True,
+                generation_config={"temperature": self.temperature, "max_output_tokens": self.max_tokens,
+                                   "top_k": self.top_k, "top_p": self.top_p}
+            )
+            chunks = (chunk.text for chunk in stream)
+        elif self.llm_type == "openai":
+            stream = self._sync_client("openai").chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True
+            )
+            chunks = (chunk.choices[0].delta.content for chunk in stream if chunk.choices)
+        elif self.llm_type == "groq":
+            stream = self._sync_client("groq").chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                top_p=self.top_p,
+                stream=True
+            )
+            chunks = (chunk.choices[0].delta.content for chunk in stream)
+        elif self.llm_type == "ollama":
+            stream = self._sync_client("ollama").generate(
+                model=model,
+                prompt=prompt,
+                stream=True,
+                options={"temperature": self.temperature, "num_predict": self.max_tokens,
+                         "top_k": self.top_k, "top_p": self.top_p}
+            )
+            chunks = (chunk["response"] for chunk in stream)
+        elif self.llm_type == "local":
+            stream = self.local_llm(model_name=model, prompt=prompt)
+            chunks = [stream] if isinstance(stream, str) else stream
+        else:
+            yield "Error: Unsupported LLM type."
+            return
+
+        try:
+            for chunk in chunks:
+                if chunk:
+                    yield chunk
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    async def astream(self, prompt: str, model: str = "default"):
+        """
+        Async counterpart of llm_stream, using the pooled async clients and the backend concurrency limit.
+
+        Yields:
+            str: Text chunks as they are produced.
+        """
+        stream = self._astream(prompt=prompt, model=model)
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            yield self._generation_failed(e)
+        finally:
+            await stream.aclose()
+
+    async def _astream(self, prompt: str, model: str = "default"):
+        async with self._semaphore(self.llm_type):
+            if self.llm_type == "genai":
+                stream = await self._async_client("genai", model=model).generate_content_async(
+                    prompt,
+                    stream=True,
+                    generation_config={"temperature": self.temperature, "max_output_tokens": self.max_tokens,
+                                       "top_k": self.top_k, "top_p": self.top_p}
+                )
+                read = lambda chunk: chunk.text
+            elif self.llm_type in ("openai", "groq"):
+                stream = await self._async_client(self.llm_type).chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    stream=True
+                )
+                read = lambda chunk: chunk.choices[0].delta.content
+            elif self.llm_type == "ollama":
+                stream = await self._async_client("ollama").generate(
+                    model=model,
+                    prompt=prompt,
+                    stream=True,
+                    options={"temperature": self.temperature, "num_predict": self.max_tokens,
+                             "top_k": self.top_k, "top_p": self.top_p}
+                )
+                read = lambda chunk: chunk["response"]
+            elif self.llm_type == "local":
+                hook = self.user_defined_gen_local
+                if inspect.isasyncgenfunction(hook):
+                    stream = hook(model_name=model, prompt=prompt)
+                    read = lambda chunk: chunk
+                else:
+                    output = await self.alocal_llm(model_name=model, prompt=prompt)
+                    for chunk in ([output] if isinstance(output, str) else output):
+                        yield chunk
+                    return
+            else:
+                yield "Error: Unsupported LLM type."
+                return
+
+            try:
+                async for chunk in stream:
+                    text = read(chunk)
+                    if text:
+                        yield text
+            finally:
+                close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+                if close is not None:
+                    result = close()
+                    if inspect.isawaitable(result):
+                        await result
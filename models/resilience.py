@@ -0,0 +1,399 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from GIt.models.models import RAISE_ERRORS
+
+logger = logging.getLogger("ResilientLLM")
+
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+
+class GenerationError(RuntimeError):
+    """
+    Raised when no backend produced a response: all of them failed or had their circuit open.
+    """
+
+
+def _status(exc) -> Optional[int]:
+    for attr in ("status_code", "status", "http_status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    value = getattr(getattr(exc, "response", None), "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after(exc) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait (Retry-After header or a retry_after attribute), if any.
+    """
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if headers is not None:
+            value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc) -> str:
+    """
+    Sort a provider exception into "rate_limit", "transient" (worth retrying) or "fatal".
+
+    The HTTP status is used when the SDK exposes one (429 rate limit, 408/409/425/5xx transient, other 4xx
+    fatal); otherwise the exception class decides. Unknown errors count as transient.
+    """
+    status = _status(exc)
+    name = type(exc).__name__.lower()
+    if status == 429 or "ratelimit" in name or "resourceexhausted" in name:
+        return RATE_LIMIT
+    if status is not None:
+        return TRANSIENT if status in (408, 409, 425) or status >= 500 else FATAL
+    if isinstance(exc, (TimeoutError, ConnectionError)) or \
+            any(word in name for word in ("timeout", "connection", "unavailable", "internalserver", "overloaded")):
+        return TRANSIENT
+    if isinstance(exc, (ValueError, TypeError, KeyError, AttributeError, ImportError, NotImplementedError)):
+        return FATAL
+    return TRANSIENT
+
+
+class Backoff:
+    def __init__(self, base: float = 0.5, factor: float = 2.0, max_delay: float = 20.0,
+                 max_retry_after: float = 30.0):
+        """
+        Exponential backoff with full jitter.
+
+        Args:
+            base (float): Delay ceiling of the first retry in seconds.
+            factor (float): Growth of the ceiling per attempt.
+            max_delay (float): Largest ceiling.
+            max_retry_after (float): Longest Retry-After honored; a backend asking for more is failed over.
+        """
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base)
+        return random.uniform(0, min(self.max_delay, self.base * self.factor ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0):
+        """
+        Stops sending requests to a backend after failure_threshold consecutive failures. After
+        recovery_time one probe request is let through (half open); its outcome closes or reopens the circuit.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = "closed"
+        self.failures = 0
+        self._opened = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened >= self.recovery_time:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures.")
+                self.state = "open"
+                self._opened = time.monotonic()
+                self._probing = False
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        """
+        Sliding window of successful call latencies; percentiles are recomputed every 16 samples.
+        """
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._sorted = []
+        self._added = 0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self._added += 1
+        if self._added % 16 == 0 or len(self.samples) <= self.min_samples:
+            self._sorted = sorted(self.samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        ordered = self._sorted
+        if len(ordered) < self.min_samples:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Backend:
+    def __init__(self, llm, model: str, breaker: CircuitBreaker, min_samples: int):
+        self.llm = llm
+        self.model = model
+        self.name = f"{getattr(llm, 'llm_type', type(llm).__name__)}:{model or 'default'}"
+        self.breaker = breaker
+        self.latency = LatencyTracker(min_samples=min_samples)
+        self.stats = {"calls": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "skipped": 0}
+
+
+class ResilientLLM:
+    def __init__(self, primary, fallbacks: List = (), max_retries: int = 3, backoff: Backoff = None,
+                 hedge_percentile: float = None, hedge_min_samples: int = 20, max_hedges: int = 1,
+                 failure_threshold: int = 5, recovery_time: float = 30.0, hedge_workers: int = 16):
+        """
+        Generation layer over one or more LLMFramework backends, with the same llm_gen/allm_gen interface.
+
+        Each call goes to the first backend whose circuit is closed. Rate limits and transient errors are
+        retried with jittered exponential backoff, honoring Retry-After; fatal errors, exhausted retries
+        and open circuits move on to the next backend. With hedge_percentile set, a duplicate request is
+        sent once a call has been running longer than that latency percentile of the backend, and the
+        first response wins.
+
+        Args:
+            primary: LLMFramework, or (LLMFramework, model) to pin the model used on that backend.
+            fallbacks (list): Secondary backends in the same form, tried in order.
+            max_retries (int): Retries per backend before failing over.
+            backoff (Backoff): Retry delays, default Backoff().
+            hedge_percentile (float): e.g. 0.95; None disables hedging.
+            hedge_min_samples (int): Latencies observed before hedging starts.
+            max_hedges (int): Duplicate requests per call.
+            failure_threshold (int): Consecutive failures that open a backend's circuit.
+            recovery_time (float): Seconds before an open circuit lets a probe through.
+            hedge_workers (int): Threads used for hedged calls.
+        """
+        self.backends = []
+        for backend in [primary, *fallbacks]:
+            llm, model = backend if isinstance(backend, tuple) else (backend, None)
+            self.backends.append(_Backend(llm, model, CircuitBreaker(failure_threshold, recovery_time),
+                                          hedge_min_samples))
+        self.llm_type = getattr(self.backends[0].llm, "llm_type", None)
+        self.max_retries = max_retries
+        self.backoff = backoff if backoff is not None else Backoff()
+        self.hedge_percentile = hedge_percentile
+        self.max_hedges = max_hedges
+        self.hedge_workers = hedge_workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _hedge_after(self, backend: _Backend) -> Optional[float]:
+        if self.hedge_percentile is None or self.max_hedges < 1:
+            return None
+        return backend.latency.percentile(self.hedge_percentile)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="hedge")
+        return self._pool
+
+    @staticmethod
+    def _check(output):
+        if isinstance(output, str) and output.startswith("Error: Unsupported LLM type"):
+            raise ValueError(output)
+        return output
+
+    def _invoke(self, backend: _Backend, prompt: str, model: str, options: Dict):
+        token = RAISE_ERRORS.set(True)
+        try:
+            return self._check(backend.llm.llm_gen(prompt=prompt, model=model, **options))
+        finally:
+            RAISE_ERRORS.reset(token)
+
+    def _hedged(self, backend: _Backend, prompt: str, model: str, options: Dict):
+        start = time.perf_counter()
+        hedge_after = self._hedge_after(backend)
+        if hedge_after is None:
+            output = self._invoke(backend, prompt, model, options)
+            backend.latency.add(time.perf_counter() - start)
+            return output
+
+        pool = self._executor()
+        first = pool.submit(self._invoke, backend, prompt, model, options)
+        pending = {first}
+        hedges = 0
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=hedge_after if hedges < self.max_hedges else None,
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                hedges += 1
+                backend.stats["hedges"] += 1
+                pending.add(pool.submit(self._invoke, backend, prompt, model, options))
+                continue
+            for future in done:
+                if future.exception() is None:
+                    backend.latency.add(time.perf_counter() - start)
+                    if future is not first:
+                        backend.stats["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _failed(self, backend: _Backend, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Record a failure and return the delay before retrying the same backend, or None to fail over.
+        """
+        backend.stats["failures"] += 1
+        backend.breaker.record_failure()
+        kind = classify_error(error)
+        logger.warning(f"{backend.name} failed ({kind}, attempt {attempt + 1}): {error}")
+        if kind == FATAL or attempt >= self.max_retries:
+            return None
+        wait_for = retry_after(error) if kind == RATE_LIMIT else None
+        if wait_for is not None and wait_for > self.backoff.max_retry_after:
+            return None
+        if not backend.breaker.allow():
+            return None
+        backend.stats["retries"] += 1
+        return self.backoff.delay(attempt, wait_for)
+
+    def llm_gen(self, prompt: str, model: str = "default", until=None):
+        """
+        Generate with retries, hedging and failover.
+
+        Args:
+            prompt (str): The input prompt.
+            model (str): Model used on backends without a pinned one.
+            until (callable): Watcher factory that stops a streamed response early, see LLMFramework.llm_gen.
+
+        Raises:
+            GenerationError: No backend produced a response.
+        """
+        options = {"until": until} if until is not None else {}
+        last_error = None
+        for backend in self.backends:
+            if not backend.breaker.allow():
+                backend.stats["skipped"] += 1
+                continue
+            call_model = backend.model or model
+            for attempt in range(self.max_retries + 1):
+                backend.stats["calls"] += 1
+                try:
+                    output = self._hedged(backend, prompt, call_model, options)
+                except Exception as e:
+                    last_error = e
+                    delay = self._failed(backend, e, attempt)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                backend.breaker.record_success()
+                return output
+        raise GenerationError(f"No LLM backend produced a response: {last_error}") from last_error
+
+    async def _ainvoke(self, backend: _Backend, prompt: str, model: str, options: Dict):
+        token = RAISE_ERRORS.set(True)
+        try:
+            return self._check(await backend.llm.allm_gen(prompt=prompt, model=model, **options))
+        finally:
+            RAISE_ERRORS.reset(token)
+
+    async def _ahedged(self, backend: _Backend, prompt: str, model: str, options: Dict):
+        start = time.perf_counter()
+        hedge_after = self._hedge_after(backend)
+        if hedge_after is None:
+            output = await self._ainvoke(backend, prompt, model, options)
+            backend.latency.add(time.perf_counter() - start)
+            return output
+
+        first = asyncio.ensure_future(self._ainvoke(backend, prompt, model, options))
+        pending = {first}
+        hedges = 0
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=hedge_after if hedges < self.max_hedges else None,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedges += 1
+                    backend.stats["hedges"] += 1
+                    pending.add(asyncio.ensure_future(self._ainvoke(backend, prompt, model, options)))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        backend.latency.add(time.perf_counter() - start)
+                        if task is not first:
+                            backend.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Unlike threads, the losing request can be cancelled
+            for task in pending:
+                task.cancel()
+
+    async def allm_gen(self, prompt: str, model: str = "default", until=None):
+        """
+        Async counterpart of llm_gen over the backends' allm_gen.
+        """
+        options = {"until": until} if until is not None else {}
+        last_error = None
+        for backend in self.backends:
+            if not backend.breaker.allow():
+                backend.stats["skipped"] += 1
+                continue
+            call_model = backend.model or model
+            for attempt in range(self.max_retries + 1):
+                backend.stats["calls"] += 1
+                try:
+                    output = await self._ahedged(backend, prompt, call_model, options)
+                except Exception as e:
+                    last_error = e
+                    delay = self._failed(backend, e, attempt)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    continue
+                backend.breaker.record_success()
+                return output
+        raise GenerationError(f"No LLM backend produced a response: {last_error}") from last_error
+
+    def stats(self) -> Dict[str, Dict]:
+        report = {}
+        for backend in self.backends:
+            report[backend.name] = dict(backend.stats, circuit=backend.breaker.state,
+                                        p50=backend.latency.percentile(0.5), p95=backend.latency.percentile(0.95))
+        return report
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,305 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from GIt.agents.memory import approx_tokens
+from GIt.models.models import RAISE_ERRORS
+from GIt.models.resilience import RATE_LIMIT, GenerationError, classify_error, retry_after
+
+logger = logging.getLogger("LLMRouter")
+
+# What the current call is for, e.g. {"role": "sub_agent", "agent": "search"}; read by routing rules
+ROUTE_HINTS = contextvars.ContextVar("route_hints", default={})
+
+
+@contextlib.contextmanager
+def routing(**hints):
+    """
+    Attach hints to the LLM calls made inside the block, merged over the hints already set.
+    """
+    token = ROUTE_HINTS.set({**ROUTE_HINTS.get(), **hints})
+    try:
+        yield
+    finally:
+        ROUTE_HINTS.reset(token)
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.stamp = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until amount is available; amounts above the capacity only need a full bucket.
+        """
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+class Route:
+    def __init__(self, name: str, llm, model: str = "default", weight: float = 1.0,
+                 requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_in_flight: int = None):
+        """
+        One backend and model the router can send calls to.
+
+        Args:
+            name (str): Unique name, used by RoutingRule and in stats().
+            llm: LLMFramework (or ResilientLLM) serving the calls.
+            model (str): Model passed to llm_gen.
+            weight (float): Preference; a route with weight 2 is picked over one that looks twice as good.
+            requests_per_minute (float): Request budget, None for unlimited.
+            tokens_per_minute (float): Token budget (prompt plus max_tokens), None for unlimited.
+            max_in_flight (int): Concurrent calls allowed on this route, None for unlimited.
+        """
+        self.name = name
+        self.llm = llm
+        self.model = model
+        self.weight = weight
+        self.max_in_flight = max_in_flight
+        self.requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        # Token budget is charged for the prompt plus the completion the backend may return
+        self.completion_tokens = getattr(llm, "max_tokens", None) or 0
+        self.latency = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        waits = [self.blocked_until - now]
+        if self.requests is not None:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            waits.append(self.tokens.wait_time(tokens + self.completion_tokens, now))
+        return max(0.0, *waits)
+
+    def score(self, default_latency: float) -> float:
+        # Expected time to a good answer: latency, divided by the success rate and inflated by the
+        # calls already in flight here
+        latency = self.latency if self.latency is not None else default_latency
+        return latency * (1 + self.in_flight) / max(0.02, 1 - self.error_rate) / self.weight
+
+
+class RoutingRule:
+    def __init__(self, routes: Iterable[str], role: str = None, agents: Iterable[str] = None,
+                 max_prompt_tokens: int = None, predicate: Callable[[str, Dict], bool] = None):
+        """
+        Prefer some routes for matching calls, e.g. cheap sub-agent prompts on a faster model.
+
+        A call matches when every given condition holds. Matching calls go to the rule's routes and
+        only fall back to the others when none of them is available.
+
+        Args:
+            routes (iterable): Names of the preferred routes.
+            role (str): Required "role" hint, e.g. "sub_agent".
+            agents (iterable): Agent names the rule applies to.
+            max_prompt_tokens (int): Only prompts up to this many tokens.
+            predicate (callable): predicate(prompt, hints) -> bool for anything else.
+        """
+        self.routes = list(routes)
+        self.role = role
+        self.agents = frozenset(agents) if agents is not None else None
+        self.max_prompt_tokens = max_prompt_tokens
+        self.predicate = predicate
+
+    def matches(self, prompt: str, tokens: int, hints: Dict) -> bool:
+        if self.role is not None and hints.get("role") != self.role:
+            return False
+        if self.agents is not None and hints.get("agent") not in self.agents:
+            return False
+        if self.max_prompt_tokens is not None and tokens > self.max_prompt_tokens:
+            return False
+        return self.predicate is None or self.predicate(prompt, hints)
+
+
+class LLMRouter:
+    def __init__(self, routes: List[Route], rules: List[RoutingRule] = (), alpha: float = 0.2,
+                 max_wait: float = 30.0, max_attempts: int = None):
+        """
+        Load balancer over several backends and models with the llm_gen/allm_gen interface of LLMFramework.
+
+        Every call goes to the available route with the lowest expected latency: an EWMA of its call
+        latency, inflated by its error rate and the number of calls in flight on it, divided by its
+        weight. Routes without budget left (requests or tokens per minute), at max_in_flight, or cooling
+        down after a rate limit are passed over. When every route is exhausted the call waits for the
+        earliest budget, up to max_wait. A failed call is retried on the next best route.
+
+        Args:
+            routes (list): Route objects.
+            rules (list): RoutingRule objects, the first matching rule wins.
+            alpha (float): EWMA smoothing of latency and error rate.
+            max_wait (float): Longest wait for budget before giving up.
+            max_attempts (int): Routes tried per call, default all of them.
+        """
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route.")
+        self.routes = {route.name: route for route in routes}
+        for rule in rules:
+            unknown = [name for name in rule.routes if name not in self.routes]
+            if unknown:
+                raise ValueError(f"Routing rule refers to unknown routes {unknown}.")
+        self.rules = list(rules)
+        self.alpha = alpha
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts or len(routes)
+        self.llm_type = "router"
+        self._lock = threading.Lock()
+
+    def _candidates(self, prompt: str, tokens: int, hints: Dict, exclude) -> List[List[Route]]:
+        routes = [route for name, route in self.routes.items() if name not in exclude]
+        for rule in self.rules:
+            if rule.matches(prompt, tokens, hints):
+                preferred = [self.routes[name] for name in rule.routes if name not in exclude]
+                return [preferred, [route for route in routes if route not in preferred]]
+        return [routes]
+
+    def _acquire(self, prompt: str, tokens: int, hints: Dict, exclude) -> (Optional[Route], float):
+        """
+        Reserve the best available route, or return how long to wait for one (None when no route is left).
+        """
+        with self._lock:
+            now = time.monotonic()
+            known = [route.latency for route in self.routes.values() if route.latency is not None]
+            # Untried routes look as fast as the best one, so they get sampled
+            default_latency = min(known) if known else 0.0
+            wait = None
+            remaining = False
+            for tier in self._candidates(prompt, tokens, hints, exclude):
+                best = None
+                for route in tier:
+                    remaining = True
+                    if route.max_in_flight is not None and route.in_flight >= route.max_in_flight:
+                        continue
+                    route_wait = route.wait_time(tokens, now)
+                    if route_wait > 0:
+                        wait = route_wait if wait is None else min(wait, route_wait)
+                        continue
+                    if best is None or route.score(default_latency) < best.score(default_latency):
+                        best = route
+                if best is not None:
+                    if best.requests is not None:
+                        best.requests.take(1)
+                    if best.tokens is not None:
+                        best.tokens.take(tokens + best.completion_tokens)
+                    best.in_flight += 1
+                    best.calls += 1
+                    return best, 0.0
+            if not remaining:
+                return None, None
+            # Routes at max_in_flight free up as soon as a call returns
+            return None, wait if wait is not None else 0.05
+
+    def _release(self, route: Route, latency: float = None, error: Exception = None):
+        with self._lock:
+            route.in_flight -= 1
+            route.error_rate += self.alpha * ((error is not None) - route.error_rate)
+            if error is None:
+                route.latency = latency if route.latency is None else \
+                    route.latency + self.alpha * (latency - route.latency)
+                return
+            route.errors += 1
+            if classify_error(error) == RATE_LIMIT:
+                route.blocked_until = time.monotonic() + (retry_after(error) or 1.0)
+
+    def _exhausted(self, hints: Dict, last_error: Exception):
+        if last_error is None:
+            raise GenerationError(f"No route had budget within {self.max_wait}s (hints {hints}).")
+        raise GenerationError(f"No route produced a response (hints {hints}): {last_error}") from last_error
+
+    def llm_gen(self, prompt: str, model: str = None, until=None):
+        """
+        Generate on the best available route.
+
+        Args:
+            prompt (str): The input prompt.
+            model (str): Ignored; every route has its own model.
+            until (callable): Watcher factory that stops a streamed response early, see LLMFramework.llm_gen.
+
+        Raises:
+            GenerationError: Every attempted route failed, or none had budget within max_wait.
+        """
+        hints = ROUTE_HINTS.get()
+        options = {"until": until} if until is not None else {}
+        tokens = approx_tokens(prompt)
+        tried = set()
+        last_error = None
+        deadline = time.monotonic() + self.max_wait
+        while len(tried) < self.max_attempts:
+            route, wait = self._acquire(prompt, tokens, hints, tried)
+            if route is None:
+                if wait is None or time.monotonic() + wait > deadline:
+                    break
+                time.sleep(wait)
+                continue
+            tried.add(route.name)
+            start = time.perf_counter()
+            token = RAISE_ERRORS.set(True)
+            try:
+                output = route.llm.llm_gen(prompt=prompt, model=route.model, **options)
+            except Exception as e:
+                last_error = e
+                self._release(route, error=e)
+                logger.warning(f"Route {route.name} failed: {e}")
+                continue
+            finally:
+                RAISE_ERRORS.reset(token)
+            self._release(route, latency=time.perf_counter() - start)
+            return output
+        self._exhausted(hints, last_error)
+
+    async def allm_gen(self, prompt: str, model: str = None, until=None):
+        """
+        Async counterpart of llm_gen over the routes' allm_gen.
+        """
+        hints = ROUTE_HINTS.get()
+        options = {"until": until} if until is not None else {}
+        tokens = approx_tokens(prompt)
+        tried = set()
+        last_error = None
+        deadline = time.monotonic() + self.max_wait
+        while len(tried) < self.max_attempts:
+            route, wait = self._acquire(prompt, tokens, hints, tried)
+            if route is None:
+                if wait is None or time.monotonic() + wait > deadline:
+                    break
+                await asyncio.sleep(wait)
+                continue
+            tried.add(route.name)
+            start = time.perf_counter()
+            token = RAISE_ERRORS.set(True)
+            try:
+                output = await route.llm.allm_gen(prompt=prompt, model=route.model, **options)
+            except Exception as e:
+                last_error = e
+                self._release(route, error=e)
+                logger.warning(f"Route {route.name} failed: {e}")
+                continue
+            finally:
+                RAISE_ERRORS.reset(token)
+            self._release(route, latency=time.perf_counter() - start)
+            return output
+        self._exhausted(hints, last_error)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: {"calls": route.calls, "errors": route.errors, "in_flight": route.in_flight,
+                           "latency_ewma": route.latency, "error_rate": route.error_rate}
+                    for name, route in self.routes.items()}
@@ -0,0 +1,124 @@
+import sys
+from collections.abc import Mapping
+
+from GIt.agents.memory import ObservationHandle
+
+_MISSING = object()
+
+
+def intern_name(name):
+    """
+    Intern action names (also the parts of a (package, tool) name) so every record shares one copy.
+    """
+    if isinstance(name, str):
+        return sys.intern(name)
+    if isinstance(name, (tuple, list)):
+        return type(name)(intern_name(part) for part in name)
+    return name
+
+
+def json_default(obj):
+    """
+    json.dumps default that serializes records as their dict form, observation handles as their full
+    text and anything else as str().
+    """
+    if isinstance(obj, (StepRecord, ObservationRecord)):
+        return obj.to_dict()
+    if isinstance(obj, ObservationHandle):
+        return obj.text()
+    return str(obj)
+
+
+class StepRecord(Mapping):
+    """
+    One entry of AgentState.states: an action the agent took in an iteration.
+
+    A slotted object instead of a dict of six repeated keys, with the action type, name and
+    continuation instruction interned. It reads like the dict it replaces (record['action'],
+    record.get('action_type'), dict(record)), and to_dict()/json_default build the dict only when the
+    record is serialized.
+    """
+    __slots__ = ("ite", "action_type", "action_name", "action", "timestamp", "should_continue")
+    FIELDS = __slots__
+    _FIELD_SET = frozenset(__slots__)
+
+    def __init__(self, ite: int, action_type: str, action_name, action, timestamp: float, should_continue: str):
+        self.ite = ite
+        self.action_type = intern_name(action_type)
+        self.action_name = intern_name(action_name)
+        self.action = action
+        self.timestamp = timestamp
+        self.should_continue = intern_name(should_continue)
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f"StepRecord({self.to_dict()!r})"
+
+
+class ObservationRecord(Mapping):
+    """
+    One entry of AgentState.intermediate_state: what an action produced.
+
+    Reads as the dict Action used to build, with keys in the same order so rendered prompts do not
+    change: "Action_Type", the name under its label ("Action", "Tool" or "Agent"), then "Input",
+    "Status" and "Observation" when present.
+    """
+    __slots__ = ("action_type", "label", "name", "input", "status", "observation")
+
+    def __init__(self, action_type: str, label: str, name, input=_MISSING, observation=_MISSING,
+                 status=_MISSING):
+        self.action_type = intern_name(action_type)
+        self.label = intern_name(label)
+        self.name = intern_name(name)
+        self.input = input
+        self.status = status
+        self.observation = observation
+
+    def __getitem__(self, key):
+        if key == "Action_Type":
+            return self.action_type
+        if key == self.label:
+            return self.name
+        if key == "Input":
+            value = self.input
+        elif key == "Status":
+            value = self.status
+        elif key == "Observation":
+            value = self.observation
+        else:
+            raise KeyError(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        yield "Action_Type"
+        yield self.label
+        if self.input is not _MISSING:
+            yield "Input"
+        if self.status is not _MISSING:
+            yield "Status"
+        if self.observation is not _MISSING:
+            yield "Observation"
+
+    def __len__(self):
+        return 2 + sum(value is not _MISSING for value in (self.input, self.status, self.observation))
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self}
+
+    def __repr__(self):
+        return f"ObservationRecord({self.to_dict()!r})"
@@ -0,0 +1,309 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from GIt.agents import BaseAgent
+from GIt.agents.agentval import AgentVal
+from GIt.agents.multi_agent import MultiAgentOrchestrator
+from GIt.executor import Action, AgentExecutor, AgentState
+from GIt.models.resilience import GenerationError
+from GIt.models.router import routing
+
+logger = logging.getLogger("ExecutorService")
+
+
+class ServiceOverloaded(RuntimeError):
+    """
+    Raised when a request arrives while max_pending requests are already admitted.
+    """
+
+
+class FairScheduler:
+    def __init__(self, max_in_flight: int = 8):
+        """
+        Hands out LLM call slots on an event loop, fairly across tenants.
+
+        Every tenant has its own queue ordered by priority. When a slot frees up, the tenant whose next
+        request has the highest priority gets it; tenants tied on priority take turns, so one tenant's
+        burst cannot starve the others.
+
+        Args:
+            max_in_flight (int): LLM calls allowed at the same time.
+        """
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._queues: Dict[str, list] = {}
+        self._ring = deque()
+        self._seq = itertools.count()
+        self.granted: Dict[str, int] = {}
+
+    async def acquire(self, tenant: str, priority: int = 0):
+        if self.in_flight < self.max_in_flight and not self._ring:
+            self._grant(tenant)
+            return
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(tenant)
+        if queue is None:
+            queue = self._queues[tenant] = []
+            self._ring.append(tenant)
+        heapq.heappush(queue, (-priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Cancelled after the slot was handed over: give it back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _grant(self, tenant: str):
+        self.in_flight += 1
+        self.granted[tenant] = self.granted.get(tenant, 0) + 1
+
+    def release(self):
+        self.in_flight -= 1
+        while self.in_flight < self.max_in_flight and self._ring:
+            best = 0
+            for idx in range(1, len(self._ring)):
+                if self._queues[self._ring[idx]][0][0] < self._queues[self._ring[best]][0][0]:
+                    best = idx
+            tenant = self._ring[best]
+            del self._ring[best]
+            queue = self._queues[tenant]
+            _, _, future = heapq.heappop(queue)
+            if queue:
+                self._ring.append(tenant)
+            else:
+                del self._queues[tenant]
+            if future.cancelled():
+                continue
+            self._grant(tenant)
+            future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tenant: str, priority: int = 0):
+        await self.acquire(tenant, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def queued(self) -> Dict[str, int]:
+        return {tenant: sum(not entry[2].cancelled() for entry in queue) for tenant, queue in self._queues.items()}
+
+
+class ExecutorService:
+    def __init__(self, executor: AgentExecutor, max_in_flight_llm: int = 8, max_pending: int = 1000,
+                 action_workers: int = 32):
+        """
+        Serve many concurrent execute requests with one AgentExecutor.
+
+        Every request runs as a task on one event loop and advances step by step: model calls go
+        through a FairScheduler (per-tenant queues, priority, at most max_in_flight_llm calls at once)
+        and tool actions run on a shared thread pool, so the steps of many sessions interleave.
+        Sub-agents of a multi-agent schema run as tasks on the same loop and share the scheduler.
+
+        Use submit() from any thread (the loop then runs on a background thread), or await aexecute()
+        on your own loop; not both on one service.
+
+        Args:
+            executor (AgentExecutor): Configured executor; its llm, agents, tools, callback and session
+                store are used as they are.
+            max_in_flight_llm (int): LLM calls in flight across all sessions, keep it under the
+                provider's concurrency and rate limits.
+            max_pending (int): Requests admitted at once; more raise ServiceOverloaded.
+            action_workers (int): Threads running tool and package actions and session store IO.
+        """
+        self.executor = executor
+        self.scheduler = FairScheduler(max_in_flight_llm)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self._threads = ThreadPoolExecutor(max_workers=action_workers, thread_name_prefix="service")
+        self.action = Action(tools=executor.tools, agents=executor.agents, packages=executor.packages,
+                             max_workers=action_workers, callback=executor.callback, store=executor.observations)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            raise RuntimeError("ExecutorService is already running on another event loop.")
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._thread is None:
+                loop = asyncio.new_event_loop()
+                self._loop = loop
+                self._thread = threading.Thread(target=loop.run_forever, name="executor-service", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def submit(self, user_input: str, tenant: str = "default", priority: int = 0,
+               history: List[Dict] = None, session_id: str = None) -> Future:
+        """
+        Queue a request from any thread.
+
+        Returns:
+            concurrent.futures.Future: Resolves to execute()'s (final_output, history); cancelling it
+                cancels the run.
+        """
+        loop = self._start()
+        return asyncio.run_coroutine_threadsafe(
+            self.aexecute(user_input, tenant=tenant, priority=priority, history=history, session_id=session_id),
+            loop)
+
+    async def aexecute(self, user_input: str, tenant: str = "default", priority: int = 0,
+                       history: List[Dict] = None, session_id: str = None) -> Tuple[Dict, List]:
+        """
+        Run the agents on one user input, like AgentExecutor.execute.
+
+        Args:
+            user_input (str): The request.
+            tenant (str): Fairness group, e.g. the customer or API key.
+            priority (int): Higher runs first within the scheduler.
+            history (list): Prior turns, resumed from the session store when None.
+            session_id (str): Session to resume and persist to.
+
+        Raises:
+            ServiceOverloaded: max_pending requests are already admitted.
+        """
+        self._bind()
+        if self.pending >= self.max_pending:
+            raise ServiceOverloaded(f"{self.pending} requests pending, try again later.")
+        self.pending += 1
+        agent_state = None
+        try:
+            agents, agent_state = await self._blocking(self.executor.prepare, user_input, history, session_id)
+            if "multi_agent" in self.executor.agent_schema:
+                agent_state = await self._m_call(agents["head_agent"], agents["sub_agents"], agent_state,
+                                                 tenant, priority)
+            else:
+                agent_state = await self._s_call(agents["agent"], agent_state, tenant, priority)
+            result = await self._blocking(self.executor.finish, agent_state, session_id)
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+            if agent_state is not None:
+                agent_state.close()
+        self.completed += 1
+        return result
+
+    def _blocking(self, func, *args):
+        # Keep the task's context (current span, routing hints) on the worker thread
+        return self._loop.run_in_executor(self._threads, contextvars.copy_context().run, func, *args)
+
+    async def _step(self, agent: BaseAgent, agent_state: AgentState, tenant: str, priority: int,
+                    sub_agents: AgentVal = None):
+        prompt = agent.prompt(chain=agent_state.agent_scratchpad())
+        try:
+            async with self.scheduler.slot(tenant, priority):
+                with routing(agent=agent.agent_name):
+                    gen_output = await self.executor.agenerate(prompt)
+        except GenerationError as e:
+            return self.executor.generation_failed(agent_state, e)
+        return self.executor.parse_step(agent, gen_output, sub_agents)
+
+    async def _s_call(self, agent: BaseAgent, agent_state: AgentState, tenant: str, priority: int) -> AgentState:
+        # Copied into every _blocking call, so the run's tools see the run's observations
+        with agent_state.observations.active():
+            while agent_state.gate:
+                actions = await self._step(agent, agent_state, tenant, priority)
+                _, step = await self._blocking(self.action.actions_def, actions, agent_state.intermediate_state)
+                agent_state.update(actions, step)
+        return agent_state
+
+    async def _m_call(self, head_agent: BaseAgent, sub_agents: List[BaseAgent], agent_state: AgentState,
+                      tenant: str, priority: int) -> AgentState:
+        sub_agent_val = AgentVal(sub_agents)
+        with agent_state.observations.active():
+            while agent_state.gate:
+                actions = await self._step(head_agent, agent_state, tenant, priority, sub_agents=sub_agent_val)
+                agent_actions = [a for a in actions if a[0] == "agent action"]
+                other_actions = [a for a in actions if a[0] != "agent action"]
+                if agent_actions:
+                    results = await self._dispatch(sub_agent_val,
+                                                   [(name, agent_input) for _, name, agent_input in agent_actions],
+                                                   tenant, priority)
+                    self.executor.record_sub_agents(agent_state, results)
+                step = True
+                if other_actions:
+                    _, step = await self._blocking(self.action.actions_def, other_actions,
+                                                   agent_state.intermediate_state)
+                agent_state.update(actions, step)
+        return agent_state
+
+    async def _dispatch(self, sub_agents: AgentVal, tasks: List[Tuple[str, object]], tenant: str,
+                        priority: int) -> List[Dict]:
+        """
+        Sub-agent runs of one head step, concurrently; results have MultiAgentOrchestrator.dispatch's form.
+        """
+        start = time.monotonic()
+        limit = asyncio.Semaphore(self.executor.max_sub_agents)
+        timeout = self.executor.sub_agent_timeout
+
+        async def run(agent_name, agent_input):
+            try:
+                agent = sub_agents.agent_retrieval(agent_name)
+            except ValueError:
+                agent = None
+            if agent is None:
+                return MultiAgentOrchestrator._result(agent_name, agent_input, "error",
+                                                      f"Agent {agent_name} not found.", start)
+            state = AgentState(agent=agent, user_input=agent_input if isinstance(agent_input, str) else str(agent_input),
+                               history=[], store=self.executor.observations)
+            try:
+                async with limit:
+                    try:
+                        with routing(role="sub_agent"), \
+                                self.executor.callback.span("sub_agent", "sub_agent", agent=agent_name):
+                            await asyncio.wait_for(self._s_call(agent, state, tenant, priority), timeout)
+                    except asyncio.TimeoutError:
+                        logger.error(f"Sub-agent '{agent_name}' timed out")
+                        return MultiAgentOrchestrator._result(agent_name, agent_input, "timeout",
+                                                              MultiAgentOrchestrator._partial(state), start)
+                    except Exception as e:
+                        logger.error(f"Sub-agent '{agent_name}' failed: {e}")
+                        return MultiAgentOrchestrator._result(agent_name, agent_input, "error", f"Error: {e}", start)
+                status = "cancelled" if state.stopped else "done"
+                return MultiAgentOrchestrator._result(agent_name, agent_input, status,
+                                                      MultiAgentOrchestrator._partial(state), start)
+            finally:
+                state.close()
+
+        return list(await asyncio.gather(*(run(name, agent_input) for name, agent_input in tasks)))
+
+    def stats(self) -> Dict:
+        return {"pending": self.pending, "completed": self.completed, "failed": self.failed,
+                "llm_in_flight": self.scheduler.in_flight, "queued": self.scheduler.queued(),
+                "granted": dict(self.scheduler.granted)}
+
+    def shutdown(self):
+        """
+        Stop the background loop (if submit() started one) and the worker threads.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            thread.join()
+            # Lets the llm close the async clients it pooled on this loop
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+            self._loop = None
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        self.action.close()
+        self.executor.callback.export()
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List
+
+from GIt.records import json_default
+
+
+class SessionStore:
+    def __init__(self, path: str = "sessions.sqlite", timeout: float = 30.0):
+        """
+        Durable, append-only log of agent sessions (AgentState.states and history turns).
+
+        Every event is one row keyed by (session_id, seq); rows are only ever inserted. Indexes on
+        time and action type keep lookups cheap, and reads page through the log lazily so resuming a
+        long session only loads the turns it needs.
+
+        Several processes may append to the same file: each append reserves the write lock up front
+        (BEGIN IMMEDIATE) so sequence numbers are read and written in one transaction.
+
+        Args:
+            path (str): SQLite database file, ":memory:" for a throwaway store.
+            timeout (float): Seconds to wait for another writer's lock before raising.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly where they are needed
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                last_seq INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                action_type TEXT,
+                action_name TEXT,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS events_time ON events (session_id, ts);
+            CREATE INDEX IF NOT EXISTS events_kind ON events (session_id, kind, seq);
+            CREATE INDEX IF NOT EXISTS events_action ON events (session_id, action_type, seq);
+            """
+        )
+
+    def _append(self, session_id: str, kind: str, records: List[Dict]):
+        if not records:
+            return
+        now = time.time()
+        payloads = []
+        for record in records:
+            action_name = record.get('action_name')
+            payloads.append((record.get('action_type'), None if action_name is None else str(action_name),
+                             json.dumps(record, default=json_default)))
+        with self._lock:
+            # Take the write lock before reading last_seq, so no other process can claim the same seqs
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT last_seq FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                seq = row[0] if row else 0
+                rows = []
+                for action_type, action_name, payload in payloads:
+                    seq += 1
+                    rows.append((session_id, seq, now, kind, action_type, action_name, payload))
+                self._conn.executemany(
+                    "INSERT INTO events (session_id, seq, ts, kind, action_type, action_name, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, created, updated, last_seq) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET updated = excluded.updated, last_seq = excluded.last_seq",
+                    (session_id, now, now, seq))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def append_states(self, session_id: str, states: List[Dict]):
+        self._append(session_id, "state", states)
+
+    def append_turn(self, session_id: str, turn: Dict):
+        self._append(session_id, "turn", [turn])
+
+    def iter_events(self, session_id: str, kind: str = None, action_type: str = None,
+                    since: float = None, until: float = None, after_seq: int = 0,
+                    page_size: int = 256) -> Iterator[Dict]:
+        """
+        Lazily yield events of a session in order, fetching page_size rows at a time.
+        """
+        query = "SELECT seq, payload FROM events WHERE session_id = ? AND seq > ?"
+        filters = []
+        if kind is not None:
+            query += " AND kind = ?"
+            filters.append(kind)
+        if action_type is not None:
+            query += " AND action_type = ?"
+            filters.append(action_type)
+        if since is not None:
+            query += " AND ts >= ?"
+            filters.append(since)
+        if until is not None:
+            query += " AND ts <= ?"
+            filters.append(until)
+        query += " ORDER BY seq LIMIT ?"
+
+        seq = after_seq
+        while True:
+            with self._lock:
+                rows = self._conn.execute(query, (session_id, seq, *filters, page_size)).fetchall()
+            for seq, payload in rows:
+                yield json.loads(payload)
+            if len(rows) < page_size:
+                return
+
+    def states(self, session_id: str, **filters) -> Iterator[Dict]:
+        return self.iter_events(session_id, kind="state", **filters)
+
+    def turns(self, session_id: str, last: int = None) -> List[Dict]:
+        """
+        History turns of a session in order; with last, only the newest ones are read.
+        """
+        if last is None:
+            return list(self.iter_events(session_id, kind="turn"))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM events WHERE session_id = ? AND kind = 'turn' ORDER BY seq DESC LIMIT ?",
+                (session_id, last)).fetchall()
+        return [json.loads(payload) for payload, in reversed(rows)]
+
+    def sessions(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, created, updated, last_seq FROM sessions ORDER BY updated DESC").fetchall()
+        return [{'session_id': sid, 'created': created, 'updated': updated, 'events': last_seq}
+                for sid, created, updated, last_seq in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
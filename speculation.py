@@ -0,0 +1,187 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from GIt.models.cache import MemoryCacheBackend
+from GIt.tools.tool_cache import canonical_args
+
+logger = logging.getLogger("Speculation")
+
+# Actions whose outcome ends or hands off the step; a step containing one is never speculated on
+_TERMINAL = ("final action", "agent action")
+
+
+def action_key(action) -> str:
+    action_type, action_name, action_input = action
+    args = canonical_args(action_input) if isinstance(action_input, dict) else str(action_input)
+    return f"{action_type}\x00{action_name}\x00{args}"
+
+
+def _tool_name(action) -> str:
+    return action[1] if isinstance(action[1], str) else "#".join(map(str, action[1]))
+
+
+class Speculator:
+    def __init__(self, tools=None, packages=None, min_latency: float = 0.2, min_accuracy: float = 0.6,
+                 min_trials: int = 5, min_support: int = 2, max_prefetch: int = 2, max_entries: int = 4096,
+                 max_workers: int = 4, alpha: float = 0.3):
+        """
+        Overlaps slow tool calls with the work that usually follows them in s_call.
+
+        Two techniques, both learned from earlier steps of this executor:
+
+        - Predicted observations: the last observation of an identical action (same tool and
+          arguments) stands in for the real one, and the next model call starts while the tool still
+          runs. Once the tool returns, the speculative output is used only if the real prompt is exactly
+          the one speculated on; otherwise it is discarded and the model is called again. Only tools
+          slower than min_latency whose predictions have been right often enough are speculated on,
+          since a miss costs one model call.
+        - Prefetched follow-ups: for read-only tools (pure or cacheable), the tool call that most often
+          followed the current step is started right away, so the agent's next step hits the tool cache
+          or joins the in-flight call.
+
+        Args:
+            tools (ToolVal): Tools of the executor, used to tell read-only tools and run prefetches.
+            packages (PackageVal): Packages of the executor, likewise.
+            min_latency (float): Seconds a step's tools must typically take before speculating on it.
+            min_accuracy (float): Prediction hit rate below which a tool is no longer speculated on.
+            min_trials (int): Predictions per tool before its hit rate is judged.
+            min_support (int): Times a follow-up must have been seen before it is prefetched.
+            max_prefetch (int): Follow-up tool calls prefetched per step.
+            max_entries (int): Remembered observations and transitions, least recently used evicted.
+            max_workers (int): Threads for tool steps, speculative model calls and prefetches.
+            alpha (float): EWMA smoothing of tool latencies.
+        """
+        self.tools = tools
+        self.packages = packages
+        self.min_latency = min_latency
+        self.min_accuracy = min_accuracy
+        self.min_trials = min_trials
+        self.min_support = min_support
+        self.max_prefetch = max_prefetch
+        self.alpha = alpha
+        self.observations = MemoryCacheBackend(max_entries=max_entries)
+        self.transitions = MemoryCacheBackend(max_entries=max_entries)
+        self.latency: Dict[str, float] = {}
+        self.accuracy: Dict[str, List[int]] = {}
+        self.counters = {"speculated": 0, "hits": 0, "misses": 0, "prefetched": 0}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        return self._pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def predict(self, actions) -> Optional[List[Dict]]:
+        """
+        Observations the actions are expected to produce, or None when the step is not worth speculating on.
+        """
+        if not actions or any(action[0] in _TERMINAL for action in actions):
+            return None
+        slow = False
+        predicted = []
+        for action in actions:
+            name = _tool_name(action)
+            hits, trials = self.accuracy.get(name, (0, 0))
+            if trials >= self.min_trials and hits < self.min_accuracy * trials:
+                return None
+            observation = self.observations.get(action_key(action))
+            if observation is None:
+                return None
+            predicted.append(observation)
+            slow = slow or self.latency.get(name, 0.0) >= self.min_latency
+        return predicted if slow else None
+
+    def observe(self, actions, observations: List[Dict], elapsed: float, predicted: List[Dict] = None):
+        """
+        Learn from a finished step: its observations, how long its tools took and whether the prediction held.
+        """
+        if len(observations) != len(actions):
+            return
+        with self._lock:
+            for idx, (action, observation) in enumerate(zip(actions, observations)):
+                if action[0] in _TERMINAL:
+                    continue
+                name = _tool_name(action)
+                previous = self.latency.get(name)
+                self.latency[name] = elapsed if previous is None else previous + self.alpha * (elapsed - previous)
+                if predicted is not None:
+                    score = self.accuracy.setdefault(name, [0, 0])
+                    score[0] += predicted[idx] == observation
+                    score[1] += 1
+                self.observations.set(action_key(action), observation)
+
+    def _read_only(self, action) -> bool:
+        action_type, action_name, _ = action
+        try:
+            if action_type == "tool action" and self.tools is not None:
+                return self.tools.tool_retrieval(action_name).cacheable
+            if action_type == "package action" and self.packages is not None:
+                package, tool = action_name
+                return self.packages.package_retrieval(package).cache_policy(tool)[0]
+        except (ValueError, TypeError):
+            return False
+        return False
+
+    def _run(self, action):
+        action_type, action_name, action_input = action
+        try:
+            if action_type == "tool action":
+                self.tools.run(action_name, action_input)
+            else:
+                self.packages.call(action_name[0], action_name[1], action_input or None)
+        except Exception as e:
+            # The agent's own call reports the error when it makes it
+            logger.debug(f"Prefetch of {action_name} failed: {e}")
+
+    def learn_transition(self, previous, actions):
+        """
+        Remember that the actions followed the previous step.
+        """
+        if not previous:
+            return
+        key = "\x01".join(map(action_key, previous))
+        with self._lock:
+            followers = self.transitions.get(key)
+            if followers is None:
+                followers = {}
+                self.transitions.set(key, followers)
+            for action in actions:
+                if action[0] in ("tool action", "package action"):
+                    entry = followers.setdefault(action_key(action), [0, action])
+                    entry[0] += 1
+
+    def prefetch(self, actions) -> int:
+        """
+        Start the read-only tool calls that most often followed these actions. Returns how many were started.
+        """
+        followers = self.transitions.get("\x01".join(map(action_key, actions)))
+        if not followers:
+            return 0
+        with self._lock:
+            likely = sorted((entry for entry in followers.values() if entry[0] >= self.min_support),
+                            key=lambda entry: entry[0], reverse=True)
+        started = 0
+        for _, action in likely:
+            if started >= self.max_prefetch:
+                break
+            if self._read_only(action):
+                self.submit(self._run, action)
+                self.count("prefetched")
+                started += 1
+        return started
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+        judged = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / judged if judged else 0.0
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
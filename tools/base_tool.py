@@ -1,64 +1,76 @@
 from typing import Dict, List, Tuple
+import asyncio
 import inspect
+from GIt.tools.schema import compile_schema
+from GIt.tools.validation import compile_validator
+from GIt.tools.execution import INLINE, PROCESS, ExecutionPolicy, ToolRunner, default_runner
 
 class BaseTool:
-    def __init__(self, name: str, description: str, function: callable, tags: List[str] = None, permissions: List[str] = None):
+    def __init__(self, name: str, description: str, function: callable, tags: List[str] = None, permissions: List[str] = None,
+                 defaults: Dict[str, any] = None, execution: str = INLINE, timeout: float = None,
+                 runner: ToolRunner = None, pure: bool = False, cache_ttl: float = None):
+        """
+        Args:
+            execution (str): "inline", "thread" or "process", see ExecutionPolicy. Process tools must be
+                module-level functions so worker processes can import them.
+            timeout (float): Seconds a thread or process call may take before ToolTimeoutError.
+            runner (ToolRunner): Runner for thread/process calls, default the shared one.
+            pure (bool): Same arguments always give the same result, so ToolVal may cache it for good.
+            cache_ttl (float): Seconds ToolVal may reuse a result of an impure but cacheable tool.
+        """
         self.name = name
         self.description = description
         self.func = function
         self.tags = tags or []
         self.permissions = permissions or []
+        self.defaults = defaults or {}
+        self.policy = ExecutionPolicy(execution, timeout)
+        self.runner = runner
+        self.pure = pure
+        self.cache_ttl = None if pure else cache_ttl
+        self.cacheable = pure or cache_ttl is not None
         self.params_, self.types = self.parmas()
+        self.validate = compile_validator(self.schema, defaults=self.defaults)
+        if execution == PROCESS:
+            (runner or default_runner()).preload(getattr(function, "__module__", None))
 
     def run(self, params: Dict[str, any]):
-        params = self.object_conversion(params)
+        return self.execute(self.validate(params))
+
+    def execute(self, params: Dict[str, any]):
+        """
+        Run the tool on arguments that already went through validate().
+        """
+        if self.policy.mode != INLINE:
+            return (self.runner or default_runner()).run(self.func, params, self.policy)
+        if inspect.iscoroutinefunction(self.func):
+            # Async tools get their own loop when run from a worker thread
+            return asyncio.run(self.func(**params))
         return self.func(**params)
 
+    async def arun(self, params: Dict[str, any]):
+        params = self.validate(params)
+        if self.policy.mode != INLINE:
+            return await asyncio.to_thread((self.runner or default_runner()).run, self.func, params, self.policy)
+        if inspect.iscoroutinefunction(self.func):
+            return await self.func(**params)
+        return await asyncio.to_thread(self.func, **params)
+
     def parmas(self):
-        signature = inspect.signature(self.func)
-        arguments = {}
-        types = {}
-        for param_name, param in signature.parameters.items():
-            param_type = param.annotation if param.annotation != inspect.Parameter.empty else "No type specified"
-            types[param_name] = param_type
-            param_type = param_type.__name__ if hasattr(param_type, "__name__") else str(param_type)
-            arguments[param_name] = {'type': param_type, "description": param.default}
-        return arguments, types
+        self.schema = compile_schema(self.name, self.func, self.description, default_type="No type specified")
+        self._format = None
+        types = {arg.name: arg.annotation for arg in self.schema.arguments}
+        return self.schema.arguments_format(), types
 
     def f_format(self):
-        format_ = {
-            "name": self.name,
-            "description": self.description,
-            "tags": self.tags,
-            "arguments": self.params_
-        }
-        return format_
+        if self._format is None:
+            self._format = {
+                "name": self.name,
+                "description": self.description,
+                "tags": self.tags,
+                "arguments": self.params_
+            }
+        return self._format
 
     def object_conversion(self, params: Dict[str, any]):
-        params_ = {}
-        for key, value in params.items():
-            params_[key] = self.types[key](value)
-        return params_
-
-
-def simple_addition(a:int="first digit",b:int="second digit") -> int:
-    return a + b
-
-def simple_subtraction(a:int="first digit",b:int="second digit") -> int:
-    return a - b
-
-
-
-simple_addition_ = BaseTool(description="simple addition",
-                           name="simple_addition",
-                           function=simple_addition,
-                           )
-simple_subtraction_ = BaseTool(description="simple subtraction",
-                           name="simple_subtraction",
-                           function=simple_subtraction,
-                           )
-
-params = {'a':1,'b':2}
-
-print(simple_addition_.run(params))
-
+        return self.validate(params)
@@ -0,0 +1,339 @@
+import asyncio
+import atexit
+import importlib
+import inspect
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterable
+
+logger = logging.getLogger("ToolExecution")
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+MODES = (INLINE, THREAD, PROCESS)
+
+
+class ToolTimeoutError(TimeoutError):
+    """
+    Raised when a tool call runs past the timeout of its execution policy.
+    """
+
+
+class ExecutionPolicy:
+    def __init__(self, mode: str = INLINE, timeout: float = None):
+        """
+        Where a tool call runs.
+
+        Args:
+            mode (str): "inline" on the caller's thread, "thread" on the shared thread pool, or
+                "process" on the warm worker processes (for CPU-heavy tools, not limited by the GIL).
+            timeout (float): Seconds a call may take; enforced for thread and process mode. A thread
+                cannot be interrupted, so a timed-out thread call keeps running in the background,
+                while a timed-out worker process is killed and replaced.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown execution mode {mode!r}, expected one of {MODES}.")
+        self.mode = mode
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"ExecutionPolicy(mode={self.mode!r}, timeout={self.timeout!r})"
+
+
+def _attach(name: str):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the segment again with the resource tracker the
+        # workers share with the parent; the parent's unlink releases it
+        return shared_memory.SharedMemory(name=name)
+
+
+def _load(message):
+    if message[0] == "shm":
+        _, name, size = message
+        shm = _attach(name)
+        data = shm.buf[:size]
+        try:
+            return pickle.loads(data)
+        finally:
+            data.release()
+            shm.close()
+    return pickle.loads(message[1])
+
+
+def _worker_main(conn, preload: Iterable[str]):
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.error(f"Preloading {module} failed: {e}")
+
+    packages = {}
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        target, message = request
+        try:
+            kwargs = _load(message)
+            if target[0] == "package":
+                _, cls, tool = target
+                package = packages.get(cls)
+                if package is None:
+                    package = packages[cls] = cls()
+                result = getattr(package, 't_' + tool)(**kwargs)
+            else:
+                result = target[1](**kwargs)
+            if inspect.iscoroutine(result):
+                result = asyncio.run(result)
+            response = ("ok", result)
+        except BaseException as e:
+            response = ("error", e)
+        try:
+            conn.send(response)
+        except Exception as e:
+            conn.send(("error", RuntimeError(f"{type(response[1]).__name__}: {response[1]} ({e})")))
+
+
+class _Worker:
+    def __init__(self, context, preload):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, tuple(preload)),
+                                       daemon=True, name="tool-worker")
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ProcessWorkerPool:
+    def __init__(self, max_workers: int = None, preload: Iterable[str] = (),
+                 shm_threshold: int = 64 * 1024, start_method: str = "spawn"):
+        """
+        Warm worker processes for "process" tools.
+
+        Workers start once, import the preload modules (tool and package modules) up front and keep
+        package instances between calls. Each call takes one idle worker; when it times out that worker
+        is killed and a fresh one started. Arguments whose pickle is at least shm_threshold bytes travel
+        through a shared memory segment instead of the pipe.
+
+        Args:
+            max_workers (int): Number of worker processes, default os.cpu_count().
+            preload (iterable): Modules imported by every worker at start.
+            shm_threshold (int): Payload size in bytes from which shared memory is used.
+            start_method (str): multiprocessing start method; "spawn" is safe in threaded hosts.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.preload = list(dict.fromkeys(preload))
+        self.shm_threshold = shm_threshold
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(self.max_workers):
+            self._spawn()
+
+    def _spawn(self):
+        worker = _Worker(self._context, self.preload)
+        with self._lock:
+            self._workers.add(worker)
+        self._idle.put(worker)
+
+    def _retire(self, worker: _Worker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.kill()
+        if not self._closed:
+            self._spawn()
+
+    def call(self, target, kwargs: Dict[str, Any], timeout: float = None):
+        if self._closed:
+            raise RuntimeError("Process pool is shut down.")
+        payload = pickle.dumps(kwargs, protocol=pickle.HIGHEST_PROTOCOL)
+        shm = None
+        if len(payload) >= self.shm_threshold:
+            shm = shared_memory.SharedMemory(create=True, size=len(payload))
+            shm.buf[:len(payload)] = payload
+            message = ("shm", shm.name, len(payload))
+        else:
+            message = ("bytes", payload)
+
+        worker = self._idle.get()
+        status = result = None
+        try:
+            worker.conn.send((target, message))
+            if worker.conn.poll(timeout):
+                status, result = worker.conn.recv()
+            else:
+                self._retire(worker)
+                worker = None
+        except (EOFError, OSError) as e:
+            if worker is not None:
+                self._retire(worker)
+                worker = None
+            raise RuntimeError(f"Tool worker process died: {e}")
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        if status is None:
+            raise ToolTimeoutError(f"Tool call exceeded its timeout of {timeout}s.")
+        if status == "error":
+            raise result
+        return result
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+
+def _picklable(obj) -> bool:
+    try:
+        pickle.dumps(obj)
+        return True
+    except Exception:
+        return False
+
+
+class ToolRunner:
+    def __init__(self, max_threads: int = None, max_processes: int = None, preload: Iterable[str] = (),
+                 shm_threshold: int = 64 * 1024):
+        """
+        Runs tool calls according to their ExecutionPolicy.
+
+        The thread pool and the process pool are created on first use, so hosts without "process"
+        tools never start workers. Modules registered with preload() before the process pool starts
+        are imported by every worker at start.
+
+        Args:
+            max_threads (int): Size of the shared thread pool.
+            max_processes (int): Number of worker processes.
+            preload (iterable): Modules the worker processes import up front.
+            shm_threshold (int): Argument payload size from which shared memory is used.
+        """
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.shm_threshold = shm_threshold
+        self._preload = list(preload)
+        self._threads = None
+        self._processes = None
+        self._lock = threading.Lock()
+        self._picklable = {}
+
+    def preload(self, *modules: str):
+        for module in modules:
+            if module and module not in self._preload and module != "__main__":
+                self._preload.append(module)
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            with self._lock:
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="tool")
+        return self._threads
+
+    def _process_pool(self) -> ProcessWorkerPool:
+        if self._processes is None:
+            with self._lock:
+                if self._processes is None:
+                    self._processes = ProcessWorkerPool(self.max_processes, self._preload, self.shm_threshold)
+        return self._processes
+
+    def run(self, func: Callable, kwargs: Dict[str, Any], policy: ExecutionPolicy, target=None):
+        """
+        Call func(**kwargs) under the given policy.
+
+        Args:
+            func (callable): The tool function (a bound method for package tools).
+            kwargs (dict): Validated arguments.
+            policy (ExecutionPolicy): Where and how long the call may run.
+            target (tuple): Picklable description of func for worker processes, default ("func", func).
+
+        Returns:
+            The tool result; coroutine functions are run to completion.
+        """
+        mode = policy.mode
+        if mode == PROCESS:
+            target = target if target is not None else ("func", func)
+            picklable = self._picklable.get(target)
+            if picklable is None:
+                picklable = self._picklable[target] = _picklable(target)
+                if not picklable:
+                    logger.warning(f"{func!r} cannot be sent to a worker process, running it on a thread instead.")
+            if picklable:
+                return self._process_pool().call(target, kwargs, policy.timeout)
+            mode = THREAD
+
+        if mode == THREAD:
+            future = self._thread_pool().submit(_invoke, func, kwargs)
+            try:
+                return future.result(timeout=policy.timeout)
+            except FutureTimeout:
+                future.cancel()
+                raise ToolTimeoutError(f"Tool call exceeded its timeout of {policy.timeout}s.")
+        return _invoke(func, kwargs)
+
+    def shutdown(self):
+        with self._lock:
+            threads, self._threads = self._threads, None
+            processes, self._processes = self._processes, None
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if processes is not None:
+            processes.shutdown()
+
+
+def _invoke(func: Callable, kwargs: Dict[str, Any]):
+    result = func(**kwargs)
+    if inspect.iscoroutine(result):
+        # Async tools get their own loop when run from a worker thread
+        result = asyncio.run(result)
+    return result
+
+
+_default_runner = None
+_default_lock = threading.Lock()
+
+
+def default_runner() -> ToolRunner:
+    """
+    The ToolRunner shared by tools that were not given their own.
+    """
+    global _default_runner
+    if _default_runner is None:
+        with _default_lock:
+            if _default_runner is None:
+                _default_runner = ToolRunner()
+                atexit.register(_default_runner.shutdown)
+    return _default_runner
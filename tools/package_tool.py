@@ -1,16 +1,71 @@
 from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
 import inspect
+from GIt.tools.schema import ToolSchema, compile_schema
+from GIt.tools.validation import compile_validator
+from GIt.tools.execution import INLINE, PROCESS, ExecutionPolicy, ToolRunner, default_runner
 
 
 class PACKAGES:
     NAME: str = ""
     DESCRIPTION: str = ""
     DEFAULT_ARGUS: Dict[str, any] = {}
+    # Execution policy of the tools: one mode/timeout for all of them or a {tool_name: value} mapping.
+    # Process tools run on a separate instance inside the worker, not on this one's context.
+    EXECUTION: str | Dict[str, str] = INLINE
+    TIMEOUT: float | Dict[str, float] = None
+    RUNNER: ToolRunner = None
+    # Tools whose results PackageVal may cache: pure ones for good, the others for CACHE_TTL[tool] seconds
+    PURE: Tuple[str, ...] = ()
+    CACHE_TTL: Dict[str, float] = {}
+
+    # Reflected once per package class: {class: (methods, schemas, tool_format, validators)}
+    _schema_cache: Dict[type, tuple] = {}
 
     def __init__(self):
-        self.methods = [name for name, func in inspect.getmembers(self, predicate=inspect.ismethod) if
-                        name.startswith('t_')]
+        self.methods = self._schemas()[0]
         self.context = {}
+        self._policies = None
+        if any(policy.mode == PROCESS for policy in self.policies().values()):
+            (self.RUNNER or default_runner()).preload(type(self).__module__)
+
+    def policies(self) -> Dict[str, ExecutionPolicy]:
+        if getattr(self, "_policies", None) is None:
+            def value(setting, tool, default):
+                return setting.get(tool, default) if isinstance(setting, dict) else setting
+            self._policies = {tool: ExecutionPolicy(value(self.EXECUTION, tool, INLINE), value(self.TIMEOUT, tool, None))
+                              for tool in self._schemas()[1]}
+        return self._policies
+
+    def _schemas(self):
+        cached = PACKAGES._schema_cache.get(type(self))
+        if cached is None:
+            methods = [name for name, func in inspect.getmembers(self, predicate=inspect.ismethod) if
+                       name.startswith('t_')]
+            schemas = {}
+            for method_name in methods:
+                tool_name = method_name.removeprefix('t_')
+                schemas[tool_name] = compile_schema(tool_name, getattr(self, method_name),
+                                                    description_param="description")
+            tool_format = {tool_name: schema.as_dict() for tool_name, schema in schemas.items()}
+            validators = {tool_name: compile_validator(schema, defaults=self.DEFAULT_ARGUS)
+                          for tool_name, schema in schemas.items()}
+            cached = (methods, schemas, tool_format, validators)
+            PACKAGES._schema_cache[type(self)] = cached
+        return cached
+
+    @classmethod
+    def invalidate_schemas(cls):
+        """
+        Drop the cached schemas of this package class (all package classes when called on PACKAGES).
+        """
+        if cls is PACKAGES:
+            PACKAGES._schema_cache.clear()
+        else:
+            PACKAGES._schema_cache.pop(cls, None)
+
+    def tool_schemas(self) -> Dict[str, ToolSchema]:
+        return self._schemas()[1]
 
     def c_format(self):
         return {
@@ -20,15 +75,43 @@ class PACKAGES:
             "tools": self.tool_format()
         }
 
+    def call(self, tool: str, params: Dict[str, any] = None):
+        """
+        Validate params against the tool signature and run it; ToolArgumentError and tool errors propagate.
+        """
+        return self.execute(tool, self.validate(tool, params))
+
+    def validate(self, tool: str, params: Dict[str, any] = None) -> Dict[str, any]:
+        validator = self._schemas()[3].get(tool)
+        if validator is None:
+            raise AttributeError(f"Tool {tool} not found in package {self.NAME}.")
+        return validator(params)
+
+    def execute(self, tool: str, params: Dict[str, any]):
+        """
+        Run a tool on arguments that already went through validate().
+        """
+        policy = self.policies()[tool]
+        if policy.mode == INLINE:
+            return getattr(self, 't_' + tool)(**params)
+        return (self.RUNNER or default_runner()).run(getattr(self, 't_' + tool), params, policy,
+                                                     target=("package", type(self), tool))
+
+    def cache_policy(self, tool: str) -> Tuple[bool, float]:
+        """
+        (cacheable, ttl) of a tool; a pure tool is cacheable with no ttl.
+        """
+        if tool in self.PURE:
+            return True, None
+        if tool in self.CACHE_TTL:
+            return True, self.CACHE_TTL[tool]
+        return False, None
+
     def run(self, tool: str, params: Dict[str, any] = None):
-        tooln = 't_' + tool
-        func = getattr(self, tooln, None)
-        if not func:
+        if not self.method_validation(tool):
             return f"Tool {tool} not found in package {self.NAME}."
-
-        params = params or {}
         try:
-            return func(**params)
+            return self.call(tool, params)
         except Exception as e:
             return f"Error executing {tool}: {e}"
         
@@ -37,28 +120,12 @@ class PACKAGES:
         return hasattr(self,tooln)
 
     def tool_format(self):
-        method_descriptions = {}
-        for method_name in self.methods:
-            method = getattr(self, method_name)
-            signature = inspect.signature(method)
-            arguments = {}
-            description = ''
-            for param_name, param in signature.parameters.items():
-                param_type = param.annotation if param.annotation != inspect.Parameter.empty else str
-                param_type = param_type.__name__ if hasattr(param_type, "__name__") else str(param_type)
-                if param_name == "description":
-                    description = param.default
-                else:
-                    arguments[param_name] = {'type': param_type, "description": param.default}
-            method_descriptions[method_name.removeprefix('t_')] = {
-                'description': description,
-                'arguments': arguments
-            }
-        return method_descriptions
-
-    def batch_execute(self, tool_sequence: List[Tuple[str, Dict[str, any]]]):
-        results = []
-        for tool_name, params in tool_sequence:
-            results.append(self.call(tool_name, params))
-        return results
+        # Shared cached mapping, treat as read-only
+        return self._schemas()[2]
+
+    def batch_execute(self, tool_sequence: List[Tuple[str, Dict[str, any]]], max_workers: int = 1):
+        if max_workers <= 1 or len(tool_sequence) <= 1:
+            return [self.run(tool_name, params) for tool_name, params in tool_sequence]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tool_sequence))) as pool:
+            return list(pool.map(lambda item: self.run(*item), tool_sequence))
 
@@ -0,0 +1,191 @@
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+from importlib import metadata
+from typing import Dict, Iterable, List
+
+from GIt.tools.package_tool import PACKAGES
+
+logger = logging.getLogger("Plugins")
+
+ENTRY_POINT_GROUP = "agenengine.packages"
+MANIFEST_VERSION = 1
+
+
+def _target(package) -> str:
+    if isinstance(package, str):
+        return package
+    return f"{package.__module__}:{package.__qualname__}"
+
+
+def _load_class(target: str):
+    module_name, _, qualname = target.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def package_spec(package) -> Dict:
+    """
+    Import a package class and describe it for the manifest.
+
+    Args:
+        package: PACKAGES subclass or its "module:Class" path.
+
+    Returns:
+        dict: name, description, default_args, tools (the tool_format()), cache policies and the source
+            file with its mtime, used to notice when the entry is stale.
+    """
+    cls = _load_class(package) if isinstance(package, str) else package
+    instance = cls()
+    source = getattr(sys.modules.get(cls.__module__), "__file__", None)
+    return {
+        "target": _target(cls),
+        "name": cls.NAME,
+        "description": cls.DESCRIPTION,
+        "default_args": cls.DEFAULT_ARGUS,
+        "tools": instance.tool_format(),
+        "cache": {tool: list(instance.cache_policy(tool)) for tool in instance.tool_format()},
+        "source": source,
+        "mtime": os.path.getmtime(source) if source else None,
+    }
+
+
+def _stale(spec: Dict) -> bool:
+    source = spec.get("source")
+    if not source:
+        return False
+    try:
+        return os.path.getmtime(source) != spec.get("mtime")
+    except OSError:
+        return True
+
+
+def discover(group: str = ENTRY_POINT_GROUP) -> List[str]:
+    """
+    "module:Class" targets of the packages installed distributions register under the entry point group.
+    """
+    return [entry_point.value for entry_point in metadata.entry_points(group=group)]
+
+
+def read_manifest(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("packages", {})
+
+
+def write_manifest(path: str, specs: Dict[str, Dict]):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "packages": specs}, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+class LazyPackage:
+    def __init__(self, spec: Dict):
+        """
+        Stand-in for a PACKAGES instance built from its manifest entry.
+
+        PackageVal can register it, list its tools and render its schema without importing the package
+        module; the module is imported and the package instantiated on the first tool call.
+
+        Args:
+            spec (dict): Manifest entry as produced by package_spec().
+        """
+        self.spec = spec
+        self.NAME = spec["name"]
+        self.DESCRIPTION = spec["description"]
+        self.DEFAULT_ARGUS = spec["default_args"]
+        self._package = None
+        self._lock = threading.Lock()
+
+    @property
+    def package(self) -> PACKAGES:
+        if self._package is None:
+            with self._lock:
+                if self._package is None:
+                    self._package = _load_class(self.spec["target"])()
+        return self._package
+
+    @property
+    def loaded(self) -> bool:
+        return self._package is not None
+
+    def tool_format(self):
+        return self.spec["tools"]
+
+    def c_format(self):
+        return {
+            "package_name": self.NAME,
+            "package_description": self.DESCRIPTION,
+            "default_args": self.DEFAULT_ARGUS,
+            "tools": self.tool_format()
+        }
+
+    def method_validation(self, tool: str):
+        return tool in self.spec["tools"]
+
+    def cache_policy(self, tool: str):
+        cacheable, ttl = self.spec.get("cache", {}).get(tool, (False, None))
+        return cacheable, ttl
+
+    # Tool calls go to the real package, importing it on first use
+    def validate(self, tool: str, params: Dict = None) -> Dict:
+        return self.package.validate(tool, params)
+
+    def execute(self, tool: str, params: Dict):
+        return self.package.execute(tool, params)
+
+    def call(self, tool: str, params: Dict = None):
+        return self.package.call(tool, params)
+
+    def run(self, tool: str, params: Dict = None):
+        return self.package.run(tool, params)
+
+    def batch_execute(self, tool_sequence, max_workers: int = 1):
+        return self.package.batch_execute(tool_sequence, max_workers)
+
+
+def load_packages(manifest_path: str = None, packages: Iterable = (), group: str = ENTRY_POINT_GROUP) -> List[LazyPackage]:
+    """
+    Collect packages from the manifest, the given targets and the entry point group, lazily.
+
+    Entries already in the manifest are used as they are unless their source file changed; missing or
+    stale ones are imported once to read their schema and the manifest is rewritten, so the next cold
+    start imports nothing.
+
+    Args:
+        manifest_path (str): JSON manifest to read and keep up to date, None to always import.
+        packages (iterable): PACKAGES subclasses or "module:Class" paths to include.
+        group (str): Entry point group to discover installed packages from, None to skip discovery.
+
+    Returns:
+        list: LazyPackage objects, ready for PackageVal.
+    """
+    manifest = read_manifest(manifest_path) if manifest_path else {}
+    targets = list(dict.fromkeys([*manifest, *map(_target, packages), *(discover(group) if group else [])]))
+    changed = False
+    result = []
+    for target in targets:
+        spec = manifest.get(target)
+        if spec is None or _stale(spec):
+            try:
+                spec = package_spec(target)
+            except Exception as e:
+                logger.error(f"Loading package {target} failed: {e}")
+                continue
+            manifest[target] = spec
+            changed = True
+        result.append(LazyPackage(spec))
+    if manifest_path and changed:
+        write_manifest(manifest_path, manifest)
+    return result
@@ -0,0 +1,183 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Set
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text).lower())
+
+
+class InvertedIndex:
+    def __init__(self):
+        """
+        Word index from tokens to entry keys, used for search over names and descriptions.
+        """
+        self._postings: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._terms: Dict[Hashable, Set[str]] = {}
+        self._sorted = None
+
+    def add(self, key: Hashable, *texts: str):
+        self.remove(key)
+        terms = set()
+        for text in texts:
+            terms.update(tokenize(text))
+        self._terms[key] = terms
+        for term in terms:
+            self._postings[term].add(key)
+        self._sorted = None
+
+    def remove(self, key: Hashable):
+        for term in self._terms.pop(key, ()):
+            postings = self._postings[term]
+            postings.discard(key)
+            if not postings:
+                del self._postings[term]
+        self._sorted = None
+
+    def _prefixed(self, prefix: str) -> Set[Hashable]:
+        if self._sorted is None:
+            self._sorted = sorted(self._postings)
+        keys = set()
+        idx = bisect_left(self._sorted, prefix)
+        while idx < len(self._sorted) and self._sorted[idx].startswith(prefix):
+            keys |= self._postings[self._sorted[idx]]
+            idx += 1
+        return keys
+
+    def search(self, query: str) -> Set[Hashable]:
+        """
+        Keys whose text contains every word of the query, the last word matching as a prefix.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return set()
+        keys = None
+        for term in terms[:-1]:
+            postings = self._postings.get(term, set())
+            keys = set(postings) if keys is None else keys & postings
+            if not keys:
+                return set()
+        last = self._prefixed(terms[-1])
+        return last if keys is None else keys & last
+
+    def _containing(self, part: str, match: Callable[[str, str], bool]) -> Set[Hashable]:
+        keys = set()
+        for term, postings in self._postings.items():
+            if match(term, part):
+                keys |= postings
+        return keys
+
+    def candidates(self, query: str):
+        """
+        Keys whose text may contain query as a substring, ignoring case; a superset that callers
+        confirm with their own match. None when the query has no words to narrow on.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return None
+        if len(terms) == 1:
+            return self._containing(terms[0], lambda term, part: part in term)
+        # Inner words are whole words of the text; the first ends a word and the last starts one
+        keys = self._containing(terms[0], str.endswith)
+        for term in terms[1:-1]:
+            keys &= self._postings.get(term, set())
+            if not keys:
+                return keys
+        return keys & self._prefixed(terms[-1])
+
+
+class Registry:
+    def __init__(self, items: Iterable = None,
+                 key: Callable = lambda item: item.name,
+                 tags: Callable = lambda item: getattr(item, "tags", None) or [],
+                 permissions: Callable = lambda item: getattr(item, "permissions", None) or [],
+                 text: Callable = None):
+        """
+        Name-indexed collection shared by ToolVal, PackageVal and AgentVal.
+
+        Lookups by name, tag and permission are dictionary hits; the optional text function feeds
+        an inverted index for search. version increases on every change so callers can drop derived caches.
+
+        Args:
+            items (iterable): Initial entries.
+            key (callable): Returns the unique name of an entry.
+            tags (callable): Returns the tags of an entry.
+            permissions (callable): Returns the permissions of an entry.
+            text (callable): Returns the searchable texts of an entry, None disables search.
+        """
+        self._key = key
+        self._tags_of = tags
+        self._permissions_of = permissions
+        self._text_of = text
+        self._items: Dict[str, object] = {}
+        self._by_tag: Dict[str, Dict[str, object]] = defaultdict(dict)
+        self._by_permission: Dict[str, Dict[str, object]] = defaultdict(dict)
+        self._index = InvertedIndex()
+        self._name_set = None
+        self.version = 0
+        for item in items or []:
+            self.add(item)
+
+    def add(self, item):
+        name = self._key(item)
+        if name in self._items:
+            self.remove(name)
+        self._items[name] = item
+        for tag in self._tags_of(item):
+            self._by_tag[tag][name] = item
+        for permission in self._permissions_of(item):
+            self._by_permission[permission][name] = item
+        if self._text_of is not None:
+            self._index.add(name, name, *self._text_of(item))
+        self._changed()
+
+    def remove(self, name: str):
+        item = self._items.pop(name, None)
+        if item is None:
+            return None
+        for tag in self._tags_of(item):
+            self._by_tag[tag].pop(name, None)
+        for permission in self._permissions_of(item):
+            self._by_permission[permission].pop(name, None)
+        self._index.remove(name)
+        self._changed()
+        return item
+
+    def _changed(self):
+        self._name_set = None
+        self.version += 1
+
+    def get(self, name: str, default=None):
+        return self._items.get(name, default)
+
+    def names(self) -> List[str]:
+        return list(self._items)
+
+    def name_set(self) -> frozenset:
+        if self._name_set is None:
+            self._name_set = frozenset(self._items)
+        return self._name_set
+
+    def values(self) -> List:
+        return list(self._items.values())
+
+    def by_tag(self, tag: str) -> List:
+        return list(self._by_tag.get(tag, {}).values())
+
+    def by_permission(self, permission: str) -> List:
+        return list(self._by_permission.get(permission, {}).values())
+
+    def search(self, query: str) -> List:
+        return [self._items[name] for name in sorted(self._index.search(query))]
+
+    def __contains__(self, name) -> bool:
+        return name in self._items
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self) -> int:
+        return len(self._items)
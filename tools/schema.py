@@ -0,0 +1,51 @@
+import inspect
+from typing import Any, Dict, NamedTuple, Tuple
+
+
+class ArgSpec(NamedTuple):
+    name: str
+    type_name: str
+    description: Any
+    annotation: Any
+    kind: Any = inspect.Parameter.POSITIONAL_OR_KEYWORD
+
+
+class ToolSchema(NamedTuple):
+    name: str
+    description: str
+    arguments: Tuple[ArgSpec, ...]
+
+    def arguments_format(self) -> Dict[str, Dict[str, Any]]:
+        return {arg.name: {'type': arg.type_name, "description": arg.description} for arg in self.arguments}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'description': self.description, 'arguments': self.arguments_format()}
+
+
+def type_name(annotation) -> str:
+    return annotation.__name__ if hasattr(annotation, "__name__") else str(annotation)
+
+
+def compile_schema(name: str, func: callable, description: str = '', default_type: Any = str,
+                   description_param: str = None) -> ToolSchema:
+    """
+    Reflect a tool function once into an immutable schema record.
+
+    Args:
+        name (str): Tool name.
+        func (callable): Function or bound method whose signature describes the arguments.
+        description (str): Tool description, overridden by description_param's default when given.
+        default_type: Annotation assumed for parameters without one.
+        description_param (str): Parameter whose default holds the tool description (package tools).
+
+    Returns:
+        ToolSchema: Name, description and argument specs in signature order.
+    """
+    arguments = []
+    for param_name, param in inspect.signature(func).parameters.items():
+        if param_name == description_param:
+            description = param.default
+            continue
+        annotation = param.annotation if param.annotation != inspect.Parameter.empty else default_type
+        arguments.append(ArgSpec(param_name, type_name(annotation), param.default, annotation, param.kind))
+    return ToolSchema(name, description, tuple(arguments))
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+from GIt.models.cache import MemoryCacheBackend
+
+
+def canonical_args(params: Dict[str, Any]) -> str:
+    """
+    Stable text form of validated tool arguments: key order and JSON spacing do not matter.
+    """
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), default=repr)
+
+
+class ToolCache:
+    def __init__(self, max_entries: int = 1024):
+        """
+        Bounded LRU of tool results for tools declared pure or cacheable.
+
+        Entries are keyed on the tool and its canonicalized arguments and carry their own expiry, so
+        every tool can have its own TTL (None for pure tools, which never expire). Identical calls that
+        arrive while the first one is still running wait for its result instead of running again.
+
+        Args:
+            max_entries (int): Results kept before the least recently used one is evicted.
+        """
+        self.backend = MemoryCacheBackend(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._generation: Dict[str, int] = {}
+        self._stats: Dict[str, list] = {}
+
+    def key(self, tool: str, params: Dict[str, Any]) -> str:
+        return f"{tool}\x00{self._generation.get(tool, 0)}\x00{canonical_args(params)}"
+
+    def _count(self, tool: str, index: int):
+        stats = self._stats.get(tool)
+        if stats is None:
+            stats = self._stats.setdefault(tool, [0, 0, 0])
+        stats[index] += 1
+
+    def get_or_run(self, tool: str, params: Dict[str, Any], ttl: float, run: Callable[[], Any]):
+        """
+        Return the cached result of tool(params), or call run() once and cache what it returns.
+
+        Args:
+            tool (str): Tool name, "package#tool" for package tools.
+            params (dict): Validated arguments.
+            ttl (float): Seconds the result stays valid, None for no expiry.
+            run (callable): Performs the call; exceptions are passed on and never cached.
+        """
+        key = self.key(tool, params)
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires is None or expires > time.monotonic():
+                self._count(tool, 0)
+                return value
+            self.backend.delete(key)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            self._count(tool, 2)
+            return future.result()
+
+        self._count(tool, 1)
+        try:
+            value = run()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.backend.set(key, (value, None if ttl is None else time.monotonic() + ttl))
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def invalidate(self, tool: str = None):
+        """
+        Forget the results of one tool (all tools when None); old entries age out of the LRU.
+        """
+        if tool is None:
+            self.backend.clear()
+        else:
+            with self._lock:
+                self._generation[tool] = self._generation.get(tool, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-tool counters: hits, misses, coalesced (waited for an identical in-flight call) and hit_rate.
+        """
+        report = {}
+        for tool, (hits, misses, coalesced) in list(self._stats.items()):
+            total = hits + misses + coalesced
+            report[tool] = {"hits": hits, "misses": misses, "coalesced": coalesced,
+                            "hit_rate": (hits + coalesced) / total if total else 0.0}
+        return report
@@ -1,21 +1,76 @@
-from typing import List, Dict
-from GIt.tools.base_tool import BaseTool, simple_addition_,simple_subtraction_
+from typing import List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import time
+from GIt.tools.base_tool import BaseTool
 from GIt.tools.package_tool import PACKAGES
+from GIt.tools.registry import InvertedIndex, Registry
+from GIt.tools.tool_cache import ToolCache
 
 class PackageVal:
-    def __init__(self, package_list):
-        self.package_list = package_list
+    def __init__(self, package_list, cache_size: int = 1024):
+        self.registry = Registry(key=lambda pkg: pkg.NAME)
+        self.cache = ToolCache(cache_size)
+        self._tool_index = InvertedIndex()
+        self._derived = {}
+        for pkg in package_list:
+            self.add_package(pkg)
+
+    def _cached(self, name: str, build):
+        # Derived views are rebuilt only after the registry changed
+        version, value = self._derived.get(name, (None, None))
+        if version != self.registry.version:
+            value = build()
+            self._derived[name] = (self.registry.version, value)
+        return value
+
+    @property
+    def package_list(self) -> List[PACKAGES]:
+        return self.registry.values()
+
+    def add_package(self, package: PACKAGES):
+        self.registry.add(package)
+        self._invalidate(package.NAME, package)
+        for tool_name, tool_info in package.tool_format().items():
+            self._tool_index.add((package.NAME, tool_name), tool_name, tool_info['description'])
+
+    def remove_package(self, package_name: str):
+        package = self.registry.remove(package_name)
+        if package is not None:
+            self._invalidate(package_name, package)
+            for tool_name in package.tool_format():
+                self._tool_index.remove((package_name, tool_name))
 
     def names(self):
-        return {pkg.NAME: list(pkg.tool_format().keys()) for pkg in self.package_list}
+        return self._cached("names", lambda: {pkg.NAME: list(pkg.tool_format().keys()) for pkg in self.registry})
+
+    def name_set(self) -> frozenset:
+        return self.registry.name_set()
+
+    def _invalidate(self, package_name: str, package: PACKAGES):
+        for tool_name in package.tool_format():
+            self.cache.invalidate(f"{package_name}#{tool_name}")
+
+    def call(self, package_name: str, tool_name: str, params: Dict[str, any] = None):
+        """
+        Validate and run a package tool, reusing a cached result when the package declares the tool
+        pure or cacheable. ToolArgumentError and tool errors propagate.
+        """
+        package = self.package_retrieval(package_name)
+        params = package.validate(tool_name, params)
+        cacheable, ttl = package.cache_policy(tool_name)
+        if not cacheable:
+            return package.execute(tool_name, params)
+        return self.cache.get_or_run(f"{package_name}#{tool_name}", params, ttl,
+                                     lambda: package.execute(tool_name, params))
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        return self.cache.stats()
 
     def package_retrieval(self, package_name: str) -> PACKAGES:
-        for pkg in self.package_list:
-            if pkg.NAME == package_name:
-                return pkg
-            else : 
-                return False
-        raise ValueError(f"Package {package_name} not found.")
+        package = self.registry.get(package_name)
+        if package is None:
+            raise ValueError(f"Package {package_name} not found.")
+        return package
 
     def tool_args(self, package_name: str, tool_name: str):
         package = self.package_retrieval(package_name)
@@ -25,38 +80,85 @@ class PackageVal:
         return tool_format[tool_name]['arguments']
 
     def package_format(self):
-        return [pkg.c_format() for pkg in self.package_list]
+        return self._cached("package_format", lambda: [pkg.c_format() for pkg in self.registry])
 
     def search(self, query: str):
+        """
+        Tools whose name or description contains query, in registration order.
+
+        The word index only narrows the candidates; each one is still checked with the substring match.
+        """
+        candidates = self._tool_index.candidates(query)
+        if candidates is not None:
+            by_package = {}
+            for package_name, tool_name in candidates:
+                by_package.setdefault(package_name, set()).add(tool_name)
         results = []
-        for pkg in self.package_list:
+        for pkg in self.registry:
+            if candidates is not None and pkg.NAME not in by_package:
+                continue
             for tool_name, tool_info in pkg.tool_format().items():
+                if candidates is not None and tool_name not in by_package[pkg.NAME]:
+                    continue
                 if query in tool_name or query in tool_info['description']:
                     results.append((pkg.NAME, tool_name, tool_info))
         return results
 
 
 class ToolVal:
-    def __init__(self, tool_list: List[BaseTool] = None):
-        self.tool_list = tool_list or []
+    def __init__(self, tool_list: List[BaseTool] = None, cache_size: int = 1024):
+        self.registry = Registry(tool_list or [], text=lambda tool: (tool.description, *tool.tags))
+        self.cache = ToolCache(cache_size)
+
+    @property
+    def tool_list(self) -> List[BaseTool]:
+        return self.registry.values()
 
     def names(self):
-        return [tool.name for tool in self.tool_list]
+        return self.registry.names()
+
+    def name_set(self) -> frozenset:
+        return self.registry.name_set()
 
     def tool_formats(self):
-        return [tool.f_format() for tool in self.tool_list]
+        return [tool.f_format() for tool in self.registry]
 
     def tool_retrieval(self, tool_name: str):
-        for tool in self.tool_list:
-            if tool.name == tool_name:
-                return tool
-        raise ValueError(f"Tool {tool_name} not found.")
+        tool = self.registry.get(tool_name)
+        if tool is None:
+            raise ValueError(f"Tool {tool_name} not found.")
+        return tool
+
+    def tools_by_tag(self, tag: str) -> List[BaseTool]:
+        return self.registry.by_tag(tag)
+
+    def tools_by_permission(self, permission: str) -> List[BaseTool]:
+        return self.registry.by_permission(permission)
+
+    def search(self, query: str) -> List[BaseTool]:
+        return self.registry.search(query)
 
     def add_tool(self, tool: BaseTool):
-        self.tool_list.append(tool)
+        self.registry.add(tool)
+        self.cache.invalidate(tool.name)
 
     def remove_tool(self, tool_name: str):
-        self.tool_list = [tool for tool in self.tool_list if tool.name != tool_name]
+        self.registry.remove(tool_name)
+        self.cache.invalidate(tool_name)
+
+    def run(self, tool_name: str, params: Dict[str, any]):
+        """
+        Validate and run a tool, reusing a cached result for tools declared pure or cacheable.
+        ToolArgumentError and tool errors propagate.
+        """
+        tool = self.tool_retrieval(tool_name)
+        if not tool.cacheable:
+            return tool.run(params)
+        params = tool.validate(params)
+        return self.cache.get_or_run(tool_name, params, tool.cache_ttl, lambda: tool.execute(params))
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        return self.cache.stats()
 
     def safe_execute(self, tool_name: str, params: Dict[str, any], retries: int = 3):
         tool = self.tool_retrieval(tool_name)
@@ -67,6 +169,22 @@ class ToolVal:
                 print(f"Attempt {attempt + 1} failed: {e}")
         raise RuntimeError(f"Tool {tool_name} failed after {retries} attempts.")
 
+    def batch_execute(self, tool_sequence: List[Tuple[str, Dict[str, any]]], max_workers: int = 8):
+        """
+        Run independent tool calls concurrently; results keep the order of tool_sequence.
+        """
+        def run(item):
+            tool_name, params = item
+            try:
+                return self.run(tool_name, params)
+            except Exception as e:
+                return f"Error executing {tool_name}: {e}"
+
+        if max_workers <= 1 or len(tool_sequence) <= 1:
+            return [run(item) for item in tool_sequence]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tool_sequence))) as pool:
+            return list(pool.map(run, tool_sequence))
+
     def monitor_execution(self, tool_name: str, params: Dict[str, any]):
         tool = self.tool_retrieval(tool_name)
         start_time = time.time()
@@ -76,16 +194,55 @@ class ToolVal:
         return result
 
 
+class ToolOverlay(ToolVal):
+    def __init__(self, base: ToolVal, tool_list: List[BaseTool]):
+        """
+        A ToolVal with tools of its own on top of a shared ToolVal, which is left unmodified.
+
+        Its own tools shadow base tools of the same name. Everything else (adding and removing tools,
+        tags, the result cache) is the base's, so tools added to the base later are visible too.
 
+        Args:
+            base (ToolVal): The shared tools.
+            tool_list (list): Tools only visible through this overlay.
+        """
+        self.base = base
+        self.local = ToolVal(tool_list)
+        self._base_names = None
+        self._names = None
 
-tool_val = ToolVal([simple_addition_])
+    def __getattr__(self, name):
+        if name in ("base", "local"):
+            raise AttributeError(name)
+        return getattr(self.base, name)
 
-tool_val.add_tool(tool=simple_subtraction_)
+    @property
+    def tool_list(self) -> List[BaseTool]:
+        local = self.local.name_set()
+        return self.local.tool_list + [tool for tool in self.base.tool_list if tool.name not in local]
 
-tool = tool_val.tool_retrieval(tool_name="simple_subtraction")
+    def names(self):
+        return list(self.name_set())
+
+    def name_set(self) -> frozenset:
+        base = self.base.name_set()
+        if base is not self._base_names:
+            self._names = base | self.local.name_set()
+            self._base_names = base
+        return self._names
+
+    def tool_formats(self):
+        return [tool.f_format() for tool in self.tool_list]
 
-params = {'a':1,'b':2}
+    def tool_retrieval(self, tool_name: str):
+        if tool_name in self.local.name_set():
+            return self.local.tool_retrieval(tool_name)
+        return self.base.tool_retrieval(tool_name)
 
-exe = tool.run(params)
+    def search(self, query: str) -> List[BaseTool]:
+        return self.local.search(query) + self.base.search(query)
 
-print(exe)
\ No newline at end of file
+    def run(self, tool_name: str, params: Dict[str, any]):
+        if tool_name in self.local.name_set():
+            return self.local.run(tool_name, params)
+        return self.base.run(tool_name, params)
@@ -0,0 +1,203 @@
+import inspect
+import json
+import types
+import typing
+from typing import Any, Callable, Dict, Iterable
+
+from GIt.tools.schema import ToolSchema
+
+_NONE = type(None)
+_EMPTY = inspect.Parameter.empty
+
+
+class ToolArgumentError(ValueError):
+    """
+    Raised when the arguments an agent gave do not fit the tool signature.
+    """
+
+
+def _identity(value):
+    return value
+
+
+def _coerce_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("true", "false", "1", "0", "yes", "no"):
+        return value.strip().lower() in ("true", "1", "yes")
+    raise ValueError(f"cannot interpret {value!r} as bool")
+
+
+def _coerce_scalar(cls):
+    def coerce(value):
+        if type(value) is cls:
+            return value
+        if cls in (int, float) and isinstance(value, bool):
+            raise ValueError(f"bool is not a {cls.__name__}")
+        if cls is int and isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"{value!r} is not a whole number")
+        return cls(value)
+    return coerce
+
+
+def _container(value, kinds):
+    # Agents sometimes pass containers as JSON text
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            raise ValueError(f"{value!r} is not valid JSON")
+    if not isinstance(value, kinds):
+        raise ValueError(f"expected {' or '.join(kind.__name__ for kind in kinds)}, got {type(value).__name__}")
+    return value
+
+
+def compile_coercer(annotation) -> Callable[[Any], Any]:
+    """
+    Build a function converting a raw argument to the annotated type, resolving typing generics once.
+
+    Args:
+        annotation: Parameter annotation, e.g. int, Optional[str], List[int] or Dict[str, float].
+
+    Returns:
+        callable: coerce(value) returning the converted value or raising TypeError/ValueError.
+    """
+    if annotation in (_EMPTY, Any, object) or isinstance(annotation, str):
+        return _identity
+    if annotation is _NONE or annotation is None:
+        def coerce_none(value):
+            if value is not None:
+                raise ValueError(f"expected None, got {value!r}")
+            return None
+        return coerce_none
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin in (typing.Union, types.UnionType):
+        allows_none = _NONE in args
+        members = [compile_coercer(arg) for arg in args if arg is not _NONE]
+
+        def coerce_union(value):
+            if value is None and allows_none:
+                return None
+            errors = []
+            for member in members:
+                try:
+                    return member(value)
+                except (TypeError, ValueError) as e:
+                    errors.append(str(e))
+            raise ValueError("; ".join(errors) or f"unexpected value {value!r}")
+        return coerce_union
+
+    if origin is typing.Literal:
+        allowed = frozenset(args)
+
+        def coerce_literal(value):
+            if value not in allowed:
+                raise ValueError(f"expected one of {sorted(map(repr, allowed))}, got {value!r}")
+            return value
+        return coerce_literal
+
+    if origin in (list, set, frozenset) or annotation in (list, set, frozenset):
+        kind = origin or annotation
+        item = compile_coercer(args[0]) if args else _identity
+        return lambda value: kind(item(v) for v in _container(value, (list, tuple, set, frozenset)))
+
+    if origin is tuple or annotation is tuple:
+        if not args or (len(args) == 2 and args[1] is Ellipsis):
+            item = compile_coercer(args[0]) if args else _identity
+            return lambda value: tuple(item(v) for v in _container(value, (list, tuple)))
+        items = [compile_coercer(arg) for arg in args]
+
+        def coerce_tuple(value):
+            value = _container(value, (list, tuple))
+            if len(value) != len(items):
+                raise ValueError(f"expected {len(items)} items, got {len(value)}")
+            return tuple(coerce(v) for coerce, v in zip(items, value))
+        return coerce_tuple
+
+    if origin is dict or annotation is dict:
+        key = compile_coercer(args[0]) if args else _identity
+        val = compile_coercer(args[1]) if args else _identity
+        return lambda value: {key(k): val(v) for k, v in _container(value, (dict,)).items()}
+
+    if annotation is bool:
+        return _coerce_bool
+    if annotation in (int, float, str, bytes):
+        return _coerce_scalar(annotation)
+    if isinstance(annotation, type):
+        def coerce_class(value):
+            return value if isinstance(value, annotation) else annotation(value)
+        return coerce_class
+    return _identity
+
+
+def compile_validator(schema: ToolSchema, defaults: Dict[str, Any] = None,
+                      skip: Iterable[str] = ()) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Compile a tool schema into one function that checks and converts call arguments in a single pass.
+
+    Parameter defaults in this codebase hold argument descriptions, so a parameter is optional only
+    when it is annotated Optional[...] (filled with None) or appears in defaults.
+
+    Args:
+        schema (ToolSchema): Compiled tool schema.
+        defaults (dict): Values used for arguments the caller leaves out.
+        skip (iterable): Parameters never passed by the caller (e.g. a package tool's description).
+
+    Returns:
+        callable: validate(params) -> converted params, raising ToolArgumentError with every problem found.
+    """
+    defaults = defaults or {}
+    skip = set(skip)
+    specs = []
+    accepts_extra = False
+    for arg in schema.arguments:
+        if arg.kind == inspect.Parameter.VAR_KEYWORD:
+            accepts_extra = True
+            continue
+        if arg.kind == inspect.Parameter.VAR_POSITIONAL or arg.name in skip:
+            continue
+        if arg.name in defaults:
+            required, default = False, defaults[arg.name]
+        elif _NONE in typing.get_args(arg.annotation):
+            required, default = False, None
+        else:
+            required, default = True, None
+        expected = str(arg.annotation).replace("typing.", "") if typing.get_args(arg.annotation) else arg.type_name
+        specs.append((arg.name, compile_coercer(arg.annotation), required, default, expected))
+    specs = tuple(specs)
+    known = frozenset(spec[0] for spec in specs)
+    tool = schema.name
+
+    def validate(params: Dict[str, Any]) -> Dict[str, Any]:
+        if params is None:
+            params = {}
+        elif not isinstance(params, dict):
+            raise ToolArgumentError(f"Tool '{tool}' expects its arguments as an object, got {type(params).__name__}.")
+        errors = []
+        converted = {}
+        for name, coerce, required, default, expected in specs:
+            if name in params:
+                try:
+                    converted[name] = coerce(params[name])
+                except (TypeError, ValueError) as e:
+                    errors.append(f"'{name}' expects {expected}, got {params[name]!r} ({e})")
+            elif required:
+                errors.append(f"missing required argument '{name}'")
+            else:
+                converted[name] = default
+        if not params.keys() <= known:
+            extra = [name for name in params if name not in known]
+            if extra and accepts_extra:
+                converted.update((name, params[name]) for name in extra)
+            elif extra:
+                errors.append(f"unexpected argument(s) {', '.join(map(repr, extra))}")
+        if errors:
+            raise ToolArgumentError(f"Invalid arguments for tool '{tool}': " + "; ".join(errors) + ".")
+        return converted
+
+    return validate
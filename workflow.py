@@ -0,0 +1,281 @@
+import contextvars
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Set
+
+from GIt.executor import AgentState
+from GIt.models.cache import MemoryCacheBackend
+from GIt.tools.tool_cache import canonical_args
+
+logger = logging.getLogger("Workflow")
+
+NODE_KINDS = ("agent", "tool", "package")
+INPUT = "input"
+
+
+class WorkflowError(ValueError):
+    """
+    Raised for an invalid workflow spec: unknown node kinds or references, or a cycle.
+    """
+
+
+class Workflow:
+    def __init__(self, spec: Dict[str, Any]):
+        """
+        Declarative DAG of agent, tool and package nodes connected by data edges.
+
+        Example:
+            {"nodes": {
+                "fetch": {"tool": "fetch_page", "inputs": {"url": "input.url"}},
+                "summary": {"agent": "summarizer", "input": "Summarize this page: {page}",
+                            "inputs": {"page": "fetch"}},
+                "save": {"package": ["Files", "write"], "params": {"path": "summary.txt"},
+                         "inputs": {"text": "summary"}, "cache": False}}}
+
+        Every node names exactly one of "agent", "tool" (tool name) or "package" ([package, tool]).
+        "inputs" maps a parameter to its source: "input.<key>" for a workflow input, "<node>" for a
+        node's output or "<node>.<key>" for one field of a dict output. Tool and package nodes get the
+        resolved inputs merged over their "params"; agent nodes format them into their "input" template
+        (or get them as JSON when there is none). "after" lists nodes to wait for without using their
+        output. "cache": False always runs the node, e.g. for side effects, and "version" can be bumped
+        to invalidate a node's cached outputs after its tool or agent changed.
+
+        Args:
+            spec (dict): {"nodes": {name: node}}.
+
+        Raises:
+            WorkflowError: The spec is not a valid DAG.
+        """
+        nodes = spec.get("nodes")
+        if not isinstance(nodes, dict) or not nodes:
+            raise WorkflowError("A workflow needs a non-empty 'nodes' mapping.")
+        if INPUT in nodes:
+            raise WorkflowError(f"'{INPUT}' is reserved for the workflow inputs.")
+        self.spec = spec
+        self.nodes = nodes
+        self.dependencies: Dict[str, Set[str]] = {}
+        for name, node in nodes.items():
+            kinds = [kind for kind in NODE_KINDS if kind in node]
+            if len(kinds) != 1:
+                raise WorkflowError(f"Node '{name}' must have exactly one of {NODE_KINDS}.")
+            depends = set(node.get("after", ()))
+            for source in node.get("inputs", {}).values():
+                head = source.split(".", 1)[0]
+                if head != INPUT:
+                    depends.add(head)
+            unknown = depends - nodes.keys()
+            if unknown:
+                raise WorkflowError(f"Node '{name}' refers to unknown nodes {sorted(unknown)}.")
+            self.dependencies[name] = depends
+
+        self.dependents: Dict[str, Set[str]] = {name: set() for name in nodes}
+        for name, depends in self.dependencies.items():
+            for dependency in depends:
+                self.dependents[dependency].add(name)
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        remaining = {name: len(depends) for name, depends in self.dependencies.items()}
+        ready = [name for name, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for dependent in self.dependents[name]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.nodes):
+            cyclic = sorted(name for name, count in remaining.items() if count > 0)
+            raise WorkflowError(f"Workflow has a cycle through {cyclic}.")
+        return order
+
+    def descendants(self, names: Iterable[str]) -> Set[str]:
+        """
+        The given nodes and every node downstream of them.
+        """
+        found = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in found:
+                continue
+            if name not in self.nodes:
+                raise WorkflowError(f"Unknown node '{name}'.")
+            found.add(name)
+            stack.extend(self.dependents[name])
+        return found
+
+    def affected_by(self, input_keys: Iterable[str]) -> Set[str]:
+        """
+        Nodes that have to be reconsidered when these workflow inputs change.
+        """
+        keys = set(input_keys)
+        direct = [name for name, node in self.nodes.items()
+                  if any(source.split(".", 1)[0] == INPUT and source.split(".", 2)[1] in keys
+                         for source in node.get("inputs", {}).values() if "." in source)]
+        return self.descendants(direct)
+
+
+def _select(value, path: List[str]):
+    for key in path:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise KeyError(key)
+        value = value[key]
+    return value
+
+
+class WorkflowRunner:
+    def __init__(self, executor, cache=None, max_workers: int = 8):
+        """
+        Runs Workflow DAGs on an AgentExecutor's agents, tools and packages.
+
+        Nodes whose dependencies are done run in parallel. Every node's output is cached under a hash of
+        its definition and its resolved inputs, so a repeated run only executes nodes whose inputs
+        changed. A node whose inputs changed but whose output did not lets its dependents stay cached.
+        A failed node skips everything downstream of it.
+
+        Args:
+            executor (AgentExecutor): Provides agents (run with s_call), tools, packages and the callback.
+            cache: Backend with get/set of strings, e.g. SQLiteCacheBackend("workflow.sqlite") to keep
+                outputs across processes for recurring pipelines; default an in-memory LRU. Outputs are
+                stored as JSON, so values that are not JSON come back as their str().
+            max_workers (int): Nodes run at the same time.
+        """
+        self.executor = executor
+        self.cache = cache if cache is not None else MemoryCacheBackend(max_entries=4096)
+        self.max_workers = max_workers
+
+    @staticmethod
+    def node_key(name: str, node: Dict, inputs: Dict[str, Any]) -> str:
+        definition = {key: value for key, value in node.items() if key not in ("inputs", "after", "cache")}
+        payload = canonical_args({"node": name, "definition": definition, "inputs": inputs})
+        return "workflow:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _resolve(self, node: Dict, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+        resolved = {}
+        for param, source in node.get("inputs", {}).items():
+            head, *path = source.split(".")
+            try:
+                resolved[param] = _select(inputs, path) if head == INPUT else _select(outputs[head], path)
+            except (KeyError, IndexError, TypeError):
+                raise WorkflowError(f"Input '{param}' could not be resolved from '{source}'.")
+        return resolved
+
+    def _execute(self, name: str, node: Dict, resolved: Dict[str, Any]):
+        executor = self.executor
+        if "tool" in node:
+            return executor.tools.run(node["tool"], {**node.get("params", {}), **resolved})
+        if "package" in node:
+            package, tool = node["package"]
+            return executor.packages.call(package, tool, {**node.get("params", {}), **resolved})
+
+        template = node.get("input")
+        if template is None:
+            user_input = json.dumps(resolved, default=str)
+        else:
+            user_input = template.format(**resolved)
+        agent = executor.agents.agent_retrieval(node["agent"])
+        state = AgentState(agent=agent, callback=executor.callback, user_input=user_input, history=[],
+                           max_iterations=node.get("max_iterations", 5), store=executor.observations)
+        try:
+            state = executor.s_call(agent=agent, agent_state=state)
+        finally:
+            state.close()
+        output = state.states[-1]['action'] if state.states else None
+        if state.stopped:
+            raise RuntimeError(f"Agent '{node['agent']}' stopped: {output}")
+        if not state.states or state.states[-1]['action_type'] != "final action":
+            # Out of iterations: the last action is not an answer, so neither it nor dependents should use it
+            raise RuntimeError(f"Agent '{node['agent']}' gave no Final Answer within {state.max_ite} iterations.")
+        return output
+
+    def _run_node(self, name: str, node: Dict, resolved: Dict[str, Any], key: str, use_cache: bool):
+        with self.executor.callback.span("workflow_node", "workflow", node=name) as span:
+            if use_cache:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    span.set(cached=True)
+                    return "cached", json.loads(cached)["output"]
+            output = self._execute(name, node, resolved)
+            if node.get("cache", True):
+                self.cache.set(key, json.dumps({"output": output}, default=str))
+            span.set(cached=False)
+            return "ran", output
+
+    def run(self, workflow: Workflow, inputs: Dict[str, Any] = None, invalidate: Iterable[str] = ()) -> Dict:
+        """
+        Run a workflow.
+
+        Args:
+            workflow (Workflow or dict): The DAG, a spec dict is validated first.
+            inputs (dict): Workflow inputs, referenced as "input.<key>".
+            invalidate (iterable): Nodes to run again regardless of the cache, together with everything
+                downstream of them.
+
+        Returns:
+            dict: outputs (node -> output), status (node -> "ran", "cached", "failed" or "skipped"),
+                errors (node -> message) and time.
+        """
+        if not isinstance(workflow, Workflow):
+            workflow = Workflow(workflow)
+        inputs = inputs or {}
+        forced = workflow.descendants(invalidate)
+        start = time.monotonic()
+        outputs, status, errors = {}, {}, {}
+        waiting = {name: set(depends) for name, depends in workflow.dependencies.items()}
+        ready = [name for name in workflow.order if not waiting[name]]
+        running = {}
+
+        def settle(name: str):
+            for dependent in workflow.dependents[name]:
+                waiting[dependent].discard(name)
+                if not waiting[dependent] and dependent not in status:
+                    ready.append(dependent)
+
+        def skip(name: str):
+            for dependent in workflow.descendants([name]) - {name}:
+                if dependent not in status:
+                    status[dependent] = "skipped"
+                    errors[dependent] = f"Upstream node '{name}' failed."
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow") as pool:
+            while ready or running:
+                while ready:
+                    name = ready.pop(0)
+                    if name in status:
+                        continue
+                    node = workflow.nodes[name]
+                    try:
+                        resolved = self._resolve(node, inputs, outputs)
+                    except WorkflowError as e:
+                        status[name], errors[name] = "failed", str(e)
+                        skip(name)
+                        continue
+                    key = self.node_key(name, node, resolved)
+                    use_cache = node.get("cache", True) and name not in forced
+                    future = pool.submit(contextvars.copy_context().run, self._run_node, name, node, resolved,
+                                         key, use_cache)
+                    running[future] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name], outputs[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Workflow node '{name}' failed: {e}")
+                        status[name], errors[name] = "failed", f"Error: {e}"
+                        skip(name)
+                        continue
+                    settle(name)
+
+        self.executor.callback.export()
+        return {"outputs": outputs, "status": status, "errors": errors, "time": round(time.monotonic() - start, 3)}